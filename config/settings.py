@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+from datetime import timedelta
 from pathlib import Path
 import os
 from dotenv import load_dotenv
@@ -52,6 +53,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "social_media.routing.ReplicaRoutingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -80,15 +82,60 @@ WSGI_APPLICATION = "config.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        # Django's PostgreSQL backend plus connection metrics.
+        "ENGINE": "social_media.backends.postgresql",
         "NAME": os.getenv("POSTGRES_DB"),
         "USER": os.getenv("POSTGRES_USER"),
         "PASSWORD": os.getenv("POSTGRES_PASSWORD"),
         "HOST": os.getenv("DATABASE_HOST"),
         "PORT": os.getenv("DATABASE_PORT"),
+        "CONN_MAX_AGE": int(os.getenv("DATABASE_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": (
+            os.getenv("DATABASE_CONN_HEALTH_CHECKS", "True") == "True"
+        ),
+        # PgBouncer in transaction mode cannot keep the server-side
+        # cursors behind QuerySet.iterator() open between statements.
+        "DISABLE_SERVER_SIDE_CURSORS": (
+            os.getenv("DATABASE_PGBOUNCER", "False") == "True"
+        ),
     }
 }
 
+# Database Pool Configuration
+# psycopg's pool, per web or Celery worker process. It replaces
+# persistent connections; CONN_HEALTH_CHECKS then checks connections as
+# they are taken from the pool.
+if os.getenv("DATABASE_POOL_ENABLED", "False") == "True":
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.getenv("DATABASE_POOL_MIN_SIZE", "2")),
+            "max_size": int(os.getenv("DATABASE_POOL_MAX_SIZE", "10")),
+            "timeout": int(os.getenv("DATABASE_POOL_TIMEOUT", "10")),
+            "max_idle": 10 * 60,
+            "max_lifetime": 60 * 60,
+        }
+    }
+
+# Database Replica Configuration
+# Comma-separated hosts of streaming replicas of the default database,
+# added as `replica_1`, `replica_2`, ... Safe-method API requests read
+# from them; see social_media.routing.
+for i, host in enumerate(
+    filter(None, os.getenv("DATABASE_REPLICA_HOSTS", "").split(",")), 1
+):
+    DATABASES[f"replica_{i}"] = {
+        **DATABASES["default"],
+        "HOST": host.strip(),
+        "OPTIONS": {**DATABASES["default"].get("OPTIONS", {})},
+        "TEST": {"MIRROR": "default"},
+    }
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["social_media.routing.ReplicaRouter"]
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "10"))
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "2"))
+REPLICA_LAG_CHECK_INTERVAL = 5
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -132,7 +179,7 @@ AUTH_USER_MODEL = "social_media.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "social_media.authentication.CachedJWTAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
@@ -142,6 +189,12 @@ REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
 
+SIMPLE_JWT = {
+    "TOKEN_REFRESH_SERIALIZER": (
+        "social_media.serializers.TokenRefreshSerializer"
+    ),
+}
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "Social Media API",
     "VERSION": "1.0.0",
@@ -158,3 +211,119 @@ REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = os.getenv("REDIS_PORT", "6379")
 CELERY_BROKER_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}/0"
 CELERY_RESULT_BACKEND = f"redis://{REDIS_HOST}:{REDIS_PORT}/0"
+CELERY_TASK_ALWAYS_EAGER = (
+    os.getenv("CELERY_TASK_ALWAYS_EAGER", "False") == "True"
+)
+CELERY_BEAT_SCHEDULE = {
+    "trim-timelines": {
+        "task": "social_media.tasks.trim_timelines",
+        "schedule": 15 * 60,
+    },
+    "refresh-pull-authors": {
+        "task": "social_media.tasks.refresh_pull_authors",
+        "schedule": 5 * 60,
+    },
+    "refresh-trending-hashtags": {
+        "task": "social_media.tasks.refresh_trending_hashtags",
+        "schedule": 60,
+    },
+    "prune-hashtag-buckets": {
+        "task": "social_media.tasks.prune_hashtag_buckets",
+        "schedule": 60 * 60,
+    },
+    "dispatch-scheduled-posts": {
+        "task": "social_media.tasks.dispatch_scheduled_posts",
+        "schedule": int(os.getenv("SCHEDULED_POSTS_DISPATCH_INTERVAL", "30")),
+    },
+    "prune-token-blacklist": {
+        "task": "social_media.tasks.prune_token_blacklist",
+        "schedule": int(os.getenv("TOKEN_BLACKLIST_PRUNE_INTERVAL", "3600")),
+    },
+    "flush-like-buffer": {
+        "task": "social_media.tasks.flush_like_buffer",
+        "schedule": int(os.getenv("LIKE_BUFFER_FLUSH_INTERVAL", "5")),
+    },
+}
+
+# Cache Configuration
+# Redis in deployments; per-process local memory for tests and local runs.
+if os.getenv("USE_REDIS_CACHE", "False") == "True":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": f"redis://{REDIS_HOST}:{REDIS_PORT}/1",
+            "KEY_PREFIX": "social_media",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+API_CACHE_TIMEOUT = int(os.getenv("API_CACHE_TIMEOUT", "300"))
+
+# Authentication Cache Configuration
+AUTH_USER_CACHE_ENABLED = (
+    os.getenv("AUTH_USER_CACHE_ENABLED", "True") == "True"
+)
+AUTH_USER_CACHE_PROFILE = (
+    os.getenv("AUTH_USER_CACHE_PROFILE", "True") == "True"
+)
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv("AUTH_USER_CACHE_TIMEOUT", "60"))
+
+# Token Blacklist Configuration
+TOKEN_BLACKLIST_PRUNE_BATCH = int(
+    os.getenv("TOKEN_BLACKLIST_PRUNE_BATCH", "1000")
+)
+
+# Post Detail Configuration
+POST_DETAIL_COMMENTS = int(os.getenv("POST_DETAIL_COMMENTS", "20"))
+
+# Bulk Endpoints Configuration
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "100"))
+
+# Scheduled Posts Configuration
+SCHEDULED_POSTS_DISPATCHER_ENABLED = (
+    os.getenv("SCHEDULED_POSTS_DISPATCHER_ENABLED", "True") == "True"
+)
+SCHEDULED_POSTS_DISPATCH_BATCH = int(
+    os.getenv("SCHEDULED_POSTS_DISPATCH_BATCH", "500")
+)
+
+# Like Buffer Configuration
+LIKE_BUFFER_ENABLED = os.getenv("LIKE_BUFFER_ENABLED", "False") == "True"
+LIKE_BUFFER_FLUSH_BATCH = int(os.getenv("LIKE_BUFFER_FLUSH_BATCH", "5000"))
+
+# Feed Configuration
+FEED_TIMELINE_ENABLED = os.getenv("FEED_TIMELINE_ENABLED", "False") == "True"
+FEED_TIMELINE_MAX_ENTRIES = int(os.getenv("FEED_TIMELINE_MAX_ENTRIES", "800"))
+FEED_FANOUT_FOLLOWER_THRESHOLD = int(
+    os.getenv("FEED_FANOUT_FOLLOWER_THRESHOLD", "10000")
+)
+
+# Hashtag Indexing Configuration
+HASHTAG_INDEXING_ASYNC = os.getenv("HASHTAG_INDEXING_ASYNC", "False") == "True"
+HASHTAG_INDEXING_DEBOUNCE = int(os.getenv("HASHTAG_INDEXING_DEBOUNCE", "5"))
+HASHTAG_INDEXING_BATCH_SIZE = int(
+    os.getenv("HASHTAG_INDEXING_BATCH_SIZE", "500")
+)
+
+# Trending Hashtags Configuration
+TRENDING_BUCKET_SECONDS = 5 * 60
+TRENDING_WINDOW = timedelta(
+    hours=int(os.getenv("TRENDING_WINDOW_HOURS", "24"))
+)
+TRENDING_HALF_LIFE = timedelta(
+    minutes=int(os.getenv("TRENDING_HALF_LIFE_MINUTES", "120"))
+)
+TRENDING_RETENTION = timedelta(days=7)
+TRENDING_SIZE = int(os.getenv("TRENDING_SIZE", "20"))
+TRENDING_CACHE_TIMEOUT = 5 * 60
+
+# User Search Configuration
+USER_AUTOCOMPLETE_MAX_LIMIT = 20
+USER_AUTOCOMPLETE_CACHE_TIMEOUT = 60
+POST_SEARCH_MAX_CANDIDATES = int(
+    os.getenv("POST_SEARCH_MAX_CANDIDATES", "5000")
+)
@@ -0,0 +1,40 @@
+"""
+Settings for the test suite, which needs no PostgreSQL, Redis or
+running Celery worker:
+
+    python manage.py test --settings=config.test_settings
+"""
+
+from .settings import *  # noqa: F401,F403
+
+SECRET_KEY = "test-secret-key"
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db.sqlite3",
+        # Writers take the lock when their transaction starts and wait
+        # for each other, instead of failing to upgrade a read lock.
+        "OPTIONS": {"transaction_mode": "IMMEDIATE"},
+        # A file, not memory, so concurrency tests can use threads.
+        "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
+    },
+    # A separate database, so tests can tell which one served a read.
+    "replica_1": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db_replica_1.sqlite3",
+        "TEST": {"NAME": BASE_DIR / "test_db_replica_1.sqlite3"},
+    },
+}
+# Off unless a test turns it on, which also lets replica_1 be migrated.
+REPLICA_DATABASES = []
+
+# Tasks run in-process as soon as they are queued.
+CELERY_TASK_ALWAYS_EAGER = True
+CELERY_TASK_EAGER_PROPAGATES = True
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
@@ -6,4 +6,5 @@ class SocialMediaConfig(AppConfig):
     name = "social_media"
 
     def ready(self):
+        import social_media.checks
         import social_media.signals
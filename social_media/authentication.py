@@ -0,0 +1,102 @@
+"""
+JWT authentication backed by the default cache.
+
+simplejwt loads the User row on every request, and most views then touch
+`user.profile` as well. CachedJWTAuthentication keeps the user, with its
+profile when AUTH_USER_CACHE_PROFILE is set, under
+`auth:user:<pk>:<version>` for AUTH_USER_CACHE_TIMEOUT seconds.
+
+The version is the "auth" stamp of the caching module. It is bumped when
+the user or their profile is saved or deleted, which covers deactivation,
+and on logout, so a stale user is never served past the writing commit.
+Updates that bypass model signals, such as QuerySet.update(), are only
+picked up when the entry expires. Users are read from `default`, so a
+lagging replica cannot cache one from before the bump.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (
+    AuthenticationFailed,
+    InvalidToken,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import Token
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from . import caching, metrics
+
+User = get_user_model()
+
+metrics.register("auth.cache.hits", "auth.cache.misses")
+
+
+def _user_key(user_id, version: int) -> str:
+    return f"auth:user:{user_id}:{version}"
+
+
+def get_cached_user(user_id) -> User | None:
+    """The user with the given USER_ID_FIELD value, or None if missing."""
+    key = _user_key(user_id, caching.get_version("auth", user_id))
+    user = cache.get(key)
+    if user is not None:
+        metrics.incr("auth.cache.hits")
+        return user
+
+    metrics.incr("auth.cache.misses")
+    queryset = User.objects.using(DEFAULT_DB_ALIAS)
+    if settings.AUTH_USER_CACHE_PROFILE:
+        queryset = queryset.select_related("profile")
+    user = queryset.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+    if user is not None:
+        cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that resolves users through get_cached_user."""
+
+    def get_user(self, validated_token: Token) -> User:
+        if not settings.AUTH_USER_CACHE_ENABLED:
+            return super().get_user(validated_token)
+
+        # Same checks as JWTAuthentication.get_user, on the cached user.
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            ) from e
+
+        user = get_cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(
+                _("User not found"), code="user_not_found"
+            )
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(
+                _("User is inactive"), code="user_inactive"
+            )
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."),
+                    code="password_changed",
+                )
+
+        return user
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    """Document CachedJWTAuthentication as the usual bearer JWT scheme."""
+
+    target_class = "social_media.authentication.CachedJWTAuthentication"
@@ -0,0 +1,70 @@
+"""
+PostgreSQL backend that reports connection metrics.
+
+Without a pool, every new connection is timed under `db.connect`; with
+CONN_MAX_AGE that should only happen once per worker thread and
+lifetime. With DATABASE_POOL_ENABLED, connections are checked out of
+psycopg's pool at the start of each request or task, so `db.pool.checkout`
+measures the time spent waiting for a free connection. Checkouts that
+give up after the pool timeout count as `db.pool.timeouts`.
+
+The pool of the reporting process is sampled at most every
+POOL_STATS_INTERVAL seconds into the `db.pool.*` gauges. Each web and
+Celery process has its own pool, so the gauges show the process that
+reported last.
+"""
+
+import time
+
+from django.db.backends.postgresql import base
+
+from social_media import metrics
+
+POOL_STATS_INTERVAL = 5.0
+
+metrics.register(
+    "db.connect.count",
+    "db.connect.total_ms",
+    "db.pool.checkout.count",
+    "db.pool.checkout.total_ms",
+    "db.pool.timeouts",
+    "db.pool.size",
+    "db.pool.max_size",
+    "db.pool.available",
+    "db.pool.waiting",
+)
+
+_pool_reported_at = 0.0
+
+
+def _report_pool(pool) -> None:
+    global _pool_reported_at
+    now = time.monotonic()
+    if now - _pool_reported_at < POOL_STATS_INTERVAL:
+        return
+    _pool_reported_at = now
+    stats = pool.get_stats()
+    metrics.set_gauge("db.pool.size", stats.get("pool_size", 0))
+    metrics.set_gauge("db.pool.max_size", pool.max_size)
+    metrics.set_gauge("db.pool.available", stats.get("pool_available", 0))
+    metrics.set_gauge("db.pool.waiting", stats.get("requests_waiting", 0))
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            with metrics.timer("db.connect"):
+                return super().get_new_connection(conn_params)
+
+        from psycopg_pool import PoolTimeout
+
+        try:
+            with metrics.timer("db.pool.checkout"):
+                connection = super().get_new_connection(conn_params)
+        except PoolTimeout:
+            metrics.incr("db.pool.timeouts")
+            raise
+        finally:
+            _report_pool(pool)
+        return connection
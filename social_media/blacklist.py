@@ -0,0 +1,120 @@
+"""
+Refresh token blacklist lookups served from the default cache.
+
+simplejwt checks every refresh against the BlacklistedToken table. Here
+the answer for each jti is kept under `auth:blacklist:<jti>`: True from
+blacklisting until the token expires, or False for
+NOT_BLACKLISTED_TIMEOUT seconds after the table had no row for it.
+Cache entries can be evicted at any time, so a missing entry is never
+taken as an answer; the lookup goes to the table and caches what it
+finds.
+
+Blacklisting, from logout or refresh rotation, overwrites the entry with
+True once the row is committed. A lookup only adds its False if there is
+no entry yet, so it cannot replace a True written after it read the
+table. prune_token_blacklist deletes expired rows in small batches.
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+
+from . import metrics
+
+# Bounds how long a blacklisting whose cache write was lost goes unseen.
+NOT_BLACKLISTED_TIMEOUT = 5 * 60
+
+metrics.register(
+    "auth.blacklist.check.count",
+    "auth.blacklist.check.total_ms",
+    "auth.blacklist.db_checks",
+    "auth.blacklist.outstanding",
+    "auth.blacklist.blacklisted",
+    "auth.blacklist.pruned",
+)
+
+
+def _key(jti: str) -> str:
+    return f"auth:blacklist:{jti}"
+
+
+def _timeout(expires_at) -> int:
+    return max(int((expires_at - timezone.now()).total_seconds()), 1)
+
+
+def remember(jti: str, expires_at) -> None:
+    """Cache a token as blacklisted until it expires."""
+    if expires_at > timezone.now():
+        cache.set(_key(jti), True, _timeout(expires_at))
+
+
+def forget(jti: str) -> None:
+    cache.delete(_key(jti))
+
+
+def is_blacklisted(jti: str) -> bool:
+    with metrics.timer("auth.blacklist.check"):
+        cached = cache.get(_key(jti))
+        if cached is not None:
+            return cached
+        metrics.incr("auth.blacklist.db_checks")
+        expires_at = (
+            BlacklistedToken.objects.filter(token__jti=jti)
+            .values_list("token__expires_at", flat=True)
+            .first()
+        )
+        if expires_at is None:
+            cache.add(_key(jti), False, NOT_BLACKLISTED_TIMEOUT)
+            return False
+        remember(jti, expires_at)
+        return True
+
+
+def prune(batch_size: int) -> int:
+    """
+    Delete expired outstanding tokens, and their blacklist entries, one
+    short transaction per batch of primary keys. Returns the number of
+    outstanding tokens deleted.
+    """
+    deleted, last_pk = 0, 0
+    while True:
+        batch = list(
+            OutstandingToken.objects.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", "expires_at")[:batch_size]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+        now = timezone.now()
+        expired = [pk for pk, expires_at in batch if expires_at <= now]
+        if not expired:
+            continue
+        with transaction.atomic():
+            BlacklistedToken.objects.filter(token_id__in=expired).delete()
+            OutstandingToken.objects.filter(pk__in=expired).delete()
+        deleted += len(expired)
+    metrics.incr("auth.blacklist.pruned", deleted)
+    metrics.set_gauge(
+        "auth.blacklist.outstanding", OutstandingToken.objects.count()
+    )
+    metrics.set_gauge(
+        "auth.blacklist.blacklisted", BlacklistedToken.objects.count()
+    )
+    return deleted
+
+
+class RefreshToken(tokens.RefreshToken):
+    """RefreshToken whose blacklist check goes through is_blacklisted."""
+
+    def check_blacklist(self) -> None:
+        if is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
@@ -0,0 +1,304 @@
+"""
+Versioned cache for serialized API payloads.
+
+Every cached object has a version stamp, the time.time_ns() of its last
+invalidation, stored under `version:<kind>:<pk>`. Payloads are stored
+under `<kind>:<pk>:<version>`, so invalidating an object only writes a
+new stamp and stale payloads simply expire. Stamps are bumped after the
+writing transaction commits, from the model signals.
+
+Misses are single-flight: one caller per key rebuilds the payload while
+concurrent callers wait up to CACHE_LOCK_WAIT seconds for it, then build
+it themselves rather than fail.
+
+Validators for conditional GETs are derived from the same version stamps
+the payload was read with, so an ETag never claims a newer state than
+the body it came with.
+
+Post payloads store commenter ids instead of nested author cards; cards
+are filled in from their own cache entries on read, so a profile change
+invalidates one entry instead of every post the user commented on.
+
+Payloads are shared between viewers, so they are built without the
+viewer's is_liked / is_following flags, which are set on render and
+covered by the viewer's "follows" version in the validators.
+
+Payloads are always built from `default`, even on requests that read
+from a replica: a lagging replica would store the row from before a
+write under the version stamp that write bumped, until the entry
+expires.
+"""
+
+import hashlib
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from rest_framework.request import Request
+
+from . import metrics
+from .models import Post, User
+from .serializers import (
+    PostDetailSerializer,
+    UserPublicInfoSerializer,
+    UserSerializer,
+    viewer_state,
+)
+
+CACHED_KINDS = ("post", "user", "card")
+CACHE_LOCK_TIMEOUT = 10
+CACHE_LOCK_WAIT = 1.0
+CACHE_POLL_INTERVAL = 0.05
+
+metrics.register(
+    *(
+        f"cache.{kind}.{event}"
+        for kind in CACHED_KINDS
+        for event in ("hits", "misses")
+    ),
+    "cache.lock_waits",
+)
+
+
+def _version_key(kind: str, pk: int) -> str:
+    return f"version:{kind}:{pk}"
+
+
+def _payload_key(kind: str, pk: int, version: int) -> str:
+    return f"{kind}:{pk}:{version}"
+
+
+def get_versions(kind: str, pks: Iterable[int]) -> dict[int, int]:
+    """Return the version stamp of each object, creating missing ones."""
+    keys = {pk: _version_key(kind, pk) for pk in pks}
+    found = cache.get_many(list(keys.values()))
+    missing = [pk for pk, key in keys.items() if key not in found]
+    for pk in missing:
+        cache.add(keys[pk], time.time_ns(), timeout=None)
+    if missing:
+        found.update(cache.get_many([keys[pk] for pk in missing]))
+    return {pk: found[key] for pk, key in keys.items() if key in found}
+
+
+def get_version(kind: str, pk: int) -> int:
+    return get_versions(kind, [pk])[pk]
+
+
+def bump(kind: str, *pks: int) -> None:
+    """Invalidate objects now; prefer `invalidate` inside transactions."""
+    now = time.time_ns()
+    cache.set_many({_version_key(kind, pk): now for pk in pks}, timeout=None)
+
+
+def invalidate(kind: str, *pks: int) -> None:
+    """Bump the objects' versions once the current transaction commits."""
+    transaction.on_commit(lambda: bump(kind, *pks))
+
+
+def get_many(
+    kind: str,
+    pks: Iterable[int],
+    build: Callable[[list[int]], dict[int, object]],
+    versions: dict[int, int] | None = None,
+) -> dict[int, object]:
+    """
+    Return {pk: payload}, calling `build(pks)` for the misses. Objects
+    that `build` does not return are left out. Pass `versions` to serve
+    the payloads matching validators computed from them.
+    """
+    pks = list(dict.fromkeys(pks))
+    if versions is None:
+        versions = get_versions(kind, pks)
+    keys = {pk: _payload_key(kind, pk, versions[pk]) for pk in pks}
+    found = cache.get_many(list(keys.values()))
+    result = {pk: found[key] for pk, key in keys.items() if key in found}
+    missing = [pk for pk in pks if pk not in result]
+    if result:
+        metrics.incr(f"cache.{kind}.hits", len(result))
+    if not missing:
+        return result
+    metrics.incr(f"cache.{kind}.misses", len(missing))
+
+    owned, waiting = [], []
+    for pk in missing:
+        if cache.add(f"{keys[pk]}:lock", 1, CACHE_LOCK_TIMEOUT):
+            owned.append(pk)
+        else:
+            waiting.append(pk)
+
+    if owned:
+        try:
+            built = build(owned)
+            cache.set_many(
+                {keys[pk]: payload for pk, payload in built.items()},
+                settings.API_CACHE_TIMEOUT,
+            )
+            result.update(built)
+        finally:
+            cache.delete_many([f"{keys[pk]}:lock" for pk in owned])
+
+    if waiting:
+        metrics.incr("cache.lock_waits", len(waiting))
+        deadline = time.monotonic() + CACHE_LOCK_WAIT
+        while waiting and time.monotonic() < deadline:
+            time.sleep(CACHE_POLL_INTERVAL)
+            found = cache.get_many([keys[pk] for pk in waiting])
+            for pk in list(waiting):
+                if keys[pk] in found:
+                    result[pk] = found[keys[pk]]
+                    waiting.remove(pk)
+        if waiting:
+            result.update(build(waiting))
+    return result
+
+
+@dataclass(frozen=True)
+class Conditional:
+    """A cached representation's validators; `render()` returns the body."""
+
+    etag: str
+    last_modified: int
+    render: Callable[[], object]
+
+
+def validators(versions: Iterable[int], *parts: object) -> tuple[str, int]:
+    """
+    ETag and Last-Modified (epoch seconds) of a representation built from
+    objects with the given version stamps.
+    """
+    versions = list(versions)
+    digest = hashlib.md5(
+        ":".join(map(str, (*parts, *versions))).encode()
+    ).hexdigest()
+    return f'"{digest}"', max(versions) // 1_000_000_000
+
+
+def _shared_context(request: Request) -> dict:
+    """Serializer context for payloads shared by all viewers."""
+    return {"request": request, **viewer_state(None)}
+
+
+def user_payloads(
+    pks: Iterable[int],
+    request: Request,
+    versions: dict[int, int] | None = None,
+) -> dict[int, dict]:
+    """UserSerializer payloads by user id."""
+
+    def build(missing: list[int]) -> dict[int, dict]:
+        users = (
+            User.objects.using(DEFAULT_DB_ALIAS)
+            .filter(pk__in=missing)
+            .select_related("profile")
+        )
+        context = _shared_context(request)
+        return {
+            user.pk: UserSerializer(user, context=context).data
+            for user in users
+        }
+
+    return get_many("user", pks, build, versions)
+
+
+def author_cards(
+    pks: Iterable[int],
+    request: Request,
+    versions: dict[int, int] | None = None,
+) -> dict[int, dict]:
+    """
+    Compact UserPublicInfoSerializer payloads by user id. They share the
+    users' version stamps, so user and profile changes invalidate them.
+    """
+
+    def build(missing: list[int]) -> dict[int, dict]:
+        users = (
+            User.objects.using(DEFAULT_DB_ALIAS)
+            .filter(pk__in=missing)
+            .select_related("profile")
+        )
+        context = {"request": request}
+        return {
+            user.pk: UserPublicInfoSerializer(user, context=context).data
+            for user in users
+        }
+
+    if versions is None:
+        versions = get_versions("user", pks)
+    return get_many("card", versions.keys(), build, versions)
+
+
+def user_detail(pk: int, request: Request) -> Conditional | None:
+    """UserSerializer payload, or None if the user does not exist."""
+    versions = get_versions("user", [pk])
+    data = user_payloads([pk], request, versions).get(pk)
+    if data is None:
+        return None
+    etag, last_modified = validators(
+        [*versions.values(), get_version("follows", request.user.pk)],
+        "user",
+        pk,
+    )
+
+    def render() -> dict:
+        state = viewer_state(request, user_ids=[pk])
+        data["is_following"] = pk in state["followed_user_ids"]
+        return data
+
+    return Conditional(etag, last_modified, render)
+
+
+def post_detail(pk: int, request: Request) -> Conditional | None:
+    """
+    PostDetailSerializer payload, or None if the post does not exist or
+    is another user's unpublished post. Commenters are only fetched when
+    the body is rendered.
+    """
+
+    def build(missing: list[int]) -> dict[int, dict]:
+        posts = (
+            Post.objects.using(DEFAULT_DB_ALIAS)
+            .filter(pk__in=missing)
+            .defer("search_vector")
+        )
+        payloads = {}
+        for post in posts:
+            data = PostDetailSerializer(
+                post, context=_shared_context(request)
+            ).data
+            for comment in data["comments"]:
+                comment["user"] = comment["user"]["id"]
+            payloads[post.pk] = data
+        return payloads
+
+    versions = get_versions("post", [pk])
+    data = get_many("post", [pk], build, versions).get(pk)
+    if data is None:
+        return None
+    if not data["is_published"] and not (
+        Post.objects.filter(pk=pk, user=request.user).exists()
+    ):
+        return None
+
+    comments = data["comments"]
+    user_versions = get_versions(
+        "user", (comment["user"] for comment in comments)
+    )
+    etag, last_modified = validators(
+        [*versions.values(), *user_versions.values()],
+        "post",
+        pk,
+        request.user.pk,
+    )
+
+    def render() -> dict:
+        cards = author_cards(user_versions.keys(), request, user_versions)
+        for comment in comments:
+            comment["user"] = cards.get(comment["user"])
+        state = viewer_state(request, post_ids=[pk])
+        data["is_liked"] = pk in state["liked_post_ids"]
+        return data
+
+    return Conditional(etag, last_modified, render)
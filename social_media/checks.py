@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Backends whose entries are only visible to the process that wrote them.
+PER_PROCESS_CACHE_BACKENDS = {
+    "django.core.cache.backends.dummy.DummyCache",
+    "django.core.cache.backends.locmem.LocMemCache",
+}
+
+
+@register(Tags.caches)
+def check_like_buffer_cache(app_configs, **kwargs):
+    """
+    The like buffer is written by the web processes and flushed by the
+    Celery workers, so it needs a default cache they all share.
+    """
+    if not settings.LIKE_BUFFER_ENABLED:
+        return []
+    backend = settings.CACHES["default"]["BACKEND"]
+    if backend not in PER_PROCESS_CACHE_BACKENDS:
+        return []
+    return [
+        Error(
+            "LIKE_BUFFER_ENABLED requires a shared default cache.",
+            hint=(
+                f"{backend} keeps entries per process, so buffered likes "
+                "would never reach the flush task. Use Redis or memcached."
+            ),
+            id="social_media.E001",
+        )
+    ]
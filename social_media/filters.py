@@ -1,18 +1,76 @@
+from django.conf import settings
+from django.db.models import Case, QuerySet, When
 from django_filters import rest_framework as filters
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import SearchFilter
+from rest_framework.request import Request
 
-from social_media.models import Post
+from social_media.hashtags import normalize_hashtag
+from social_media.models import Hashtag, Post
+from social_media.search import rank_users
+
+
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    pass
 
 
 class PostFilter(filters.FilterSet):
     """
     Custom filterset for the Post model.
-    Allows filtering posts by hashtag name.
+    Allows filtering posts by hashtag name or by a list of ids.
     """
 
-    hashtag = filters.CharFilter(
-        field_name="hashtags__name", lookup_expr="iexact"
-    )
+    hashtag = filters.CharFilter(method="filter_hashtag")
+    ids = NumberInFilter(method="filter_ids")
 
     class Meta:
         model = Post
-        fields = ["hashtag"]
+        fields = ["hashtag", "ids"]
+
+    def filter_ids(
+        self, queryset: QuerySet, name: str, value: list
+    ) -> QuerySet:
+        """
+        Fetch up to BULK_MAX_ITEMS posts by primary key, in the order
+        they were requested.
+        """
+        if len(value) > settings.BULK_MAX_ITEMS:
+            raise ValidationError(
+                {"ids": f"At most {settings.BULK_MAX_ITEMS} ids are allowed."}
+            )
+        ids = list(dict.fromkeys(int(pk) for pk in value))
+        return queryset.filter(pk__in=ids).order_by(
+            Case(*(When(pk=pk, then=index) for index, pk in enumerate(ids)))
+        )
+
+    def filter_hashtag(
+        self, queryset: QuerySet, name: str, value: str
+    ) -> QuerySet:
+        """
+        Resolve the hashtag with an exact match on the unique name index,
+        then filter through the post/hashtag link table only.
+        """
+        hashtag_id = (
+            Hashtag.objects.filter(name=normalize_hashtag(value))
+            .values_list("pk", flat=True)
+            .first()
+        )
+        if hashtag_id is None:
+            return queryset.none()
+        return queryset.filter(hashtags=hashtag_id)
+
+
+class UserSearchFilter(SearchFilter):
+    """
+    SearchFilter for users that orders matches by relevance instead of
+    leaving them in primary key order.
+    """
+
+    def filter_queryset(
+        self, request: Request, queryset: QuerySet, view
+    ) -> QuerySet:
+        terms = self.get_search_terms(request)
+        queryset = super().filter_queryset(request, queryset, view)
+        if not terms:
+            return queryset
+        return rank_users(queryset, terms[0])
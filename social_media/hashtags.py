@@ -0,0 +1,137 @@
+import re
+from collections import Counter
+
+from django.db import transaction
+
+from . import trending
+from .models import Hashtag, Post
+
+HASHTAG_PATTERN = re.compile(r"#([\w-]+)")
+
+
+def normalize_hashtag(name: str) -> str:
+    """Hashtag names are stored lowercased and without the leading '#'."""
+    return name.strip().lstrip("#").lower()
+
+
+def extract_hashtags(content: str) -> list[str]:
+    """Return the distinct normalized hashtag names in `content`, in order."""
+    return list(
+        dict.fromkeys(
+            normalize_hashtag(name)
+            for name in HASHTAG_PATTERN.findall(content)
+        )
+    )
+
+
+def get_or_create_hashtags(names: list[str]) -> dict[str, int]:
+    """Map hashtag names to ids, inserting the missing ones in bulk."""
+    if not names:
+        return {}
+    hashtag_ids = dict(
+        Hashtag.objects.filter(name__in=names).values_list("name", "pk")
+    )
+    missing = [name for name in names if name not in hashtag_ids]
+    if missing:
+        Hashtag.objects.bulk_create(
+            [Hashtag(name=name) for name in missing], ignore_conflicts=True
+        )
+        hashtag_ids.update(
+            Hashtag.objects.filter(name__in=missing).values_list("name", "pk")
+        )
+    return hashtag_ids
+
+
+def sync_hashtags(posts: list[Post], created: bool = False) -> None:
+    """
+    Make the hashtag links of `posts` match their content, writing only
+    the difference to the M2M through table and the trending counters.
+    Safe to run repeatedly. Pass `created=True` for posts that cannot
+    have links yet.
+    """
+    if not posts:
+        return
+    through = Post.hashtags.through
+    names_by_post = {post.pk: extract_hashtags(post.content) for post in posts}
+    hashtag_ids = get_or_create_hashtags(
+        list(
+            dict.fromkeys(
+                name for names in names_by_post.values() for name in names
+            )
+        )
+    )
+    wanted = {
+        (post_id, hashtag_ids[name])
+        for post_id, names in names_by_post.items()
+        for name in names
+    }
+    current = (
+        {}
+        if created
+        else {
+            (post_id, hashtag_id): pk
+            for pk, post_id, hashtag_id in through.objects.filter(
+                post_id__in=names_by_post
+            ).values_list("pk", "post_id", "hashtag_id")
+        }
+    )
+
+    added = wanted - current.keys()
+    if added:
+        through.objects.bulk_create(
+            [
+                through(post_id=post_id, hashtag_id=hashtag_id)
+                for post_id, hashtag_id in added
+            ],
+            ignore_conflicts=True,
+        )
+    removed = {link: pk for link, pk in current.items() if link not in wanted}
+    if removed:
+        through.objects.filter(pk__in=removed.values()).delete()
+
+    # Unpublished posts are counted when they are published.
+    buckets = {
+        post.pk: trending.bucket_start(
+            trending.published_at(post.created_at, post.scheduled_at)
+        )
+        for post in posts
+        if post.is_published
+    }
+    deltas = Counter()
+    for post_id, hashtag_id in added:
+        if post_id in buckets:
+            deltas[hashtag_id, buckets[post_id]] += 1
+    for post_id, hashtag_id in removed:
+        if post_id in buckets:
+            deltas[hashtag_id, buckets[post_id]] -= 1
+    trending.record(deltas)
+
+
+def index_pending_posts(batch_size: int) -> int:
+    """
+    Index hashtags of posts flagged with `hashtags_dirty`, one batch per
+    transaction, and return how many posts were processed. Rows locked by
+    a concurrent run are skipped.
+    """
+    indexed = 0
+    while True:
+        with transaction.atomic():
+            posts = list(
+                Post.objects.filter(hashtags_dirty=True)
+                .select_for_update(skip_locked=True)
+                .only(
+                    "pk",
+                    "content",
+                    "created_at",
+                    "scheduled_at",
+                    "is_published",
+                )
+                .order_by("pk")[:batch_size]
+            )
+            if not posts:
+                return indexed
+            sync_hashtags(posts)
+            Post.objects.filter(pk__in=[post.pk for post in posts]).update(
+                hashtags_dirty=False
+            )
+        indexed += len(posts)
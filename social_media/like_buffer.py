@@ -0,0 +1,336 @@
+"""
+Write-behind buffer for likes, used when LIKE_BUFFER_ENABLED is set.
+
+Like and unlike requests are acknowledged once they are recorded in the
+default cache, which must be shared with the Celery workers (a system
+check rejects per-process backends while the buffer is enabled). A
+periodic task flushes them to the Like table in batches, so a viral post
+costs one bulk insert per flush instead of one contended insert per
+request.
+
+Buffered state lives under these keys:
+
+    likes:buffer:seq               last journal sequence number
+    likes:buffer:op:<seq>          (user id, post id, liked) journal entry
+    likes:buffer:flushed           last sequence number flushed
+    likes:buffer:state:<u>:<p>     (liked, seq) latest buffered state
+    likes:buffer:user:<u>          post ids with buffered state, per user
+    likes:buffer:delta:<p>         likes_count change not yet flushed
+    likes:buffer:lock:<u>:<p>      held while a state is read and changed
+    likes:buffer:lock:<u>          held while the user's post ids change
+
+Reads merge the buffered state over the database until it is flushed.
+Changing a state and releasing it after a flush both hold the lock of
+its (user, post) pair, so concurrent duplicate requests record one
+change and a flush cannot drop a state recorded after it read it.
+Nothing expires: a state is dropped by the flush that writes its
+sequence number, so a delayed flush cannot let a read fall back to a
+database that does not have the change yet.
+Counter deltas are counted from the Like rows a flush actually inserts
+or deletes and applied with F() updates like the request path did; a
+crash between the database commit and advancing the flushed position
+can apply a batch twice, which reconcile_post_counters repairs.
+"""
+
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+
+from . import metrics
+from .models import Like, Post
+
+User = get_user_model()
+
+SEQ_KEY = "likes:buffer:seq"
+FLUSHED_KEY = "likes:buffer:flushed"
+STALLED_KEY = "likes:buffer:stalled"
+FLUSH_LOCK_KEY = "likes:buffer:flushing"
+FLUSH_LOCK_TIMEOUT = 5 * 60
+# A lock left behind by a crashed holder expires after LOCK_TIMEOUT.
+LOCK_TIMEOUT = 5
+LOCK_POLL_INTERVAL = 0.005
+
+metrics.register("likes.buffered", "likes.flushed", "likes.flush_lag")
+
+
+def is_enabled() -> bool:
+    return settings.LIKE_BUFFER_ENABLED
+
+
+def _op_key(seq: int) -> str:
+    return f"likes:buffer:op:{seq}"
+
+
+def _state_key(user_id: int, post_id: int) -> str:
+    return f"likes:buffer:state:{user_id}:{post_id}"
+
+
+def _user_key(user_id: int) -> str:
+    return f"likes:buffer:user:{user_id}"
+
+
+def _delta_key(post_id: int) -> str:
+    return f"likes:buffer:delta:{post_id}"
+
+
+def _lock_key(user_id: int, post_id: int) -> str:
+    return f"likes:buffer:lock:{user_id}:{post_id}"
+
+
+def _user_lock_key(user_id: int) -> str:
+    return f"likes:buffer:lock:{user_id}"
+
+
+@contextmanager
+def _locked(locks):
+    """
+    Hold the cache locks named `locks`. They are taken in sorted order,
+    so callers with overlapping locks cannot deadlock; per-user locks are
+    only taken last, one at a time.
+    """
+    taken = []
+    try:
+        for lock in sorted(locks):
+            while not cache.add(lock, True, timeout=LOCK_TIMEOUT):
+                time.sleep(LOCK_POLL_INTERVAL)
+            taken.append(lock)
+        yield
+    finally:
+        cache.delete_many(taken)
+
+
+def _incr(key: str, amount: int, timeout: int | None) -> None:
+    cache.add(key, 0, timeout=timeout)
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        # The key expired between add() and incr().
+        cache.set(key, amount, timeout=timeout)
+
+
+def state(user_id: int, post_id: int) -> bool | None:
+    """Buffered like state, or None if the database is current."""
+    value = cache.get(_state_key(user_id, post_id))
+    return None if value is None else value[0]
+
+
+def states(user_id: int, post_ids=None) -> dict[int, bool]:
+    """
+    Buffered like states of a user by post id, for `post_ids` or, if not
+    given, for every post the user has buffered state for.
+    """
+    if post_ids is None:
+        post_ids = cache.get(_user_key(user_id), set())
+    keys = {_state_key(user_id, post_id): post_id for post_id in post_ids}
+    return {
+        keys[key]: liked for key, (liked, _seq) in cache.get_many(keys).items()
+    }
+
+
+def count_deltas(post_ids) -> dict[int, int]:
+    """Unflushed likes_count changes by post id."""
+    keys = {_delta_key(post_id): post_id for post_id in post_ids}
+    return {
+        keys[key]: value
+        for key, value in cache.get_many(keys).items()
+        if value
+    }
+
+
+def record(user_id: int, post_id: int, liked: bool) -> None:
+    """
+    Buffer a like or unlike. Callers only record changes of state, so
+    each entry moves likes_count by one.
+    """
+    try:
+        seq = cache.incr(SEQ_KEY)
+    except ValueError:
+        cache.add(SEQ_KEY, 0, timeout=None)
+        seq = cache.incr(SEQ_KEY)
+    cache.set(_op_key(seq), (user_id, post_id, liked), timeout=None)
+    cache.set(_state_key(user_id, post_id), (liked, seq), timeout=None)
+    _update_buffered(user_id, added={post_id})
+    _incr(_delta_key(post_id), 1 if liked else -1, timeout=None)
+    metrics.incr("likes.buffered")
+
+
+def _update_buffered(user_id: int, added=(), removed=()) -> None:
+    """Change the post ids listed under the user's buffered state."""
+    with _locked([_user_lock_key(user_id)]):
+        buffered = cache.get(_user_key(user_id), set())
+        buffered = (buffered | set(added)) - set(removed)
+        if buffered:
+            cache.set(_user_key(user_id), buffered, timeout=None)
+        else:
+            cache.delete(_user_key(user_id))
+
+
+def apply(user_id: int, post_ids: list[int], liked: bool) -> dict[int, bool]:
+    """
+    Buffer likes (or unlikes) of several posts by one user. Returns
+    {post id: changed} for the posts that exist and are published or
+    the user's own, like relations does; posts already in the requested
+    state, buffered or stored, are left unchanged. The caller
+    invalidates the changed posts.
+    """
+    existing = set(
+        Post.objects.filter(
+            Q(is_published=True) | Q(user_id=user_id), pk__in=post_ids
+        ).values_list("pk", flat=True)
+    )
+    result = {}
+    with _locked(_lock_key(user_id, pk) for pk in existing):
+        current = states(user_id, existing)
+        unknown = existing - current.keys()
+        if unknown:
+            # A state is only released once the flush has committed it.
+            stored = set(
+                Like.objects.filter(user_id=user_id, post_id__in=unknown)
+                .order_by()
+                .values_list("post_id", flat=True)
+            )
+            current.update({pk: pk in stored for pk in unknown})
+        for pk in sorted(existing):
+            result[pk] = current[pk] != liked
+            if result[pk]:
+                record(user_id, pk, liked)
+    return result
+
+
+def _read_journal(start: int, end: int) -> tuple[list[tuple], int]:
+    """
+    Journal entries after `start` up to `end` and the last sequence read.
+    Stops at a missing entry, which a writer may still be storing,
+    unless it was already missing on the previous flush.
+    """
+    keys = [_op_key(seq) for seq in range(start + 1, end + 1)]
+    found = cache.get_many(keys)
+    ops, last = [], start
+    for seq, key in enumerate(keys, start + 1):
+        if key not in found:
+            if cache.get(STALLED_KEY) != seq:
+                cache.set(STALLED_KEY, seq, timeout=None)
+                break
+        else:
+            ops.append(found[key])
+        last = seq
+    return ops, last
+
+
+def _release_states(keys, last: int) -> None:
+    """
+    Drop the buffered states of (user id, post id) `keys` that were
+    written by sequence numbers up to `last`, now in the database.
+    States recorded again since then are kept for a later flush.
+    """
+    state_keys = {_state_key(*key): key for key in keys}
+    with _locked(_lock_key(*key) for key in state_keys.values()):
+        done = [
+            state_keys[key]
+            for key, (_liked, seq) in cache.get_many(state_keys).items()
+            if seq <= last
+        ]
+        cache.delete_many([_state_key(*key) for key in done])
+        released = defaultdict(set)
+        for user_id, post_id in done:
+            released[user_id].add(post_id)
+        for user_id, post_ids in released.items():
+            _update_buffered(user_id, removed=post_ids)
+
+
+def _write_likes(final: dict[tuple[int, int], bool]) -> dict[int, int]:
+    """
+    Bring the Like rows of the (user id, post id) pairs in `final` to
+    their liked state and return the likes_count change of each post,
+    counted from the rows inserted or deleted. Likes of posts or by
+    users deleted since they were buffered are skipped.
+    """
+    live_posts = set(
+        Post.objects.filter(
+            pk__in={post_id for _, post_id in final}
+        ).values_list("pk", flat=True)
+    )
+    live_users = set(
+        User.objects.filter(
+            pk__in={user_id for user_id, _ in final}
+        ).values_list("pk", flat=True)
+    )
+    stored = set(
+        Like.objects.filter(
+            post_id__in=live_posts, user_id__in=live_users
+        ).values_list("user_id", "post_id")
+    )
+
+    changes = defaultdict(int)
+    inserts, unliked = [], defaultdict(list)
+    for (user_id, post_id), liked in final.items():
+        if liked and (user_id, post_id) not in stored:
+            if post_id in live_posts and user_id in live_users:
+                inserts.append(Like(user_id=user_id, post_id=post_id))
+                changes[post_id] += 1
+        elif not liked and (user_id, post_id) in stored:
+            unliked[post_id].append(user_id)
+    Like.objects.bulk_create(
+        inserts,
+        batch_size=settings.LIKE_BUFFER_FLUSH_BATCH,
+        ignore_conflicts=True,
+    )
+    for post_id, user_ids in unliked.items():
+        deleted, _ = Like.objects.filter(
+            post_id=post_id, user_id__in=user_ids
+        ).delete()
+        changes[post_id] -= deleted
+    return changes
+
+
+def flush() -> list[int]:
+    """
+    Write up to LIKE_BUFFER_FLUSH_BATCH buffered changes to the database
+    and return the ids of the posts they touched.
+    """
+    if not cache.add(FLUSH_LOCK_KEY, True, FLUSH_LOCK_TIMEOUT):
+        return []
+    try:
+        flushed = cache.get(FLUSHED_KEY, 0)
+        end = min(
+            cache.get(SEQ_KEY, 0), flushed + settings.LIKE_BUFFER_FLUSH_BATCH
+        )
+        ops, last = _read_journal(flushed, end)
+        if last == flushed:
+            return []
+
+        final, buffered = {}, defaultdict(int)
+        for user_id, post_id, liked in ops:
+            final[user_id, post_id] = liked
+            buffered[post_id] += 1 if liked else -1
+
+        with transaction.atomic():
+            changes = _write_likes(final)
+            grouped = defaultdict(list)
+            for post_id, delta in changes.items():
+                if delta:
+                    grouped[delta].append(post_id)
+            for delta, pks in grouped.items():
+                Post.objects.filter(pk__in=pks).update(
+                    likes_count=F("likes_count") + delta
+                )
+
+        cache.set(FLUSHED_KEY, last, timeout=None)
+        for post_id, delta in buffered.items():
+            if delta:
+                _incr(_delta_key(post_id), -delta, timeout=None)
+        cache.delete_many(
+            [_op_key(seq) for seq in range(flushed + 1, last + 1)]
+        )
+        _release_states(final, last)
+        metrics.incr("likes.flushed", len(ops))
+        metrics.set_gauge("likes.flush_lag", cache.get(SEQ_KEY, 0) - last)
+        return list(buffered)
+    finally:
+        cache.delete(FLUSH_LOCK_KEY)
@@ -0,0 +1,125 @@
+"""
+Helpers shared by the bench_* management commands.
+
+Benchmarks seed synthetic data inside a transaction that is always rolled
+back, so they can be pointed at a scratch copy of a real database.
+"""
+
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Callable, Iterator
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from social_media.models import Post, Profile
+
+User = get_user_model()
+
+BULK_BATCH_SIZE = 5000
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back() -> Iterator[None]:
+    """Run the block in a transaction that is discarded afterwards."""
+    try:
+        with transaction.atomic():
+            yield
+            raise _Rollback
+    except _Rollback:
+        pass
+
+
+def measure(fn: Callable[[], object], repeat: int) -> dict[str, float]:
+    """Call `fn` `repeat` times and return latency stats in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "mean": statistics.fmean(samples),
+        "p50": samples[len(samples) // 2],
+        "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "max": samples[-1],
+    }
+
+
+def format_stats(stats: dict[str, float]) -> str:
+    return "  ".join(f"{name}={value:8.2f}ms" for name, value in stats.items())
+
+
+def api_client(user=None) -> APIClient:
+    client = APIClient(SERVER_NAME="localhost")
+    if user is not None:
+        client.force_authenticate(user)
+    return client
+
+
+def create_users(count: int, prefix: str = "bench") -> list:
+    """Bulk-create users together with their profiles."""
+    users = User.objects.bulk_create(
+        [
+            User(
+                username=f"{prefix}{i}",
+                email=f"{prefix}{i}@bench.local",
+                password="!",
+            )
+            for i in range(count)
+        ],
+        batch_size=BULK_BATCH_SIZE,
+    )
+    Profile.objects.bulk_create(
+        [Profile(user=user) for user in users], batch_size=BULK_BATCH_SIZE
+    )
+    return users
+
+
+def create_posts(
+    authors: list,
+    per_author: int,
+    spread: timedelta = timedelta(days=7),
+    content: Callable[[int], str] = lambda i: f"Benchmark post {i}",
+    **fields,
+) -> list:
+    """
+    Bulk-create posts with created_at spread randomly over `spread`.
+    `auto_now_add` ignores explicit values on insert, so timestamps are
+    applied with a follow-up bulk_update.
+    """
+    posts = Post.objects.bulk_create(
+        [
+            Post(user=author, content=content(i), **fields)
+            for i, author in enumerate(
+                author for author in authors for _ in range(per_author)
+            )
+        ],
+        batch_size=BULK_BATCH_SIZE,
+    )
+    now = timezone.now()
+    for post in posts:
+        post.created_at = now - spread * random.random()
+    Post.objects.bulk_update(posts, ["created_at"], batch_size=BULK_BATCH_SIZE)
+    return posts
+
+
+def zipf_choices(population: list, count: int, exponent: float) -> set:
+    """Sample `count` distinct items, favouring the head of `population`."""
+    weights = [1 / (rank**exponent) for rank in range(1, len(population) + 1)]
+    chosen = set()
+    count = min(count, len(population))
+    while len(chosen) < count:
+        chosen.update(
+            random.choices(population, weights, k=count - len(chosen))
+        )
+    return chosen
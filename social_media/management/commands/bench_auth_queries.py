@@ -0,0 +1,120 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from social_media.models import Comment, Follow, Like
+
+from ._bench import (
+    BULK_BATCH_SIZE,
+    api_client,
+    create_posts,
+    create_users,
+    rolled_back,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Count the queries of each API endpoint, authenticated with a "
+        "real JWT, with the cached user of CachedJWTAuthentication turned "
+        "off and on. Seeded data is rolled back afterwards."
+    )
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self._run()
+
+    def _run(self) -> None:
+        users = create_users(20, prefix="authbench")
+        viewer, author = users[0], users[1]
+        posts = create_posts(users, 2, content=lambda i: f"authbench {i}")
+        post = posts[0]
+        Follow.objects.bulk_create(
+            [Follow(follower=viewer, following=user) for user in users[1:]],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        Like.objects.bulk_create(
+            [Like(user=viewer, post=post) for post in posts[::2]],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        Comment.objects.bulk_create(
+            [
+                Comment(user=user, post=post, text="authbench")
+                for user in users
+            ],
+            batch_size=BULK_BATCH_SIZE,
+        )
+
+        client = api_client()
+        client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(viewer)}"
+        )
+        liked = posts[1].pk
+        requests = {
+            "users.me": [("get", "/api/users/me/", None)],
+            "users.me patch": [
+                ("patch", "/api/users/me/", {"bio": "authbench"})
+            ],
+            "users.list": [("get", "/api/users/", None)],
+            "users.detail": [("get", f"/api/users/{author.pk}/", None)],
+            "users.followers": [
+                ("get", f"/api/users/{author.pk}/followers/", None)
+            ],
+            "users.following": [
+                ("get", f"/api/users/{viewer.pk}/following/", None)
+            ],
+            "posts.list": [("get", "/api/posts/", None)],
+            "posts.feed": [("get", "/api/posts/feed/", None)],
+            "posts.liked": [("get", "/api/posts/liked/", None)],
+            "posts.drafts": [("get", "/api/posts/drafts/", None)],
+            "posts.search": [("get", "/api/posts/search/?q=authbench", None)],
+            "posts.detail": [("get", f"/api/posts/{post.pk}/", None)],
+            "posts.like/unlike": [
+                ("post", f"/api/posts/{liked}/like/", None),
+                ("post", f"/api/posts/{liked}/unlike/", None),
+            ],
+            "comments.list": [
+                ("get", f"/api/posts/{post.pk}/comments/", None)
+            ],
+            "hashtags.trending": [("get", "/api/hashtags/trending/", None)],
+        }
+
+        self.stdout.write(f"{'endpoint':<20} {'jwt':>4} {'cached':>6}")
+        totals = [0, 0]
+        for name, calls in requests.items():
+            counts = [
+                self._count(client, calls, enabled)
+                for enabled in (False, True)
+            ]
+            for i, count in enumerate(counts):
+                totals[i] += count / len(calls)
+            self.stdout.write(f"{name:<20} {counts[0]:>4} {counts[1]:>6}")
+
+        saved = (totals[0] - totals[1]) / len(requests)
+        self.stdout.write(
+            f"{len(requests)} endpoints, {saved:.2f} queries saved per "
+            f"request on average"
+        )
+
+    def _count(self, client, calls: list[tuple], enabled: bool) -> int:
+        """
+        Queries of one round of `calls` after a warm-up round, so both
+        modes are compared with the same payload caches filled.
+        """
+        with override_settings(AUTH_USER_CACHE_ENABLED=enabled):
+            self._call(client, calls)
+            with CaptureQueriesContext(connection) as queries:
+                self._call(client, calls)
+        return len(queries)
+
+    def _call(self, client, calls: list[tuple]) -> None:
+        for method, url, data in calls:
+            if method == "get":
+                response = client.get(url)
+            else:
+                response = getattr(client, method)(url, data, format="json")
+            if response.status_code != 200:
+                raise CommandError(
+                    f"{method.upper()} {url} returned {response.status_code}"
+                )
@@ -0,0 +1,91 @@
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.tokens import AccessToken
+
+from ._bench import (
+    api_client,
+    create_posts,
+    create_users,
+    format_stats,
+    measure,
+    rolled_back,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the bulk like/follow endpoints and ?ids= post hydration "
+        "against the equivalent sequence of single calls, authenticated "
+        "with real JWTs. All data is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=50)
+        parser.add_argument("--repeat", type=int, default=10)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self._run(options["items"], options["repeat"])
+
+    def _run(self, items: int, repeat: int) -> None:
+        users = create_users(items + 1, prefix="bulkbench")
+        viewer, others = users[0], users[1:]
+        posts = create_posts(others, 1)
+        client = api_client()
+        client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(viewer)}"
+        )
+
+        def singles(path: str, on: str, off: str, targets: list):
+            def run():
+                for verb in (on, off):
+                    for target in targets:
+                        client.post(f"/api/{path}/{target.pk}/{verb}/")
+
+            return run
+
+        def bulk(path: str, on: str, off: str, targets: list):
+            def run():
+                for verb in (on, off):
+                    client.post(
+                        f"/api/{path}/bulk/",
+                        {
+                            "actions": [
+                                {"id": target.pk, "action": verb}
+                                for target in targets
+                            ]
+                        },
+                        format="json",
+                    )
+
+            return run
+
+        ids = ",".join(str(post.pk) for post in posts)
+        cases = (
+            (
+                f"{items} likes + unlikes",
+                singles("posts", "like", "unlike", posts),
+                bulk("likes", "like", "unlike", posts),
+            ),
+            (
+                f"{items} follows + unfollows",
+                singles("users", "follow", "unfollow", others),
+                bulk("follows", "follow", "unfollow", others),
+            ),
+            (
+                f"{items} posts fetched",
+                lambda: [
+                    client.get(f"/api/posts/{post.pk}/") for post in posts
+                ],
+                lambda: client.get(
+                    "/api/posts/", {"ids": ids, "limit": items}
+                ),
+            ),
+        )
+        for label, single, batched in cases:
+            self.stdout.write(label)
+            self.stdout.write(
+                "  single calls  " + format_stats(measure(single, repeat))
+            )
+            self.stdout.write(
+                "  one request   " + format_stats(measure(batched, repeat))
+            )
@@ -0,0 +1,125 @@
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection, connections
+
+from social_media import metrics
+
+from ._bench import api_client, create_users, format_stats
+
+User = get_user_model()
+
+PREFIX = "connbench"
+
+MODES = {
+    "connect per request": {"CONN_MAX_AGE": 0, "pool": None},
+    "persistent (CONN_MAX_AGE=60)": {"CONN_MAX_AGE": 60, "pool": None},
+    "pool": {"CONN_MAX_AGE": 0, "pool": {"min_size": 2}},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test an endpoint from a thread pool with a new connection "
+        "per request, persistent connections and the psycopg pool, and "
+        "compare latency and connection setup time. Requires PostgreSQL "
+        "with psycopg 3 for the pool. The user it creates is committed, "
+        "since the threads use their own connections, and deleted "
+        "afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default="/api/posts/?limit=10")
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=200,
+            help="Requests per thread in each mode.",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError(
+                "Connection modes can only be compared on PostgreSQL."
+            )
+        settings_dict = connections.settings[connection.alias]
+        saved = (
+            settings_dict["CONN_MAX_AGE"],
+            settings_dict["OPTIONS"].get("pool"),
+        )
+        self._threads = options["threads"]
+        User.objects.filter(username__startswith=PREFIX).delete()
+        (user,) = create_users(1, prefix=PREFIX)
+        try:
+            for name, mode in MODES.items():
+                self._configure(settings_dict, **mode)
+                self.stdout.write(name)
+                self._run(user, options)
+        finally:
+            self._configure(settings_dict, *saved)
+            User.objects.filter(username__startswith=PREFIX).delete()
+
+    def _configure(self, settings_dict: dict, CONN_MAX_AGE: int, pool) -> None:
+        connections.close_all()
+        if getattr(connection, "pool", None):
+            connection.close_pool()
+        settings_dict["CONN_MAX_AGE"] = CONN_MAX_AGE
+        if pool is None:
+            settings_dict["OPTIONS"].pop("pool", None)
+        else:
+            settings_dict["OPTIONS"]["pool"] = {
+                **pool,
+                "min_size": min(pool.get("min_size", 1), self._threads),
+                "max_size": self._threads,
+            }
+
+    def _run(self, user, options: dict) -> None:
+        path, count = options["path"], options["requests"]
+        samples, errors = [], []
+        before = metrics.snapshot()
+
+        def worker():
+            client = api_client(user)
+            try:
+                for _ in range(count):
+                    started = time.perf_counter()
+                    response = client.get(path)
+                    # The test client skips this request_finished handler.
+                    close_old_connections()
+                    samples.append((time.perf_counter() - started) * 1000)
+                    if response.status_code != 200:
+                        errors.append(response.status_code)
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=worker) for _ in range(self._threads)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise CommandError(f"{path} failed: {sorted(set(errors))}")
+
+        samples.sort()
+        stats = {
+            "mean": sum(samples) / len(samples),
+            "p50": samples[len(samples) // 2],
+            "p95": samples[int(len(samples) * 0.95)],
+            "max": samples[-1],
+        }
+        self.stdout.write(f"  {len(samples)} requests  {format_stats(stats)}")
+        after = metrics.snapshot()
+        for name in ("db.connect", "db.pool.checkout"):
+            calls = after.get(f"{name}.count", 0) - before.get(
+                f"{name}.count", 0
+            )
+            if calls:
+                spent = after[f"{name}.total_ms"] - before[f"{name}.total_ms"]
+                self.stdout.write(
+                    f"  {name}: {calls} calls, {spent / calls:.2f}ms each"
+                )
@@ -0,0 +1,109 @@
+import random
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from social_media import timeline
+from social_media.models import Follow, TimelineEntry
+
+from ._bench import (
+    BULK_BATCH_SIZE,
+    api_client,
+    create_posts,
+    create_users,
+    format_stats,
+    measure,
+    rolled_back,
+    zipf_choices,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark /api/posts/feed/ on a synthetic skewed follow graph, "
+        "comparing pull-only reads with hybrid push/pull at several "
+        "follower thresholds. All data is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument(
+            "--follows",
+            type=int,
+            default=50,
+            help="Accounts followed by each user.",
+        )
+        parser.add_argument(
+            "--skew",
+            type=float,
+            default=1.1,
+            help="Zipf exponent of author popularity.",
+        )
+        parser.add_argument("--posts", type=int, default=5)
+        parser.add_argument("--readers", type=int, default=50)
+        parser.add_argument(
+            "--thresholds",
+            type=int,
+            nargs="+",
+            default=[50, 200, 1000, 10**9],
+        )
+
+    def handle(self, *args, **options):
+        random.seed(0)
+        with rolled_back():
+            self._run(options)
+
+    def _run(self, options):
+        users = create_users(options["users"], prefix="feedbench")
+        by_popularity = users[:]
+        random.shuffle(by_popularity)
+
+        follows = []
+        for user in users:
+            for author in zipf_choices(
+                by_popularity, options["follows"], options["skew"]
+            ):
+                if author is not user:
+                    follows.append(Follow(follower=user, following=author))
+        Follow.objects.bulk_create(follows, batch_size=BULK_BATCH_SIZE)
+        posts = create_posts(users, options["posts"])
+        readers = random.sample(users, min(options["readers"], len(users)))
+
+        self.stdout.write(
+            f"{len(users)} users, {len(follows)} follows, "
+            f"{len(posts)} posts, {len(readers)} readers sampled"
+        )
+
+        with override_settings(FEED_TIMELINE_ENABLED=False):
+            self._report("pull-only", readers)
+
+        for threshold in options["thresholds"]:
+            with override_settings(
+                FEED_TIMELINE_ENABLED=True,
+                FEED_FANOUT_FOLLOWER_THRESHOLD=threshold,
+            ):
+                TimelineEntry.objects.all().delete()
+                cache.delete(timeline.PULL_AUTHORS_CACHE_KEY)
+                pull_authors = timeline.refresh_pull_authors()
+
+                started = time.perf_counter()
+                for post in posts:
+                    timeline.fan_out(post.pk)
+                fan_out_seconds = time.perf_counter() - started
+
+                self.stdout.write(
+                    f"threshold={threshold}: {len(pull_authors)} pulled "
+                    f"authors, {TimelineEntry.objects.count()} timeline "
+                    f"rows, fan-out {fan_out_seconds:.1f}s"
+                )
+                self._report(f"threshold={threshold}", readers)
+
+    def _report(self, label: str, readers: list) -> None:
+        clients = [api_client(reader) for reader in readers]
+        stats = measure(
+            lambda: random.choice(clients).get("/api/posts/feed/"),
+            len(clients) * 3,
+        )
+        self.stdout.write(f"  {label:<24} {format_stats(stats)}")
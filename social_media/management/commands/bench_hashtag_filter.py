@@ -0,0 +1,102 @@
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from social_media.filters import PostFilter
+from social_media.models import Hashtag, Post
+
+from ._bench import (
+    BULK_BATCH_SIZE,
+    create_posts,
+    create_users,
+    format_stats,
+    measure,
+    rolled_back,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the legacy iexact hashtag filter with the normalized "
+        "exact-match filter on a large Hashtag table. All data is rolled "
+        "back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hashtags", type=int, default=2_000_000)
+        parser.add_argument("--posts", type=int, default=50_000)
+        parser.add_argument(
+            "--tags-per-post",
+            type=int,
+            default=3,
+        )
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        random.seed(0)
+        with rolled_back():
+            self._run(options)
+
+    def _run(self, options):
+        for start in range(0, options["hashtags"], BULK_BATCH_SIZE):
+            stop = min(start + BULK_BATCH_SIZE, options["hashtags"])
+            Hashtag.objects.bulk_create(
+                [Hashtag(name=f"benchtag{i}") for i in range(start, stop)]
+            )
+        hashtag_ids = list(
+            Hashtag.objects.filter(name__startswith="benchtag").values_list(
+                "pk", flat=True
+            )
+        )
+
+        authors = create_users(100, prefix="tagbench")
+        posts = create_posts(authors, options["posts"] // len(authors))
+        through = Post.hashtags.through
+        through.objects.bulk_create(
+            [
+                through(post_id=post.pk, hashtag_id=hashtag_id)
+                for post in posts
+                for hashtag_id in random.sample(
+                    hashtag_ids[:1000], options["tags_per_post"]
+                )
+            ],
+            batch_size=BULK_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                for model in (Hashtag, Post, through):
+                    cursor.execute(f"ANALYZE {model._meta.db_table}")
+
+        self.stdout.write(
+            f"{Hashtag.objects.count()} hashtags, {len(posts)} posts"
+        )
+        base = Post.published.select_related("user__profile")
+        ordering = ("-created_at", "-id")
+        value = "BenchTag7"
+
+        def legacy():
+            return list(
+                base.filter(hashtags__name__iexact=value).order_by(*ordering)[
+                    :11
+                ]
+            )
+
+        def normalized():
+            queryset = PostFilter({"hashtag": value}, queryset=base).qs
+            return list(queryset.order_by(*ordering)[:11])
+
+        if [post.pk for post in legacy()] != [
+            post.pk for post in normalized()
+        ]:
+            raise CommandError(
+                f"iexact and normalized filters disagree for {value!r}."
+            )
+        self.stdout.write(
+            "  iexact      " + format_stats(measure(legacy, options["repeat"]))
+        )
+        self.stdout.write(
+            "  normalized  "
+            + format_stats(measure(normalized, options["repeat"]))
+        )
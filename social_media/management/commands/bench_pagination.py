@@ -0,0 +1,93 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from social_media.models import Post
+from social_media.pagination import PostPagination
+
+from ._bench import (
+    create_posts,
+    create_users,
+    format_stats,
+    measure,
+    rolled_back,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare page-number and keyset pagination of the post list at "
+        "increasing depths. All data is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=50000)
+        parser.add_argument("--page-size", type=int, default=10)
+        parser.add_argument(
+            "--depths",
+            type=int,
+            nargs="+",
+            default=[1, 10, 100, 1000, 4000],
+            help="Page numbers to fetch.",
+        )
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self._run(options)
+
+    def _run(self, options):
+        authors = create_users(100, prefix="pagebench")
+        create_posts(authors, options["posts"] // len(authors))
+        page_size = options["page_size"]
+        factory = APIRequestFactory()
+
+        def queryset():
+            return Post.published.select_related("user__profile")
+
+        def page_number(page: int):
+            paginator = PageNumberPagination()
+            paginator.page_size = page_size
+            request = Request(factory.get("/api/posts/", {"page": page}))
+            return paginator.paginate_queryset(queryset(), request)
+
+        def keyset(cursor: str | None):
+            paginator = PostPagination()
+            params = {"limit": page_size}
+            if cursor:
+                params["after"] = cursor
+            request = Request(factory.get("/api/posts/", params))
+            return paginator.paginate_queryset(queryset(), request)
+
+        for depth in options["depths"]:
+            offset = (depth - 1) * page_size
+            if offset >= Post.published.count():
+                break
+            cursor = None
+            if offset:
+                boundary = queryset().order_by("-created_at", "-id")[
+                    offset - 1
+                ]
+                cursor = PostPagination().encode_cursor(boundary)
+
+            with CaptureQueriesContext(connection) as offset_queries:
+                page_number(depth)
+            with CaptureQueriesContext(connection) as keyset_queries:
+                keyset(cursor)
+
+            self.stdout.write(f"page {depth}:")
+            self.stdout.write(
+                f"  offset  {len(offset_queries)} queries  "
+                + format_stats(
+                    measure(lambda: page_number(depth), options["repeat"])
+                )
+            )
+            self.stdout.write(
+                f"  keyset  {len(keyset_queries)} queries  "
+                + format_stats(
+                    measure(lambda: keyset(cursor), options["repeat"])
+                )
+            )
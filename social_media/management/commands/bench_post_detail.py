@@ -0,0 +1,93 @@
+import random
+import tracemalloc
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from social_media.models import Comment, Post
+from social_media.serializers import CommentSerializer, PostSerializer
+
+from ._bench import (
+    BULK_BATCH_SIZE,
+    api_client,
+    create_posts,
+    create_users,
+    format_stats,
+    measure,
+    rolled_back,
+)
+
+
+class LegacyPostDetailSerializer(PostSerializer):
+    """The detail serializer as it was, embedding every comment."""
+
+    comments = CommentSerializer(read_only=True, many=True)
+
+    class Meta(PostSerializer.Meta):
+        fields = PostSerializer.Meta.fields + ("comments",)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare latency, peak memory and response size of the post "
+        "detail endpoint with embedded comments against the old "
+        "embed-everything serializer. All data is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--comments", type=int, default=20000)
+        parser.add_argument("--commenters", type=int, default=2000)
+        parser.add_argument("--repeat", type=int, default=10)
+
+    def handle(self, *args, **options):
+        random.seed(0)
+        with rolled_back():
+            self._run(options)
+
+    def _run(self, options):
+        users = create_users(options["commenters"], prefix="detailbench")
+        (post,) = create_posts(users[:1], 1)
+        Comment.objects.bulk_create(
+            [
+                Comment(user=random.choice(users), post=post, text=f"c{i}")
+                for i in range(options["comments"])
+            ],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        Post.objects.filter(pk=post.pk).update(
+            comments_count=options["comments"]
+        )
+        client = api_client(users[0])
+        url = f"/api/posts/{post.pk}/"
+
+        def legacy():
+            instance = Post.objects.prefetch_related(
+                "comments__user__profile"
+            ).get(pk=post.pk)
+            return JSONRenderer().render(
+                LegacyPostDetailSerializer(instance).data
+            )
+
+        def cold():
+            cache.clear()
+            return client.get(url).content
+
+        def warm():
+            return client.get(url).content
+
+        self.stdout.write(f"post with {options['comments']} comments")
+        for label, fn in (
+            ("legacy", legacy),
+            ("preview (cold)", cold),
+            ("preview (warm)", warm),
+        ):
+            tracemalloc.start()
+            size = len(fn())
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            stats = measure(fn, options["repeat"])
+            self.stdout.write(
+                f"  {label:<15} {format_stats(stats)}  "
+                f"peak={peak / 2**20:7.2f}MiB  body={size / 1024:9.1f}KiB"
+            )
@@ -0,0 +1,125 @@
+import random
+from itertools import accumulate
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from social_media.models import Post
+
+from ._bench import (
+    api_client,
+    create_posts,
+    create_users,
+    format_stats,
+    measure,
+    rolled_back,
+)
+
+SYLLABLES = "ka lo mi ren tas vo zu per dan shi bor ell fin gu hap nu".split()
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure /api/posts/search/ latency for rare, common and combined "
+        "terms over a large synthetic corpus, against a naive icontains "
+        "scan. All data is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=1_000_000)
+        parser.add_argument("--vocabulary", type=int, default=20000)
+        parser.add_argument("--words-per-post", type=int, default=12)
+        parser.add_argument(
+            "--depth",
+            type=int,
+            default=5,
+            help="Page to fetch by following next links.",
+        )
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        random.seed(0)
+        with rolled_back():
+            self._run(options)
+
+    def _run(self, options):
+        vocabulary = self._vocabulary(options["vocabulary"])
+        # Zipf-like word frequencies, as in natural text.
+        cum_weights = list(
+            accumulate(1 / rank for rank in range(1, len(vocabulary) + 1))
+        )
+        words = options["words_per_post"]
+
+        def content(i: int) -> str:
+            return " ".join(
+                random.choices(vocabulary, cum_weights=cum_weights, k=words)
+            )
+
+        authors = create_users(200, prefix="searchbench")
+        create_posts(
+            authors, options["posts"] // len(authors), content=content
+        )
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(f"ANALYZE {Post._meta.db_table}")
+        self.stdout.write(f"{Post.objects.count()} posts")
+
+        client = api_client(authors[0])
+        queries = {
+            "common": vocabulary[0],
+            "mid": vocabulary[100],
+            "rare": vocabulary[-1],
+            "two terms": f"{vocabulary[10]} {vocabulary[50]}",
+            "phrase": f'"{vocabulary[0]} {vocabulary[1]}"',
+        }
+        for label, text in queries.items():
+            first = client.get("/api/posts/search/", {"q": text})
+            self.stdout.write(
+                f"{label} ({text!r}, "
+                f"{len(first.data['results'])} results on page 1)"
+            )
+            self.stdout.write(
+                "  page 1      "
+                + format_stats(
+                    measure(
+                        lambda: client.get("/api/posts/search/", {"q": text}),
+                        options["repeat"],
+                    )
+                )
+            )
+            deep_url, page = first.data["next"], 2
+            while deep_url and page < options["depth"]:
+                deep_url, page = client.get(deep_url).data["next"], page + 1
+            if deep_url:
+                self.stdout.write(
+                    f"  page {page:<6} "
+                    + format_stats(
+                        measure(
+                            lambda: client.get(deep_url), options["repeat"]
+                        )
+                    )
+                )
+
+        rare = queries["rare"]
+        self.stdout.write(f"naive icontains ({rare!r})")
+        self.stdout.write(
+            "  page 1      "
+            + format_stats(
+                measure(
+                    lambda: list(
+                        Post.objects.filter(content__icontains=rare).order_by(
+                            "-created_at", "-id"
+                        )[:11]
+                    ),
+                    max(1, options["repeat"] // 4),
+                )
+            )
+        )
+
+    def _vocabulary(self, size: int) -> list[str]:
+        words = set()
+        while len(words) < size:
+            words.add(
+                "".join(random.choices(SYLLABLES, k=random.randint(2, 4)))
+            )
+        return sorted(words, key=lambda word: random.random())
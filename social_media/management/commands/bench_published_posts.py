@@ -0,0 +1,155 @@
+import json
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models
+from django.utils import timezone
+
+from social_media.models import Post
+from social_media.pagination import PostPagination
+
+from ._bench import (
+    create_posts,
+    create_users,
+    format_stats,
+    measure,
+    rolled_back,
+)
+
+PARTIAL_INDEXES = ("post_pub_created_id_idx", "post_pub_user_created_idx")
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare published post pages on the partial indexes with the "
+        "full indexes they replaced, with a high share of drafts. "
+        "Requires PostgreSQL. The data and the index swap are rolled "
+        "back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=100000)
+        parser.add_argument(
+            "--draft-ratio",
+            type=float,
+            default=0.9,
+            help="Share of the seeded posts that are scheduled drafts.",
+        )
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError(
+                "Published post pages can only be benchmarked on PostgreSQL."
+            )
+        random.seed(0)
+        with rolled_back():
+            self._run(
+                options["posts"], options["draft_ratio"], options["repeat"]
+            )
+
+    def _run(self, post_count: int, draft_ratio: float, repeat: int) -> None:
+        authors = create_users(100, prefix="draftbench")
+        drafts = int(post_count * draft_ratio) // len(authors)
+        create_posts(authors, post_count // len(authors) - drafts)
+        create_posts(
+            authors,
+            drafts,
+            is_published=False,
+            scheduled_at=timezone.now() + timedelta(days=1),
+        )
+        self._analyze()
+        self.stdout.write(
+            f"{Post.objects.count()} posts, "
+            f"{Post.published.count()} published"
+        )
+
+        leaked = sum(
+            not post.is_published
+            for post in Post.objects.order_by("-created_at", "-id")[:10]
+        )
+        self.stdout.write(
+            f"drafts on the first page without the published filter: "
+            f"{leaked}/10"
+        )
+
+        cases = self._cases(authors[0])
+        results = {label: [self._sample(qs, repeat)] for label, qs in cases}
+        self._use_full_indexes()
+        for label, queryset in cases:
+            results[label].insert(0, self._sample(queryset, repeat))
+
+        for label, samples in results.items():
+            self.stdout.write(label)
+            for name, (stats, rows, blocks) in zip(
+                ("full index   ", "partial index"), samples
+            ):
+                self.stdout.write(
+                    f"  {name}  {format_stats(stats)}  "
+                    f"rows read={rows:6d}  blocks={blocks:6d}"
+                )
+
+    def _cases(self, author) -> list[tuple[str, models.QuerySet]]:
+        paginator = PostPagination()
+        ordered = Post.published.order_by(*paginator.ordering)
+        # Keyset position of page 100 at the default page size of 10.
+        boundary = ordered[99 * 10 - 1]
+        return [
+            ("first page", ordered[:11]),
+            (
+                "page 100",
+                ordered.filter(
+                    paginator.filter_after((boundary.created_at, boundary.pk))
+                )[:11],
+            ),
+            ("author page", ordered.filter(user=author)[:11]),
+        ]
+
+    def _sample(self, queryset, repeat: int) -> tuple[dict, int, int]:
+        """Latency stats plus table rows read and buffers touched."""
+        plan = json.loads(
+            queryset.explain(analyze=True, buffers=True, format="json")
+        )[0]["Plan"]
+        stats = measure(lambda: list(queryset.all()), repeat)
+        blocks = plan.get("Shared Hit Blocks", 0) + plan.get(
+            "Shared Read Blocks", 0
+        )
+        return stats, self._rows_read(plan), blocks
+
+    def _rows_read(self, plan: dict) -> int:
+        rows = 0
+        if "Relation Name" in plan:
+            rows += (
+                plan["Actual Rows"] + plan.get("Rows Removed by Filter", 0)
+            ) * plan["Actual Loops"]
+        for child in plan.get("Plans", []):
+            rows += self._rows_read(child)
+        return rows
+
+    def _use_full_indexes(self) -> None:
+        """
+        Swap the partial indexes for the unconditional ones they replaced,
+        so reads have to skip drafts while walking the index.
+        """
+        with connection.cursor() as cursor:
+            # Deferred foreign key checks of the seeded rows would block
+            # ALTER TABLE in the same transaction.
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        with connection.schema_editor() as editor:
+            for index in Post._meta.indexes:
+                if index.name not in PARTIAL_INDEXES:
+                    continue
+                editor.remove_index(Post, index)
+                editor.add_index(
+                    Post,
+                    models.Index(
+                        fields=index.fields,
+                        name=index.name.replace("_pub_", "_full_"),
+                    ),
+                )
+        self._analyze()
+
+    def _analyze(self) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Post._meta.db_table}")
@@ -0,0 +1,271 @@
+import json
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, QuerySet
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from social_media import timeline
+from social_media.models import (
+    Comment,
+    Follow,
+    Hashtag,
+    Like,
+    Post,
+    TimelineEntry,
+    User,
+)
+from social_media.views import CommentViewSet, PostViewSet
+
+from ._bench import BULK_BATCH_SIZE, create_posts, create_users, rolled_back
+
+SEED_TABLES = (
+    Post,
+    Comment,
+    Like,
+    Follow,
+    Hashtag,
+    Post.hashtags.through,
+    TimelineEntry,
+    User,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the querysets behind the hot API endpoints and fail if a "
+        "plan sequentially scans, or sorts, a table with at least "
+        "--min-rows rows. Requires PostgreSQL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-rows",
+            type=int,
+            default=10000,
+            help="Tables smaller than this may be scanned or sorted.",
+        )
+        parser.add_argument(
+            "--seed",
+            action="store_true",
+            help="Seed synthetic data first; it is rolled back afterwards.",
+        )
+        parser.add_argument(
+            "--posts",
+            type=int,
+            default=100000,
+            help="Number of posts to seed with --seed.",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError(
+                "Query plans can only be checked on PostgreSQL."
+            )
+
+        if options["seed"]:
+            with rolled_back():
+                self._seed(options["posts"])
+                violations = self._check(options["min_rows"])
+        else:
+            violations = self._check(options["min_rows"])
+
+        if violations:
+            raise CommandError(
+                "Query plan regressions:\n" + "\n".join(violations)
+            )
+        self.stdout.write(self.style.SUCCESS("All query plans are indexed."))
+
+    def _seed(self, post_count: int) -> None:
+        random.seed(0)
+        users = create_users(max(post_count // 50, 100), prefix="plancheck")
+        posts = create_posts(users, max(post_count // len(users), 1))
+
+        Follow.objects.bulk_create(
+            [
+                Follow(follower=user, following=author)
+                for user in users
+                for author in random.sample(users, 50)
+                if author is not user
+            ],
+            batch_size=BULK_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        Like.objects.bulk_create(
+            [
+                Like(user=random.choice(users), post=post)
+                for post in posts
+                for _ in range(2)
+            ],
+            batch_size=BULK_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        Comment.objects.bulk_create(
+            [Comment(user=random.choice(users), post=post) for post in posts],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        hashtags = Hashtag.objects.bulk_create(
+            [Hashtag(name=f"plancheck{i}") for i in range(1000)]
+        )
+        Post.hashtags.through.objects.bulk_create(
+            [
+                Post.hashtags.through(
+                    post_id=post.pk, hashtag_id=random.choice(hashtags).pk
+                )
+                for post in posts
+            ],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        for user in users[:100]:
+            timeline.rebuild(user.pk)
+
+        with connection.cursor() as cursor:
+            for model in SEED_TABLES:
+                cursor.execute(f"ANALYZE {model._meta.db_table}")
+
+    def _check(self, min_rows: int) -> list[str]:
+        table_rows = self._table_rows()
+        violations = []
+        for name, queryset in self._hot_querysets():
+            plan = json.loads(queryset.explain(format="json"))[0]["Plan"]
+            for problem in self._plan_problems(plan, table_rows, min_rows):
+                violations.append(f"{name}: {problem}")
+            self.stdout.write(f"checked {name}")
+        return violations
+
+    def _table_rows(self) -> dict[str, int]:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT relname, reltuples::bigint FROM pg_class "
+                "WHERE relkind IN ('r', 'p')"
+            )
+            return dict(cursor.fetchall())
+
+    def _plan_problems(
+        self, plan: dict, table_rows: dict[str, int], min_rows: int
+    ) -> list[str]:
+        problems = []
+        node_type = plan["Node Type"]
+        relation = plan.get("Relation Name")
+        if node_type == "Seq Scan" and table_rows.get(relation, 0) >= min_rows:
+            problems.append(
+                f"sequential scan on {relation} "
+                f"({table_rows[relation]} rows)"
+            )
+        if node_type in ("Sort", "Incremental Sort") and (
+            plan["Plan Rows"] >= min_rows
+        ):
+            problems.append(
+                f"sort of ~{plan['Plan Rows']} rows "
+                f"on {', '.join(plan.get('Sort Key', []))}"
+            )
+        for child in plan.get("Plans", []):
+            problems.extend(self._plan_problems(child, table_rows, min_rows))
+        return problems
+
+    def _hot_querysets(self) -> list[tuple[str, QuerySet]]:
+        user = (
+            User.objects.annotate(following_total=Count("following"))
+            .order_by("-following_total")
+            .first()
+        )
+        post = Post.objects.order_by("-comments_count").first()
+        hashtag = Hashtag.objects.order_by("pk").first()
+        if user is None or post is None:
+            raise CommandError("No data to check; run with --seed.")
+
+        querysets = [
+            ("posts.list", self._page(PostViewSet, "list", user)),
+            ("posts.liked", self._page(PostViewSet, "liked", user)),
+            (
+                "posts.list deep page",
+                self._page(PostViewSet, "list", user, depth=1000),
+            ),
+            (
+                "comments.list",
+                self._page(
+                    CommentViewSet, "list", user, kwargs={"post_pk": post.pk}
+                ),
+            ),
+            (
+                "users.followers",
+                Follow.objects.filter(following=user).order_by(
+                    "-created_at", "-id"
+                )[:11],
+            ),
+            (
+                "users.following",
+                Follow.objects.filter(follower=user).order_by(
+                    "-created_at", "-id"
+                )[:11],
+            ),
+            (
+                "likes.exists",
+                Like.objects.filter(user=user, post=post),
+            ),
+            ("post.likes", Like.objects.filter(post=post)),
+            (
+                "posts.scheduled due",
+                Post.objects.filter(
+                    is_published=False, scheduled_at__lte=timezone.now()
+                )
+                .order_by("scheduled_at")
+                .values("pk")[:500],
+            ),
+        ]
+        if hashtag is not None:
+            querysets.append(
+                (
+                    "posts.list?hashtag",
+                    self._page(
+                        PostViewSet,
+                        "list",
+                        user,
+                        params={"hashtag": hashtag.name},
+                    ),
+                )
+            )
+        for enabled in (False, True):
+            with override_settings(FEED_TIMELINE_ENABLED=enabled):
+                querysets.append(
+                    (
+                        f"posts.feed (timeline={enabled})",
+                        self._page(PostViewSet, "feed", user),
+                    )
+                )
+        return querysets
+
+    def _page(
+        self,
+        viewset_class,
+        action: str,
+        user,
+        kwargs: dict | None = None,
+        params: dict | None = None,
+        depth: int = 0,
+    ) -> QuerySet:
+        """Build the queryset a viewset action would paginate."""
+        request = Request(APIRequestFactory().get("/", params or {}))
+        request.user = user
+        view = viewset_class(
+            action=action,
+            request=request,
+            args=(),
+            kwargs=kwargs or {},
+            format_kwarg=None,
+        )
+        paginator = view.paginator
+        queryset = view.filter_queryset(view.get_queryset())
+        ordered = queryset.order_by(*paginator.ordering)
+        if depth:
+            boundary = ordered[depth * paginator.page_size]
+            ordered = ordered.filter(
+                paginator.filter_after(
+                    (getattr(boundary, paginator.key_field), boundary.pk)
+                )
+            )
+        return ordered[: paginator.page_size + 1]
@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from social_media import trending
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the trending hashtag buckets from post history and "
+        "refresh the cached trending list."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=7,
+            help="How far back to rebuild buckets.",
+        )
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(days=options["days"])
+        with transaction.atomic():
+            rebuilt = trending.rebuild(since)
+        trending.refresh()
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {rebuilt} hashtag buckets.")
+        )
@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from social_media import timeline
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild materialized home timelines from the follow graph. "
+        "Run once before enabling FEED_TIMELINE_ENABLED."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            type=int,
+            action="append",
+            dest="user_ids",
+            help="Only rebuild the timeline of this user id (repeatable).",
+        )
+
+    def handle(self, *args, **options):
+        user_ids = (
+            options["user_ids"]
+            or User.objects.order_by("pk")
+            .values_list("pk", flat=True)
+            .iterator()
+        )
+
+        rebuilt = 0
+        for user_id in user_ids:
+            with transaction.atomic():
+                timeline.rebuild(user_id)
+            rebuilt += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} timelines."))
@@ -0,0 +1,87 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import (
+    Count,
+    F,
+    IntegerField,
+    OuterRef,
+    Q,
+    Subquery,
+)
+from django.db.models.functions import Coalesce
+
+from social_media.models import Post, Like, Comment
+
+
+def count_for(model) -> Coalesce:
+    """Correlated subquery counting `model` rows for the outer post."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(post=OuterRef("pk"))
+            .order_by()
+            .values("post")
+            .annotate(total=Count("pk"))
+            .values("total"),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Post.likes_count and Post.comments_count from the "
+        "Like and Comment tables and fix any drifted rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of posts checked per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_pk = 0
+        checked = fixed = 0
+
+        while True:
+            batch_ids = list(
+                Post.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not batch_ids:
+                break
+            last_pk = batch_ids[-1]
+            checked += len(batch_ids)
+
+            with transaction.atomic():
+                drifted = list(
+                    Post.objects.filter(pk__in=batch_ids)
+                    .select_for_update()
+                    .annotate(
+                        actual_likes=count_for(Like),
+                        actual_comments=count_for(Comment),
+                    )
+                    .filter(
+                        ~Q(likes_count=F("actual_likes"))
+                        | ~Q(comments_count=F("actual_comments"))
+                    )
+                    .only("pk", "likes_count", "comments_count")
+                )
+                for post in drifted:
+                    post.likes_count = post.actual_likes
+                    post.comments_count = post.actual_comments
+                Post.objects.bulk_update(
+                    drifted, ["likes_count", "comments_count"]
+                )
+            fixed += len(drifted)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Checked {checked} posts, fixed {fixed} drifted counters."
+            )
+        )
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from social_media.hashtags import index_pending_posts
+from social_media.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Index hashtags of posts flagged as dirty, e.g. after a bulk "
+        "import. Idempotent; --all re-indexes every post."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Flag every post for re-indexing first.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if options["all"]:
+            last_pk = Post.objects.aggregate(last=Max("pk"))["last"] or 0
+            for start in range(0, last_pk, batch_size):
+                Post.objects.filter(
+                    pk__gt=start, pk__lte=start + batch_size
+                ).update(hashtags_dirty=True)
+
+        indexed = index_pending_posts(batch_size)
+        self.stdout.write(
+            self.style.SUCCESS(f"Indexed hashtags of {indexed} posts.")
+        )
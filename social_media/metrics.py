@@ -0,0 +1,51 @@
+"""
+Lightweight counters and gauges stored in the default cache, so web and
+Celery processes report into one place once the cache is shared.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from django.core.cache import cache
+
+KEY_PREFIX = "metrics:"
+
+_registry: set[str] = set()
+
+
+def register(*names: str) -> None:
+    """Declare metric names so they show up in `snapshot()`."""
+    _registry.update(names)
+
+
+def incr(name: str, amount: int = 1) -> None:
+    key = KEY_PREFIX + name
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        # The key was evicted between add() and incr().
+        cache.set(key, amount, timeout=None)
+
+
+def set_gauge(name: str, value: float) -> None:
+    cache.set(KEY_PREFIX + name, value, timeout=None)
+
+
+@contextmanager
+def timer(name: str) -> Iterator[None]:
+    """Record call count and total milliseconds spent in the block."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        incr(f"{name}.count")
+        incr(f"{name}.total_ms", round(elapsed_ms))
+
+
+def snapshot() -> dict[str, float]:
+    names = sorted(_registry)
+    values = cache.get_many([KEY_PREFIX + name for name in names])
+    return {name: values.get(KEY_PREFIX + name, 0) for name in names}
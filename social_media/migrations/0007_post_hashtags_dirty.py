@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-17 06:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("social_media", "0006_hot_query_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="hashtags_dirty",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                condition=models.Q(("hashtags_dirty", True)),
+                fields=["id"],
+                name="post_hashtags_dirty_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,56 @@
+from django.db import migrations
+
+USER_TABLE = "social_media_user"
+
+PREFIX_INDEX = (
+    "CREATE INDEX IF NOT EXISTS user_username_prefix_idx "
+    f'ON {USER_TABLE} ((UPPER(username::text)) COLLATE "C")'
+)
+TRIGRAM_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS user_username_trgm_idx "
+    f"ON {USER_TABLE} USING gin ((UPPER(username::text)) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS user_email_trgm_idx "
+    f"ON {USER_TABLE} USING gin ((UPPER(email::text)) gin_trgm_ops)",
+)
+INDEX_NAMES = (
+    "user_username_prefix_idx",
+    "user_username_trgm_idx",
+    "user_email_trgm_idx",
+)
+
+
+def create_search_indexes(apps, schema_editor):
+    """
+    PostgreSQL only. The trigram indexes are skipped when the pg_trgm
+    extension is not available on the server.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(PREFIX_INDEX)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        )
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for statement in TRIGRAM_INDEXES:
+        schema_editor.execute(statement)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name in INDEX_NAMES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("social_media", "0008_hashtagbucket"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.6 on 2026-10-17 06:14
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+POST_TABLE = "social_media_post"
+
+# The text search configuration must match SEARCH_CONFIG in
+# social_media/search.py.
+CREATE_TRIGGER = (
+    "CREATE TRIGGER post_search_vector_update "
+    f"BEFORE INSERT OR UPDATE OF content ON {POST_TABLE} "
+    "FOR EACH ROW EXECUTE FUNCTION tsvector_update_trigger("
+    "search_vector, 'pg_catalog.english', content)"
+)
+BACKFILL = (
+    f"UPDATE {POST_TABLE} "
+    "SET search_vector = to_tsvector('pg_catalog.english', content)"
+)
+CREATE_INDEX = (
+    "CREATE INDEX post_search_vector_idx "
+    f"ON {POST_TABLE} USING gin (search_vector)"
+)
+
+
+def create_search_trigger(apps, schema_editor):
+    """
+    PostgreSQL only. Other databases leave the column empty and search
+    through the in-process fallback index.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(CREATE_TRIGGER)
+    schema_editor.execute(BACKFILL)
+    schema_editor.execute(CREATE_INDEX)
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS post_search_vector_idx")
+    schema_editor.execute(
+        f"DROP TRIGGER IF EXISTS post_search_vector_update ON {POST_TABLE}"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("social_media", "0009_user_search_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(create_search_trigger, drop_search_trigger),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-17 07:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("social_media", "0010_post_search_vector"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="follow",
+            name="follow_following_created_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="follow",
+            name="follow_follower_created_idx",
+        ),
+        migrations.AddIndex(
+            model_name="follow",
+            index=models.Index(
+                fields=["following", "-created_at", "-id"],
+                name="follow_following_keyset_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="follow",
+            index=models.Index(
+                fields=["follower", "-created_at", "-id"],
+                name="follow_follower_keyset_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-17 07:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("social_media", "0011_follow_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                condition=models.Q(("is_published", False)),
+                fields=["scheduled_at"],
+                name="post_scheduled_unpub_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-17 07:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("social_media", "0012_scheduled_posts_index"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="post",
+            name="post_created_id_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="post",
+            name="post_user_created_id_idx",
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                condition=models.Q(("is_published", True)),
+                fields=["-created_at", "-id"],
+                name="post_pub_created_id_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                condition=models.Q(("is_published", True)),
+                fields=["user", "-created_at", "-id"],
+                name="post_pub_user_created_idx",
+            ),
+        ),
+    ]
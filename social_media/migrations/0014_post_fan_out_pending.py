@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-17 09:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("social_media", "0013_published_post_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="fan_out_pending",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                condition=models.Q(("fan_out_pending", True)),
+                fields=["id"],
+                name="post_fan_out_pending_idx",
+            ),
+        ),
+    ]
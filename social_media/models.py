@@ -3,6 +3,7 @@ import uuid
 
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 
@@ -52,6 +53,13 @@ class Profile(models.Model):
         return f"{self.user.username}'s Profile"
 
 
+class PublishedPostManager(models.Manager):
+    """Posts visible to everyone, i.e. not waiting for their schedule."""
+
+    def get_queryset(self) -> models.QuerySet:
+        return super().get_queryset().filter(is_published=True)
+
+
 class Post(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -66,6 +74,13 @@ class Post(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     scheduled_at = models.DateTimeField(blank=True, null=True)
     is_published = models.BooleanField(default=True)
+    likes_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+    hashtags_dirty = models.BooleanField(default=False)
+    # Published by the scheduler, not yet queued for timeline fan-out.
+    fan_out_pending = models.BooleanField(default=False)
+    # Maintained by a database trigger on PostgreSQL, unused elsewhere.
+    search_vector = SearchVectorField(null=True, editable=False)
 
     likes = models.ManyToManyField(
         settings.AUTH_USER_MODEL,
@@ -80,8 +95,39 @@ class Post(models.Model):
         related_name="posts",
     )
 
+    objects = models.Manager()
+    published = PublishedPostManager()
+
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Reads go through Post.published; drafts stay out of these.
+            models.Index(
+                fields=["-created_at", "-id"],
+                condition=models.Q(is_published=True),
+                name="post_pub_created_id_idx",
+            ),
+            models.Index(
+                fields=["user", "-created_at", "-id"],
+                condition=models.Q(is_published=True),
+                name="post_pub_user_created_idx",
+            ),
+            models.Index(
+                fields=["id"],
+                condition=models.Q(hashtags_dirty=True),
+                name="post_hashtags_dirty_idx",
+            ),
+            models.Index(
+                fields=["scheduled_at"],
+                condition=models.Q(is_published=False),
+                name="post_scheduled_unpub_idx",
+            ),
+            models.Index(
+                fields=["id"],
+                condition=models.Q(fan_out_pending=True),
+                name="post_fan_out_pending_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return (
@@ -109,6 +155,16 @@ class Follow(models.Model):
                 fields=["follower", "following"], name="unique_follow"
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=["following", "-created_at", "-id"],
+                name="follow_following_keyset_idx",
+            ),
+            models.Index(
+                fields=["follower", "-created_at", "-id"],
+                name="follow_follower_keyset_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.follower.username} follows {self.following.username}"
@@ -131,6 +187,12 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ["created_at"]
+        indexes = [
+            models.Index(
+                fields=["post", "created_at", "id"],
+                name="comment_post_created_id_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"Comment by {self.user.username} on post {self.post.id}"
@@ -146,13 +208,79 @@ class Like(models.Model):
     class Meta:
         unique_together = ["user", "post"]
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["post", "user"], name="like_post_user_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"Like by {self.user.username} on post {self.post.id}"
 
 
+class TimelineEntry(models.Model):
+    """
+    Precomputed home-timeline row: `post` appears in `user`'s feed.
+    `created_at` mirrors the post's timestamp so feeds page over the
+    (user, created_at) index without touching the Post table.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries",
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries",
+    )
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["-created_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "post"], name="unique_timeline_entry"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "-created_at"],
+                name="timeline_user_created_idx",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"Post {self.post_id} in {self.user_id}'s timeline"
+
+
 class Hashtag(models.Model):
     name = models.CharField(max_length=100, unique=True)
 
     def __str__(self) -> str:
         return f"#{self.name}"
+
+
+class HashtagBucket(models.Model):
+    """Number of posts using a hashtag within one time bucket."""
+
+    hashtag = models.ForeignKey(
+        Hashtag, on_delete=models.CASCADE, related_name="buckets"
+    )
+    bucket_start = models.DateTimeField()
+    posts_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["hashtag", "bucket_start"],
+                name="unique_hashtag_bucket",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["bucket_start"], name="hashtag_bucket_start_idx"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.hashtag} at {self.bucket_start}: {self.posts_count}"
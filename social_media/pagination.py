@@ -0,0 +1,264 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Model, Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset pagination over a (sort key, id) ordering.
+
+    Pages are selected with a `WHERE (key, id) < cursor` range instead of
+    OFFSET and no COUNT query is issued, so every page costs the same no
+    matter how deep it is.
+
+    Query parameters:
+        after     opaque cursor, returns the page following it
+        before    opaque cursor, returns the page preceding it
+        since_id  only return rows with a larger id (polling for new items)
+        limit     page size, capped at `max_page_size`
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    after_query_param = "after"
+    before_query_param = "before"
+    since_id_query_param = "since_id"
+    page_size_query_param = "limit"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(
+        self, queryset: QuerySet, request: Request, view=None
+    ) -> list[Model]:
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        queryset = self.filter_since_id(queryset, request)
+
+        before = self.decode_cursor(
+            request, self.before_query_param, queryset.model
+        )
+        after = self.decode_cursor(
+            request, self.after_query_param, queryset.model
+        )
+
+        if before is not None and after is None:
+            rows = list(
+                queryset.filter(self.filter_before(before)).order_by(
+                    *self._reversed_ordering()
+                )[: self.page_size + 1]
+            )
+            self.has_previous = len(rows) > self.page_size
+            self.has_next = True
+            rows = rows[: self.page_size]
+            rows.reverse()
+        else:
+            if after is not None:
+                queryset = queryset.filter(self.filter_after(after))
+            rows = list(
+                queryset.order_by(*self.ordering)[: self.page_size + 1]
+            )
+            self.has_next = len(rows) > self.page_size
+            self.has_previous = after is not None
+            rows = rows[: self.page_size]
+
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request: Request) -> int:
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(requested, self.max_page_size))
+
+    def filter_since_id(
+        self, queryset: QuerySet, request: Request
+    ) -> QuerySet:
+        """Apply the since_id parameter, if given."""
+        since_id = request.query_params.get(self.since_id_query_param)
+        if since_id is None:
+            return queryset
+        if not since_id.isdigit():
+            raise NotFound(self.invalid_cursor_message)
+        return queryset.filter(id__gt=int(since_id))
+
+    def get_positions(
+        self, request: Request, model: type[Model]
+    ) -> tuple[tuple | None, tuple | None]:
+        """
+        Return the (key, id) positions a page starts after and, for
+        backward pages only, ends before, as paginate_queryset reads
+        them, so callers that assemble rows themselves can bound their
+        reads.
+        """
+        after = self.decode_cursor(request, self.after_query_param, model)
+        if after is not None:
+            return after, None
+        return None, self.decode_cursor(
+            request, self.before_query_param, model
+        )
+
+    @property
+    def key_field(self) -> str:
+        return self.ordering[0].lstrip("-")
+
+    def _descending(self) -> bool:
+        return self.ordering[0].startswith("-")
+
+    def _reversed_ordering(self) -> tuple[str, ...]:
+        return tuple(
+            field[1:] if field.startswith("-") else f"-{field}"
+            for field in self.ordering
+        )
+
+    def filter_after(self, position: tuple) -> Q:
+        """Rows after `position` in list order."""
+        lookup = "lt" if self._descending() else "gt"
+        return self._range(position, lookup)
+
+    def filter_before(self, position: tuple) -> Q:
+        """Rows before `position` in list order."""
+        lookup = "gt" if self._descending() else "lt"
+        return self._range(position, lookup)
+
+    def _range(self, position: tuple, lookup: str) -> Q:
+        key, pk = position
+        return Q(**{f"{self.key_field}__{lookup}": key}) | Q(
+            **{self.key_field: key, f"id__{lookup}": pk}
+        )
+
+    def decode_cursor(
+        self, request: Request, param: str, model: type[Model]
+    ) -> tuple | None:
+        encoded = request.query_params.get(param)
+        if not encoded:
+            return None
+        try:
+            key, pk = json.loads(
+                base64.urlsafe_b64decode(encoded.encode("ascii"))
+            )
+            try:
+                key = model._meta.get_field(self.key_field).to_python(key)
+            except FieldDoesNotExist:
+                pass
+            return key, int(pk)
+        except (
+            TypeError,
+            ValueError,
+            UnicodeError,
+            binascii.Error,
+            ValidationError,
+        ):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row: Model) -> str:
+        key = getattr(row, self.key_field)
+        if isinstance(key, datetime):
+            # Keep full microsecond precision, unlike DjangoJSONEncoder.
+            key = key.isoformat()
+        return base64.urlsafe_b64encode(
+            json.dumps([key, row.pk]).encode("ascii")
+        ).decode("ascii")
+
+    def get_next_link(self) -> str | None:
+        if not self.has_next or not self.page:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.before_query_param
+        )
+        return replace_query_param(
+            url, self.after_query_param, self.encode_cursor(self.page[-1])
+        )
+
+    def get_previous_link(self) -> str | None:
+        if not self.has_previous or not self.page:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.after_query_param
+        )
+        return replace_query_param(
+            url, self.before_query_param, self.encode_cursor(self.page[0])
+        )
+
+    def get_paginated_response(self, data: list) -> Response:
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema: dict) -> dict:
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {
+                    "type": "string",
+                    "nullable": True,
+                    "format": "uri",
+                },
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view) -> list[dict]:
+        return [
+            {
+                "name": self.after_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Cursor of the page to continue after.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.before_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Cursor of the page to go back from.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.since_id_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Only return items with a greater id.",
+                "schema": {"type": "integer"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of results to return per page.",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+
+class PostPagination(KeysetPagination):
+    ordering = ("-created_at", "-id")
+
+
+class CommentPagination(KeysetPagination):
+    ordering = ("created_at", "id")
+
+
+class FollowPagination(KeysetPagination):
+    ordering = ("-created_at", "-id")
+
+
+class PostSearchPagination(KeysetPagination):
+    ordering = ("-rank", "-id")
@@ -0,0 +1,221 @@
+"""
+Idempotent like and follow writes.
+
+On PostgreSQL each call is one statement: the targets are locked in id
+order, the rows are written with INSERT ... ON CONFLICT DO NOTHING or
+DELETE, and RETURNING tells which targets changed. likes_count moves in
+the same statement. Nothing is read up front, and concurrent duplicate
+requests cannot fail with IntegrityError. Other databases get the same
+results from a savepoint per row.
+
+Each function takes a list of target ids and returns {target id: changed}
+for the targets that exist; missing targets are left out. Likes only
+see published posts and the user's own drafts, like post retrieval.
+Bulk writes skip model signals, so cache versions are invalidated here.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import caching
+from .models import Follow, Like, Post
+
+User = get_user_model()
+
+
+def _quote(model, field: str | None = None) -> str:
+    if field is None:
+        return connection.ops.quote_name(model._meta.db_table)
+    return connection.ops.quote_name(model._meta.get_field(field).column)
+
+
+def _execute(sql: str, params: list) -> dict[int, bool]:
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return dict(cursor.fetchall())
+
+
+def _like_sql(insert: bool) -> str:
+    post, like = _quote(Post), _quote(Like)
+    post_id, user_id = _quote(Like, "post"), _quote(Like, "user")
+    likes_count = _quote(Post, "likes_count")
+    is_published = _quote(Post, "is_published")
+    author_id = _quote(Post, "user")
+    if insert:
+        write = (
+            f"INSERT INTO {like} ({user_id}, {post_id}, "
+            f"{_quote(Like, 'created_at')}) "
+            f"SELECT %s, id, %s FROM target "
+            f"ON CONFLICT ({user_id}, {post_id}) DO NOTHING "
+            f"RETURNING {post_id}"
+        )
+        delta = "+ 1"
+    else:
+        write = (
+            f"DELETE FROM {like} WHERE {user_id} = %s "
+            f"AND {post_id} IN (SELECT id FROM target) RETURNING {post_id}"
+        )
+        delta = "- 1"
+    return (
+        f"WITH target AS (SELECT id FROM {post} WHERE id = ANY(%s) "
+        f"AND ({is_published} OR {author_id} = %s) "
+        f"ORDER BY id FOR NO KEY UPDATE), "
+        f"written AS ({write}), "
+        f"counted AS (UPDATE {post} SET {likes_count} = {likes_count} "
+        f"{delta} WHERE id IN (SELECT {post_id} FROM written) RETURNING id) "
+        f"SELECT id, id IN (SELECT id FROM counted) FROM target"
+    )
+
+
+def _follow_sql(insert: bool) -> str:
+    user, follow = _quote(User), _quote(Follow)
+    follower_id = _quote(Follow, "follower")
+    following_id = _quote(Follow, "following")
+    if insert:
+        write = (
+            f"INSERT INTO {follow} ({follower_id}, {following_id}, "
+            f"{_quote(Follow, 'created_at')}) "
+            f"SELECT %s, id, %s FROM target "
+            f"ON CONFLICT ({follower_id}, {following_id}) DO NOTHING "
+            f"RETURNING {following_id}"
+        )
+    else:
+        write = (
+            f"DELETE FROM {follow} WHERE {follower_id} = %s "
+            f"AND {following_id} IN (SELECT id FROM target) "
+            f"RETURNING {following_id}"
+        )
+    return (
+        f"WITH target AS (SELECT id FROM {user} WHERE id = ANY(%s)), "
+        f"written AS ({write}) "
+        f"SELECT id, id IN (SELECT {following_id} FROM written) FROM target"
+    )
+
+
+def _add_rows(existing: list[int], make) -> set[int]:
+    """Save make(pk) for each target, skipping rows that already exist."""
+    added = set()
+    for pk in existing:
+        try:
+            with transaction.atomic():
+                make(pk).save()
+        except IntegrityError:
+            continue
+        added.add(pk)
+    return added
+
+
+def _visible_posts(user_id: int):
+    """Published posts and the user's own drafts."""
+    return Post.objects.filter(Q(is_published=True) | Q(user_id=user_id))
+
+
+@transaction.atomic
+def _add_likes_fallback(user_id: int, post_ids: list[int]) -> dict[int, bool]:
+    existing = sorted(
+        _visible_posts(user_id)
+        .filter(pk__in=post_ids)
+        .values_list("pk", flat=True)
+    )
+    added = _add_rows(existing, lambda pk: Like(user_id=user_id, post_id=pk))
+    Post.objects.filter(pk__in=added).update(likes_count=F("likes_count") + 1)
+    return {pk: pk in added for pk in existing}
+
+
+@transaction.atomic
+def _remove_likes_fallback(
+    user_id: int, post_ids: list[int]
+) -> dict[int, bool]:
+    existing = set(
+        _visible_posts(user_id)
+        .filter(pk__in=post_ids)
+        .values_list("pk", flat=True)
+    )
+    likes = Like.objects.filter(user_id=user_id, post_id__in=existing)
+    removed = set(likes.values_list("post_id", flat=True))
+    likes.delete()
+    Post.objects.filter(pk__in=removed).update(
+        likes_count=F("likes_count") - 1
+    )
+    return {pk: pk in removed for pk in existing}
+
+
+@transaction.atomic
+def _add_follows_fallback(
+    follower_id: int, user_ids: list[int]
+) -> dict[int, bool]:
+    existing = sorted(
+        User.objects.filter(pk__in=user_ids).values_list("pk", flat=True)
+    )
+    added = _add_rows(
+        existing, lambda pk: Follow(follower_id=follower_id, following_id=pk)
+    )
+    return {pk: pk in added for pk in existing}
+
+
+@transaction.atomic
+def _remove_follows_fallback(
+    follower_id: int, user_ids: list[int]
+) -> dict[int, bool]:
+    existing = set(
+        User.objects.filter(pk__in=user_ids).values_list("pk", flat=True)
+    )
+    follows = Follow.objects.filter(
+        follower_id=follower_id, following_id__in=existing
+    )
+    removed = set(follows.values_list("following_id", flat=True))
+    follows.delete()
+    return {pk: pk in removed for pk in existing}
+
+
+def _changed(result: dict[int, bool]) -> list[int]:
+    return [pk for pk, changed in result.items() if changed]
+
+
+def add_likes(user_id: int, post_ids: list[int]) -> dict[int, bool]:
+    if connection.vendor == "postgresql":
+        result = _execute(
+            _like_sql(insert=True),
+            [post_ids, user_id, user_id, timezone.now()],
+        )
+    else:
+        result = _add_likes_fallback(user_id, post_ids)
+    if changed := _changed(result):
+        caching.invalidate("post", *changed)
+    return result
+
+
+def remove_likes(user_id: int, post_ids: list[int]) -> dict[int, bool]:
+    if connection.vendor == "postgresql":
+        result = _execute(
+            _like_sql(insert=False), [post_ids, user_id, user_id]
+        )
+    else:
+        result = _remove_likes_fallback(user_id, post_ids)
+    if changed := _changed(result):
+        caching.invalidate("post", *changed)
+    return result
+
+
+def add_follows(follower_id: int, user_ids: list[int]) -> dict[int, bool]:
+    if connection.vendor == "postgresql":
+        result = _execute(
+            _follow_sql(insert=True), [user_ids, follower_id, timezone.now()]
+        )
+    else:
+        result = _add_follows_fallback(follower_id, user_ids)
+    if changed := _changed(result):
+        caching.invalidate("follows", follower_id, *changed)
+    return result
+
+
+def remove_follows(follower_id: int, user_ids: list[int]) -> dict[int, bool]:
+    if connection.vendor == "postgresql":
+        result = _execute(_follow_sql(insert=False), [user_ids, follower_id])
+    else:
+        result = _remove_follows_fallback(follower_id, user_ids)
+    if changed := _changed(result):
+        caching.invalidate("follows", follower_id, *changed)
+    return result
@@ -0,0 +1,200 @@
+"""
+Read-replica routing for API requests.
+
+ReplicaRoutingMiddleware lets the reads of safe-method requests (GET,
+HEAD, OPTIONS) go to one of the REPLICA_DATABASES, picked once per
+request. Everything else, including Celery tasks and management
+commands, uses `default`. Within a request, reads go back to `default`
+after its first write and inside transactions.
+
+For read-your-writes, a successful unsafe request keeps its user's reads
+on `default` for REPLICA_STICKY_SECONDS, recorded under
+`db:primary:<user_id>`. The user comes from the session or, since DRF
+authenticates later, from the bearer access token.
+
+A replica is only used while its lag is at most REPLICA_MAX_LAG seconds.
+Lag is checked at most every REPLICA_LAG_CHECK_INTERVAL seconds per
+process, and an unreachable replica counts as lagging. With no replica
+left, reads fall back to `default`. Versioned caches (payloads and
+authenticated users) are filled from `default`, never from a replica,
+so they cannot store a row older than their version. Related objects
+are read from the database their instance came from.
+"""
+
+import random
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import metrics
+
+# Replay lag of a streaming replica. It is 0 once everything received
+# has been replayed, so an idle primary does not look like lag.
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+metrics.register(
+    "db.replica.reads",
+    "db.replica.fallbacks",
+    "db.replica.pinned",
+    *(f"db.{alias}.lag_ms" for alias in settings.REPLICA_DATABASES),
+)
+
+
+@dataclass
+class _Routing:
+    reads_allowed: bool
+    replica: str | None = None
+
+
+_routing: ContextVar[_Routing | None] = ContextVar("db_routing", default=None)
+
+# alias -> (monotonic time of the check, lag in seconds or None)
+_lag_checks: dict[str, tuple[float, float | None]] = {}
+
+
+def _sticky_key(user_id) -> str:
+    return f"db:primary:{user_id}"
+
+
+def pin_to_primary(user_id) -> None:
+    """Keep the user's reads on `default` for REPLICA_STICKY_SECONDS."""
+    cache.set(_sticky_key(user_id), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def is_pinned(user_id) -> bool:
+    return user_id is not None and cache.get(_sticky_key(user_id)) is not None
+
+
+def replica_lag(alias: str) -> float | None:
+    """Seconds `alias` is behind the primary, or None if unreachable."""
+    connection = connections[alias]
+    try:
+        if connection.vendor != "postgresql":
+            connection.ensure_connection()
+            return 0.0
+        with connection.cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            (lag,) = cursor.fetchone()
+    except DatabaseError:
+        return None
+    return None if lag is None else float(lag)
+
+
+def available_replicas() -> list[str]:
+    """Replicas whose last checked lag is within REPLICA_MAX_LAG."""
+    now = time.monotonic()
+    aliases = []
+    for alias in settings.REPLICA_DATABASES:
+        checked_at, lag = _lag_checks.get(alias, (None, None))
+        if (
+            checked_at is None
+            or now - checked_at >= settings.REPLICA_LAG_CHECK_INTERVAL
+        ):
+            lag = replica_lag(alias)
+            _lag_checks[alias] = (now, lag)
+            metrics.set_gauge(
+                f"db.{alias}.lag_ms", -1 if lag is None else round(lag * 1000)
+            )
+        if lag is not None and lag <= settings.REPLICA_MAX_LAG:
+            aliases.append(alias)
+    return aliases
+
+
+def _request_user_id(request):
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return user.pk
+    parts = request.META.get(api_settings.AUTH_HEADER_NAME, "").split()
+    if len(parts) != 2 or parts[0] not in api_settings.AUTH_HEADER_TYPES:
+        return None
+    try:
+        return AccessToken(parts[1]).get(api_settings.USER_ID_CLAIM)
+    except TokenError:
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """Scope replica reads to safe-method requests of unpinned users."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.REPLICA_DATABASES:
+            return self.get_response(request)
+
+        safe = request.method in SAFE_METHODS
+        reads_allowed = safe
+        if safe and is_pinned(_request_user_id(request)):
+            metrics.incr("db.replica.pinned")
+            reads_allowed = False
+
+        token = _routing.set(_Routing(reads_allowed=reads_allowed))
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+
+        if not safe and response.status_code < 400:
+            # DRF sets the user it authenticated on the Django request.
+            user = getattr(request, "user", None)
+            if user is not None and user.is_authenticated:
+                pin_to_primary(user.pk)
+        return response
+
+
+class ReplicaRouter:
+    """
+    Route reads to the replica chosen for the current request, and all
+    writes to `default`. Replicas are not migrated.
+    """
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        routing = _routing.get()
+        if routing is None:
+            return None
+        if not routing.reads_allowed:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if routing.replica is None:
+            replicas = available_replicas()
+            if replicas:
+                routing.replica = random.choice(replicas)
+                metrics.incr("db.replica.reads")
+            else:
+                routing.replica = DEFAULT_DB_ALIAS
+                metrics.incr("db.replica.fallbacks")
+        return routing.replica
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.reads_allowed = False
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.REPLICA_DATABASES
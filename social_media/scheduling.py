@@ -0,0 +1,91 @@
+"""
+Publishing of scheduled posts.
+
+A periodic task publishes every due post instead of one ETA task per
+post, which Celery would keep in worker memory until it is due. Each
+batch is one statement on PostgreSQL:
+
+    UPDATE post SET is_published = true, fan_out_pending = ...
+    WHERE id IN (SELECT id ... WHERE NOT is_published
+                 AND scheduled_at <= now ORDER BY scheduled_at
+                 LIMIT n FOR UPDATE SKIP LOCKED)
+    RETURNING id
+
+served by a partial index on scheduled_at of unpublished posts. Rows a
+concurrent run holds are skipped, and a post can only move out of the
+unpublished state once. Nothing is lost when a run fails: the rows stay
+due and the next run picks them up, so every due post is published at
+least once.
+
+Publishing also sets fan_out_pending when timelines are enabled. The
+flag is cleared in the transaction that queues the fan-out task, so a
+worker that dies between the two leaves the post flagged for the next
+run instead of published but never delivered.
+"""
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Post
+
+
+def _publish_sql() -> str:
+    quote = connection.ops.quote_name
+    table = quote(Post._meta.db_table)
+    is_published = quote(Post._meta.get_field("is_published").column)
+    scheduled_at = quote(Post._meta.get_field("scheduled_at").column)
+    fan_out_pending = quote(Post._meta.get_field("fan_out_pending").column)
+    return (
+        f"UPDATE {table} SET {is_published} = true, {fan_out_pending} = %s "
+        f"WHERE id IN ("
+        f"SELECT id FROM {table} WHERE NOT {is_published} "
+        f"AND {scheduled_at} <= %s ORDER BY {scheduled_at} LIMIT %s "
+        f"FOR UPDATE SKIP LOCKED) RETURNING id"
+    )
+
+
+@transaction.atomic
+def _publish_due_fallback(batch_size: int, now, fan_out: bool) -> list[int]:
+    post_ids = list(
+        Post.objects.filter(is_published=False, scheduled_at__lte=now)
+        .select_for_update(skip_locked=True)
+        .order_by("scheduled_at")
+        .values_list("pk", flat=True)[:batch_size]
+    )
+    Post.objects.filter(pk__in=post_ids, is_published=False).update(
+        is_published=True, fan_out_pending=fan_out
+    )
+    return post_ids
+
+
+def publish_due(batch_size: int, now=None, fan_out: bool = False) -> list[int]:
+    """
+    Publish up to `batch_size` of the posts scheduled at or before `now`,
+    earliest schedule first, and return their ids. With `fan_out`, the
+    posts are flagged for claim_fan_outs.
+    """
+    now = now or timezone.now()
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(_publish_sql(), [fan_out, now, batch_size])
+            return [pk for (pk,) in cursor.fetchall()]
+    return _publish_due_fallback(batch_size, now, fan_out)
+
+
+def claim_fan_outs(batch_size: int, post_ids=None) -> list[int]:
+    """
+    Clear fan_out_pending on up to `batch_size` flagged posts, or on the
+    flagged ones of `post_ids`, and return their ids. Call it inside a
+    transaction that also queues their fan-out, so the flags are only
+    cleared if the tasks were queued.
+    """
+    queryset = Post.objects.filter(fan_out_pending=True)
+    if post_ids is not None:
+        queryset = queryset.filter(pk__in=post_ids)
+    claimed = list(
+        queryset.select_for_update(skip_locked=True)
+        .order_by("pk")
+        .values_list("pk", flat=True)[:batch_size]
+    )
+    Post.objects.filter(pk__in=claimed).update(fan_out_pending=False)
+    return claimed
@@ -0,0 +1,203 @@
+"""
+Index-backed user and post search.
+
+Users: on PostgreSQL the `?search=` substring match on username and email is
+served by pg_trgm GIN indexes and ranked by trigram similarity, and
+autocomplete is a prefix match that walks a "C"-collated btree index in
+order. The indexes are built on UPPER(column::text), the expression
+Django emits for icontains and istartswith. Other databases, or
+PostgreSQL without pg_trgm, run the same queries unindexed and rank by
+match type only.
+
+Posts: on PostgreSQL a trigger keeps Post.search_vector in sync with the
+content and full-text queries are served by its GIN index, ranked with
+ts_rank. Other databases use an in-process inverted index, built from
+the posts table on first use and kept current by post signals. It is
+meant for tests and development only.
+"""
+
+import math
+import re
+from collections import Counter, defaultdict
+from functools import cache
+
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramSimilarity,
+)
+from django.db import connections
+from django.db.models import (
+    Case,
+    F,
+    FloatField,
+    IntegerField,
+    QuerySet,
+    TextField,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast, Collate, Upper
+
+from .models import Post
+
+SEARCH_CONFIG = "english"
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+@cache
+def trigram_available(alias: str = "default") -> bool:
+    connection = connections[alias]
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def rank_users(queryset: QuerySet, term: str) -> QuerySet:
+    """Order matched users by relevance: exact, prefix, then similarity."""
+    queryset = queryset.annotate(
+        search_rank=Case(
+            When(username__iexact=term, then=Value(0)),
+            When(username__istartswith=term, then=Value(1)),
+            When(email__istartswith=term, then=Value(2)),
+            default=Value(3),
+            output_field=IntegerField(),
+        )
+    )
+    ordering = ["search_rank"]
+    if trigram_available(queryset.db):
+        queryset = queryset.annotate(
+            similarity=TrigramSimilarity("username", term)
+        )
+        ordering.append("-similarity")
+    return queryset.order_by(*ordering, "username")
+
+
+def autocomplete_users(queryset: QuerySet, prefix: str, limit: int) -> list:
+    """Return up to `limit` users whose username starts with `prefix`."""
+    key = Upper(Cast("username", TextField()))
+    if connections[queryset.db].vendor == "postgresql":
+        # Matches the collation of the prefix index so the ORDER BY
+        # follows the index and no sort is needed.
+        key = Collate(key, "C")
+    return list(
+        queryset.filter(username__istartswith=prefix).order_by(key, "pk")[
+            :limit
+        ]
+    )
+
+
+def search_posts(queryset: QuerySet, text: str) -> QuerySet:
+    """
+    Filter posts matching `text` (web search syntax on PostgreSQL) and
+    annotate them with a float `rank`, higher is more relevant.
+
+    Only the POST_SEARCH_MAX_CANDIDATES most recent matches are ranked,
+    so a term that appears in a large share of all posts costs a short
+    backward scan of the primary key instead of ranking every match.
+    """
+    if not text.strip():
+        return queryset.none().annotate(
+            rank=Value(0.0, output_field=FloatField())
+        )
+    if connections[queryset.db].vendor == "postgresql":
+        query = SearchQuery(
+            text, config=SEARCH_CONFIG, search_type="websearch"
+        )
+        candidate_ids = list(
+            queryset.filter(search_vector=query)
+            .order_by("-pk")
+            .values_list("pk", flat=True)[
+                : settings.POST_SEARCH_MAX_CANDIDATES
+            ]
+        )
+        # ts_rank returns a real; casting to double keeps the value
+        # exact when it round-trips through a pagination cursor.
+        return queryset.filter(pk__in=candidate_ids).annotate(
+            rank=Cast(SearchRank(F("search_vector"), query), FloatField())
+        )
+
+    scores = fallback_index.search(text)
+    return queryset.filter(pk__in=scores).annotate(
+        rank=Case(
+            *[When(pk=pk, then=Value(score)) for pk, score in scores.items()],
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+    )
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class PostIndex:
+    """In-process inverted index over post content: token -> {post id: tf}."""
+
+    def __init__(self) -> None:
+        self.loaded = False
+        self._postings: dict[str, dict[int, int]] = defaultdict(dict)
+        self._documents: dict[int, Counter] = {}
+
+    def load(self) -> None:
+        self.clear()
+        for pk, content in Post.objects.values_list("pk", "content"):
+            self._add(pk, content)
+        self.loaded = True
+
+    def clear(self) -> None:
+        self.loaded = False
+        self._postings.clear()
+        self._documents.clear()
+
+    def update(self, pk: int, content: str) -> None:
+        """Reindex one post; a no-op until the index has been loaded."""
+        if not self.loaded:
+            return
+        self.remove(pk)
+        self._add(pk, content)
+
+    def remove(self, pk: int) -> None:
+        for token in self._documents.pop(pk, ()):
+            postings = self._postings[token]
+            postings.pop(pk, None)
+            if not postings:
+                del self._postings[token]
+
+    def _add(self, pk: int, content: str) -> None:
+        counts = Counter(tokenize(content))
+        self._documents[pk] = counts
+        for token, count in counts.items():
+            self._postings[token][pk] = count
+
+    def search(self, text: str) -> dict[int, float]:
+        """
+        Return {post id: tf-idf score} for posts containing every term,
+        except terms prefixed with "-", which exclude posts instead.
+        """
+        if not self.loaded:
+            self.load()
+        required, excluded = set(), set()
+        for word in text.split():
+            target = excluded if word.startswith("-") else required
+            target.update(tokenize(word))
+        if not required:
+            return {}
+        postings = [self._postings.get(term, {}) for term in required]
+        matches = set.intersection(*(set(posting) for posting in postings))
+        for term in excluded:
+            matches.difference_update(self._postings.get(term, {}))
+        total = len(self._documents)
+        return {
+            pk: sum(
+                posting[pk] * math.log(1 + total / len(posting))
+                for posting in postings
+            )
+            for pk in matches
+        }
+
+
+fallback_index = PostIndex()
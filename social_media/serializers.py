@@ -1,22 +1,142 @@
+from typing import Iterable
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db.models.manager import BaseManager
+from django.urls import reverse
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
-from .models import Profile, Comment, Post, Follow
+from rest_framework.request import Request
+from rest_framework.utils.urls import replace_query_param
+from rest_framework_simplejwt import serializers as jwt_serializers
+from . import like_buffer
+from .blacklist import RefreshToken
+from .models import Profile, Comment, Post, Follow, Like
+from .pagination import CommentPagination
 
 User = get_user_model()
 
 
+def viewer_state(
+    request: Request | None,
+    post_ids: Iterable[int] = (),
+    user_ids: Iterable[int] = (),
+) -> dict[str, set[int]]:
+    """
+    Serializer context with the requesting user's likes among `post_ids`
+    and follows among `user_ids`, read with one query each. Unflushed
+    buffered likes are merged in, and their likes_count changes are
+    returned as `like_count_deltas`.
+    """
+    user = getattr(request, "user", None)
+    post_ids, user_ids = set(post_ids), set(user_ids)
+    liked, followed, deltas = set(), set(), {}
+    if user is not None and user.is_authenticated:
+        if post_ids:
+            # order_by() drops Like.Meta.ordering, which would add a sort.
+            liked = set(
+                Like.objects.filter(user=user, post_id__in=post_ids)
+                .order_by()
+                .values_list("post_id", flat=True)
+            )
+        if user_ids:
+            followed = set(
+                Follow.objects.filter(
+                    follower=user, following_id__in=user_ids
+                ).values_list("following_id", flat=True)
+            )
+    if post_ids and like_buffer.is_enabled():
+        if user is not None and user.is_authenticated:
+            for post_id, buffered in like_buffer.states(
+                user.pk, post_ids
+            ).items():
+                if buffered:
+                    liked.add(post_id)
+                else:
+                    liked.discard(post_id)
+        deltas = like_buffer.count_deltas(post_ids)
+    return {
+        "liked_post_ids": liked,
+        "followed_user_ids": followed,
+        "like_count_deltas": deltas,
+    }
+
+
+class ViewerStateListSerializer(serializers.ListSerializer):
+    """
+    Looks up the requesting user's likes and follows for all items at
+    once, so is_liked and is_following cost one query per list instead
+    of one per row. Children name the ids they need in viewer_targets().
+    """
+
+    def to_representation(self, data) -> list:
+        items = list(data.all() if isinstance(data, BaseManager) else data)
+        post_ids, user_ids = set(), set()
+        for item in items:
+            posts, users = self.child.viewer_targets(item)
+            post_ids.update(posts)
+            user_ids.update(users)
+        self.context.update(
+            viewer_state(self.context.get("request"), post_ids, user_ids)
+        )
+        return super().to_representation(items)
+
+
+class ViewerStateMixin:
+    """
+    Reads viewer flags from the context, loading them if missing.
+    Subclasses name the attributes holding the post id and the user id
+    to look up, or None for flags they do not have.
+    """
+
+    viewer_post_id_attr: str | None = None
+    viewer_user_id_attr: str | None = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if not (cls.viewer_post_id_attr or cls.viewer_user_id_attr):
+            raise TypeError(
+                f"{cls.__name__} must set viewer_post_id_attr or "
+                f"viewer_user_id_attr."
+            )
+
+    def viewer_targets(self, instance) -> tuple[list[int], list[int]]:
+        return tuple(
+            [] if attr is None else [getattr(instance, attr)]
+            for attr in (self.viewer_post_id_attr, self.viewer_user_id_attr)
+        )
+
+    def viewer_flag(self, key: str, instance, pk: int) -> bool:
+        if key not in self.context:
+            self.context.update(
+                viewer_state(
+                    self.context.get("request"),
+                    *self.viewer_targets(instance),
+                )
+            )
+        return pk in self.context[key]
+
+
 class ProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = Profile
         fields = ("bio", "profile_picture")
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(ViewerStateMixin, serializers.ModelSerializer):
+    viewer_user_id_attr = "pk"
+
     profile = ProfileSerializer(read_only=True)
+    is_following = serializers.SerializerMethodField()
 
     class Meta:
         model = User
-        fields = ("id", "username", "email", "profile")
+        fields = ("id", "username", "email", "profile", "is_following")
+        list_serializer_class = ViewerStateListSerializer
+
+    def get_is_following(self, user) -> bool:
+        return self.viewer_flag("followed_user_ids", user, user.pk)
 
 
 class UserRegistrationSerializer(serializers.Serializer):
@@ -49,7 +169,9 @@ class UserRegistrationSerializer(serializers.Serializer):
         return user
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(ViewerStateMixin, serializers.ModelSerializer):
+    viewer_user_id_attr = "user_id"
+
     user = UserSerializer(read_only=True)
     post = serializers.PrimaryKeyRelatedField(read_only=True)
 
@@ -57,6 +179,7 @@ class CommentSerializer(serializers.ModelSerializer):
         model = Comment
         fields = ("id", "user", "post", "text", "created_at")
         read_only_fields = ("id", "user", "post", "created_at")
+        list_serializer_class = ViewerStateListSerializer
 
 
 class PostSerializer(serializers.ModelSerializer):
@@ -75,24 +198,37 @@ class PostSerializer(serializers.ModelSerializer):
         read_only_fields = ("id", "created_at", "is_published")
 
 
-class PostListSerializer(PostSerializer):
+class PostListSerializer(ViewerStateMixin, PostSerializer):
+    viewer_post_id_attr = "pk"
+    viewer_user_id_attr = "user_id"
+
     user = UserSerializer(read_only=True)
-    likes_count = serializers.IntegerField(read_only=True)
-    comments_count = serializers.IntegerField(read_only=True)
+    is_liked = serializers.SerializerMethodField()
 
     class Meta(PostSerializer.Meta):
         fields = PostSerializer.Meta.fields + (
             "user",
             "likes_count",
             "comments_count",
+            "is_liked",
         )
+        read_only_fields = PostSerializer.Meta.read_only_fields + (
+            "likes_count",
+            "comments_count",
+        )
+        list_serializer_class = ViewerStateListSerializer
 
+    def get_is_liked(self, post: Post) -> bool:
+        return self.viewer_flag("liked_post_ids", post, post.pk)
 
-class PostDetailSerializer(PostListSerializer):
-    comments = CommentSerializer(read_only=True, many=True)
-
-    class Meta(PostListSerializer.Meta):
-        fields = PostSerializer.Meta.fields + ("comments",)
+    def to_representation(self, post: Post) -> dict:
+        data = super().to_representation(post)
+        if "likes_count" in data:
+            # Loaded into the context along with is_liked above.
+            data["likes_count"] += self.context["like_count_deltas"].get(
+                post.pk, 0
+            )
+        return data
 
 
 class UserPublicInfoSerializer(serializers.ModelSerializer):
@@ -105,17 +241,147 @@ class UserPublicInfoSerializer(serializers.ModelSerializer):
         fields = ("id", "username", "profile_picture")
 
 
+class CommentPreviewSerializer(serializers.ModelSerializer):
+    user = UserPublicInfoSerializer(read_only=True)
+
+    class Meta:
+        model = Comment
+        fields = ("id", "user", "text", "created_at")
+
+
+class PostDetailSerializer(PostListSerializer):
+    """
+    Post with its first POST_DETAIL_COMMENTS comments. The rest are paged
+    from the comments endpoint, starting at the `comments_next` link.
+    With POST_DETAIL_COMMENTS set to 0 no comments are read, and the link
+    points at the first page.
+    """
+
+    comments = serializers.SerializerMethodField()
+    comments_next = serializers.SerializerMethodField()
+
+    class Meta(PostListSerializer.Meta):
+        fields = PostSerializer.Meta.fields + (
+            "comments_count",
+            "is_liked",
+            "comments",
+            "comments_next",
+        )
+
+    def _comments_preview(self, post: Post) -> list[Comment]:
+        """First page of comments plus one row to tell if there are more."""
+        if not settings.POST_DETAIL_COMMENTS:
+            return []
+        if not hasattr(post, "_comments_preview"):
+            post._comments_preview = list(
+                post.comments.select_related("user__profile").order_by(
+                    *CommentPagination.ordering
+                )[: settings.POST_DETAIL_COMMENTS + 1]
+            )
+        return post._comments_preview
+
+    @extend_schema_field(CommentPreviewSerializer(many=True))
+    def get_comments(self, post: Post) -> list:
+        comments = self._comments_preview(post)[
+            : settings.POST_DETAIL_COMMENTS
+        ]
+        return CommentPreviewSerializer(
+            comments, many=True, context=self.context
+        ).data
+
+    @extend_schema_field(OpenApiTypes.URI)
+    def get_comments_next(self, post: Post) -> str | None:
+        if not settings.POST_DETAIL_COMMENTS:
+            return self._comments_url(post) if post.comments_count else None
+        comments = self._comments_preview(post)
+        if len(comments) <= settings.POST_DETAIL_COMMENTS:
+            return None
+        url = self._comments_url(post)
+        pagination = CommentPagination()
+        cursor = pagination.encode_cursor(
+            comments[settings.POST_DETAIL_COMMENTS - 1]
+        )
+        return replace_query_param(url, pagination.after_query_param, cursor)
+
+    def _comments_url(self, post: Post) -> str:
+        url = reverse(
+            "social_media:post-comments-list", kwargs={"post_pk": post.pk}
+        )
+        request = self.context.get("request")
+        if request is not None:
+            url = request.build_absolute_uri(url)
+        return url
+
+
 class FollowerSerializer(serializers.ModelSerializer):
-    follower = UserPublicInfoSerializer(read_only=True)
+    """Follow rows with author cards looked up from context["cards"]."""
+
+    follower = serializers.SerializerMethodField()
 
     class Meta:
         model = Follow
         fields = ("follower", "created_at")
 
+    @extend_schema_field(UserPublicInfoSerializer)
+    def get_follower(self, follow: Follow) -> dict | None:
+        return self.context["cards"].get(follow.follower_id)
+
 
 class FollowingSerializer(serializers.ModelSerializer):
-    following = UserPublicInfoSerializer(read_only=True)
+    """Follow rows with author cards looked up from context["cards"]."""
+
+    following = serializers.SerializerMethodField()
 
     class Meta:
         model = Follow
         fields = ("following", "created_at")
+
+    @extend_schema_field(UserPublicInfoSerializer)
+    def get_following(self, follow: Follow) -> dict | None:
+        return self.context["cards"].get(follow.following_id)
+
+
+class TrendingHashtagSerializer(serializers.Serializer):
+    name = serializers.CharField()
+    score = serializers.FloatField()
+    posts_count = serializers.IntegerField()
+
+
+class BulkLikeActionSerializer(serializers.Serializer):
+    id = serializers.IntegerField(min_value=1)
+    action = serializers.ChoiceField(choices=("like", "unlike"))
+
+
+class BulkFollowActionSerializer(serializers.Serializer):
+    id = serializers.IntegerField(min_value=1)
+    action = serializers.ChoiceField(choices=("follow", "unfollow"))
+
+
+class BulkLikeSerializer(serializers.Serializer):
+    actions = BulkLikeActionSerializer(
+        many=True, allow_empty=False, max_length=settings.BULK_MAX_ITEMS
+    )
+
+
+class BulkFollowSerializer(serializers.Serializer):
+    actions = BulkFollowActionSerializer(
+        many=True, allow_empty=False, max_length=settings.BULK_MAX_ITEMS
+    )
+
+
+class BulkResultSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    action = serializers.CharField()
+    result = serializers.ChoiceField(
+        choices=("applied", "unchanged", "not_found", "invalid", "superseded")
+    )
+
+
+class BulkResponseSerializer(serializers.Serializer):
+    results = BulkResultSerializer(many=True)
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    """Token refresh with the cached blacklist lookup."""
+
+    token_class = RefreshToken
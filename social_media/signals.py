@@ -1,9 +1,19 @@
-import re
-
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import (
+    post_delete,
+    post_init,
+    pre_delete,
+    pre_save,
+    post_save,
+)
 from django.dispatch import receiver
 from django.conf import settings
-from .models import Profile, Post, User, Hashtag
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from . import blacklist, caching, trending
+from .hashtags import sync_hashtags
+from .search import fallback_index
+from .models import Comment, Follow, Like, Profile, Post, User
+from .tasks import schedule_hashtag_indexing
 
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
@@ -15,21 +25,134 @@ def create_user_profile(sender, instance: User, created: bool, **kwargs):
         Profile.objects.create(user=instance)
 
 
+@receiver(post_init, sender=Post)
+def remember_post_content(sender, instance: Post, **kwargs):
+    """
+    Keep the content a Post was loaded with, so saves that do not touch
+    it can skip hashtag processing. Deferred content is left as None.
+    """
+    instance._original_content = instance.__dict__.get("content")
+
+
+def _content_changed(instance: Post, update_fields) -> bool:
+    if instance._state.adding:
+        return True
+    if update_fields is not None and "content" not in update_fields:
+        return False
+    return instance.content != instance._original_content
+
+
+@receiver(pre_save, sender=Post)
+def flag_post_hashtags(sender, instance: Post, update_fields=None, **kwargs):
+    """
+    In async indexing mode, mark posts whose content changed so the flag
+    is written by the same INSERT/UPDATE as the post itself.
+    """
+    if settings.HASHTAG_INDEXING_ASYNC and _content_changed(
+        instance, update_fields
+    ):
+        instance.hashtags_dirty = True
+
+
 @receiver(post_save, sender=Post)
-def process_post_hashtags(sender, instance: Post, created: bool, **kwargs):
+def process_post_hashtags(
+    sender, instance: Post, created: bool, update_fields=None, **kwargs
+):
     """
     Signal handler for Post model.
-    Parses hashtags from the post content, creates Hashtag objects if needed,
-    and attaches them to the post instance. Clears old hashtags when updating.
+    Parses hashtags from the post content and links the post to them,
+    creating missing Hashtag objects in bulk. Skipped when the content
+    did not change. In async mode only schedules the indexing task.
+    """
+    if not created and not _content_changed(instance, update_fields):
+        return
+
+    if settings.HASHTAG_INDEXING_ASYNC:
+        if update_fields is not None and "hashtags_dirty" not in update_fields:
+            Post.objects.filter(pk=instance.pk).update(hashtags_dirty=True)
+        transaction.on_commit(schedule_hashtag_indexing)
+    else:
+        sync_hashtags([instance], created=created)
+    instance._original_content = instance.content
+
+
+@receiver(pre_delete, sender=Post)
+def uncount_post_hashtags(sender, instance: Post, **kwargs):
     """
-    # Find all hashtags in the content
-    hashtags = re.findall(r"#([\w-]+)", instance.content)
+    Take a published post out of the trending counters while its
+    hashtag links, which the delete cascades to, still exist. The row
+    tells whether it is published; the instance may be stale.
+    """
+    trending.record_posts([instance.pk], -1)
+
 
-    # If updating an existing post, clear previous hashtags
-    if not created:
-        instance.hashtags.clear()
+@receiver(post_save, sender=Post)
+def update_post_search_index(sender, instance: Post, **kwargs):
+    """
+    Keep the in-process search index current on databases without
+    full-text search. PostgreSQL updates search_vector with a trigger.
+    """
+    content = instance.__dict__.get("content")
+    if content is not None:
+        fallback_index.update(instance.pk, content)
 
-    # Create or get hashtags and attach them to the post
-    for tag_name in hashtags:
-        hashtag, _ = Hashtag.objects.get_or_create(name=tag_name.lower())
-        instance.hashtags.add(hashtag)
+
+@receiver(post_delete, sender=Post)
+def remove_post_from_search_index(sender, instance: Post, **kwargs):
+    fallback_index.remove(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_cached_post(sender, instance: Post, **kwargs):
+    caching.invalidate("post", instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+def invalidate_cached_post_relations(sender, instance, **kwargs):
+    """Comments and likes are embedded in, or counted by, post payloads."""
+    caching.invalidate("post", instance.post_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_cached_user(sender, instance: User, **kwargs):
+    """Saves include deactivation, which must reach authentication."""
+    caching.invalidate("user", instance.pk)
+    caching.invalidate("auth", instance.pk)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_cached_profile(sender, instance: Profile, **kwargs):
+    caching.invalidate("user", instance.user_id)
+    caching.invalidate("auth", instance.user_id)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_cached_follows(sender, instance: Follow, **kwargs):
+    """Both users' follower/following lists change."""
+    caching.invalidate("follows", instance.follower_id, instance.following_id)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def remember_blacklisted_token(sender, instance: BlacklistedToken, **kwargs):
+    token = instance.token
+    transaction.on_commit(
+        lambda: blacklist.remember(token.jti, token.expires_at)
+    )
+
+
+@receiver(post_delete, sender=BlacklistedToken)
+def forget_blacklisted_token(sender, instance: BlacklistedToken, **kwargs):
+    """
+    Bulk deletes do not load the tokens; their entries lapse when the
+    token expires, which is when pruning deletes them anyway.
+    """
+    if BlacklistedToken.token.is_cached(instance):
+        jti = instance.token.jti
+        transaction.on_commit(lambda: blacklist.forget(jti))
@@ -1,20 +1,196 @@
 import logging
 from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
 from .models import Post
+from . import (
+    blacklist,
+    caching,
+    hashtags,
+    like_buffer,
+    scheduling,
+    timeline,
+    trending,
+)
 
 logger = logging.getLogger(__name__)
 
+TRIM_BATCH_SIZE = 500
+HASHTAG_INDEXING_LOCK_KEY = "hashtags:indexing:scheduled"
+
 
 @shared_task(
     bind=True, autoretry_for=(Exception,), retry_backoff=True, max_retries=3
 )
 def publish_post(self, post_id: int) -> None:
-    """Celery task to publish a scheduled post."""
-    updated = Post.objects.filter(id=post_id, is_published=False).update(
-        is_published=True
-    )
+    """
+    Celery task to publish a scheduled post. Only queued when the
+    scheduled post dispatcher is disabled.
+    """
+    with transaction.atomic():
+        updated = Post.objects.filter(id=post_id, is_published=False).update(
+            is_published=True, fan_out_pending=timeline.is_enabled()
+        )
+        if updated:
+            trending.record_posts([post_id], 1)
 
     if updated:
+        caching.invalidate("post", post_id)
         logger.info(f"Post {post_id} has been published.")
+        if timeline.is_enabled():
+            _queue_fan_outs([post_id])
     else:
         logger.warning(f"Post {post_id} not found or already published.")
+
+
+@shared_task
+def dispatch_scheduled_posts() -> None:
+    """
+    Periodic task publishing every scheduled post that is due, then
+    queueing the fan-out of published posts still flagged for it.
+    """
+    if settings.SCHEDULED_POSTS_DISPATCHER_ENABLED:
+        now = timezone.now()
+        published = 0
+        while True:
+            with transaction.atomic():
+                post_ids = scheduling.publish_due(
+                    settings.SCHEDULED_POSTS_DISPATCH_BATCH,
+                    now,
+                    fan_out=timeline.is_enabled(),
+                )
+                if not post_ids:
+                    break
+                # Counted in the publishing transaction, so a crash
+                # cannot publish a post without counting it.
+                trending.record_posts(post_ids, 1)
+            caching.invalidate("post", *post_ids)
+            published += len(post_ids)
+        if published:
+            logger.info(f"Published {published} scheduled posts.")
+    if timeline.is_enabled():
+        _queue_fan_outs()
+
+
+def _queue_fan_outs(post_ids=None) -> None:
+    """
+    Queue fan_out_post for the posts flagged fan_out_pending, or for the
+    flagged ones of `post_ids`. A flag is only cleared with its task
+    queued; fan-out is idempotent, so queueing twice is harmless.
+    """
+    while True:
+        with transaction.atomic():
+            claimed = scheduling.claim_fan_outs(
+                settings.SCHEDULED_POSTS_DISPATCH_BATCH, post_ids
+            )
+            for post_id in claimed:
+                fan_out_post.delay(post_id)
+        if not claimed or post_ids is not None:
+            return
+
+
+@shared_task(
+    bind=True, autoretry_for=(Exception,), retry_backoff=True, max_retries=3
+)
+def fan_out_post(self, post_id: int) -> None:
+    """Celery task to push a published post into follower timelines."""
+    delivered = timeline.fan_out(post_id)
+    logger.info(f"Post {post_id} delivered to {delivered} timelines.")
+
+
+@shared_task(
+    bind=True, autoretry_for=(Exception,), retry_backoff=True, max_retries=3
+)
+def backfill_timeline(self, follower_id: int, following_id: int) -> None:
+    """Celery task to add a followed user's posts to a timeline."""
+    timeline.backfill(follower_id, following_id)
+
+
+@shared_task(
+    bind=True, autoretry_for=(Exception,), retry_backoff=True, max_retries=3
+)
+def restore_pushed_author(self, author_id: int) -> None:
+    """Celery task to backfill an author who left the pull set."""
+    restored = timeline.restore_author(author_id)
+    logger.info(f"Author {author_id} backfilled to {restored} timelines.")
+
+
+@shared_task(
+    bind=True, autoretry_for=(Exception,), retry_backoff=True, max_retries=3
+)
+def remove_from_timeline(self, follower_id: int, following_id: int) -> None:
+    """Celery task to remove an unfollowed user's posts from a timeline."""
+    timeline.remove_author(follower_id, following_id)
+
+
+@shared_task
+def trim_timelines() -> None:
+    """Periodic task enforcing the per-user timeline cap."""
+    trimmed = 0
+    while user_ids := timeline.users_over_cap(TRIM_BATCH_SIZE):
+        trimmed += timeline.trim(user_ids)
+    if trimmed:
+        logger.info(f"Trimmed {trimmed} timeline entries.")
+
+
+@shared_task
+def refresh_pull_authors() -> None:
+    """Periodic task recomputing the authors served by read-time pulls."""
+    author_ids = timeline.refresh_pull_authors()
+    logger.info(f"{len(author_ids)} authors are served by read-time pulls.")
+
+
+def schedule_hashtag_indexing() -> None:
+    """
+    Enqueue at most one indexing task per debounce window; posts saved
+    meanwhile are picked up by that task through their dirty flag.
+    """
+    delay = settings.HASHTAG_INDEXING_DEBOUNCE
+    if cache.add(HASHTAG_INDEXING_LOCK_KEY, True, timeout=delay + 60):
+        index_hashtags.apply_async(countdown=delay)
+
+
+@shared_task(
+    bind=True, autoretry_for=(Exception,), retry_backoff=True, max_retries=3
+)
+def index_hashtags(self) -> None:
+    """Celery task to index hashtags of all posts flagged as dirty."""
+    cache.delete(HASHTAG_INDEXING_LOCK_KEY)
+    indexed = hashtags.index_pending_posts(
+        settings.HASHTAG_INDEXING_BATCH_SIZE
+    )
+    logger.info(f"Indexed hashtags of {indexed} posts.")
+
+
+@shared_task
+def refresh_trending_hashtags() -> None:
+    """Periodic task recomputing the cached trending hashtags."""
+    trending.refresh()
+
+
+@shared_task
+def prune_hashtag_buckets() -> None:
+    """Periodic task deleting trending buckets past their retention."""
+    deleted = trending.prune()
+    if deleted:
+        logger.info(f"Pruned {deleted} hashtag buckets.")
+
+
+@shared_task
+def flush_like_buffer() -> None:
+    """Periodic task writing buffered likes to the database."""
+    touched = 0
+    while post_ids := like_buffer.flush():
+        caching.bump("post", *post_ids)
+        touched += len(post_ids)
+    if touched:
+        logger.info(f"Flushed buffered likes of {touched} posts.")
+
+
+@shared_task
+def prune_token_blacklist() -> None:
+    """Periodic task deleting expired outstanding and blacklisted tokens."""
+    pruned = blacklist.prune(settings.TOKEN_BLACKLIST_PRUNE_BATCH)
+    logger.info(f"Pruned {pruned} expired tokens.")
@@ -1,3 +1,1202 @@
-from django.test import TestCase
+import base64
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection, connections, router
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from social_media import (
+    authentication,
+    blacklist,
+    caching,
+    checks,
+    like_buffer,
+    routing,
+    tasks,
+    timeline,
+)
+from social_media.models import (
+    Comment,
+    Follow,
+    HashtagBucket,
+    Like,
+    Post,
+    Profile,
+    TimelineEntry,
+)
+from social_media.pagination import PostPagination
+from social_media.serializers import ViewerStateMixin
+from social_media.tasks import dispatch_scheduled_posts
+from social_media.views import BulkActionView
+
+User = get_user_model()
+
+
+def create_user(username: str) -> User:
+    return User.objects.create_user(
+        username=username,
+        email=f"{username}@example.com",
+        password="password123",
+    )
+
+
+def api_client(user: User | None = None) -> APIClient:
+    client = APIClient()
+    if user is not None:
+        client.force_authenticate(user)
+    return client
+
+
+class QueryCountTests(TestCase):
+    """
+    Pin the number of queries of the hot read endpoints, so an N+1
+    regression fails here. The data has several authors, posts, likes,
+    comments and followers, which per-row queries would multiply.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = create_user("viewer")
+        cls.authors = [create_user(f"author{i}") for i in range(4)]
+        Follow.objects.bulk_create(
+            [Follow(follower=cls.viewer, following=a) for a in cls.authors]
+            + [Follow(follower=a, following=cls.viewer) for a in cls.authors]
+        )
+        cls.posts = [
+            Post.objects.create(user=author, content=f"post {i} #tag{i}")
+            for author in cls.authors
+            for i in range(2)
+        ]
+        cls.post = cls.posts[0]
+        for post in cls.posts[::2]:
+            Like.objects.create(user=cls.viewer, post=post)
+        for author in cls.authors:
+            Comment.objects.create(user=author, post=cls.post, text="hi")
+        Post.objects.filter(pk=cls.post.pk).update(
+            comments_count=len(cls.authors)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = api_client(self.viewer)
+
+    def assertQueries(self, url: str, num: int) -> dict:
+        with self.assertNumQueries(num):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_post_list(self):
+        data = self.assertQueries(reverse("social_media:posts-list"), 3)
+        self.assertEqual(len(data["results"]), len(self.posts))
+
+    def test_post_detail(self):
+        url = reverse("social_media:posts-detail", args=[self.post.pk])
+        data = self.assertQueries(url, 4)
+        self.assertEqual(len(data["comments"]), len(self.authors))
+
+    def test_post_detail_cached(self):
+        url = reverse("social_media:posts-detail", args=[self.post.pk])
+        self.client.get(url)
+        self.assertQueries(url, 1)
+
+    @override_settings(POST_DETAIL_COMMENTS=0)
+    def test_post_detail_without_comment_preview(self):
+        url = reverse("social_media:posts-detail", args=[self.post.pk])
+        data = self.assertQueries(url, 2)
+        self.assertEqual(data["comments"], [])
+        self.assertTrue(
+            data["comments_next"].endswith(
+                reverse(
+                    "social_media:post-comments-list",
+                    kwargs={"post_pk": self.post.pk},
+                )
+            )
+        )
+
+    def test_feed(self):
+        data = self.assertQueries(reverse("social_media:posts-feed"), 4)
+        self.assertEqual(len(data["results"]), len(self.posts))
+
+    def test_followers(self):
+        url = reverse("social_media:users-followers", args=[self.viewer.pk])
+        data = self.assertQueries(url, 3)
+        self.assertEqual(len(data["results"]), len(self.authors))
+
+    def test_following(self):
+        url = reverse("social_media:users-following", args=[self.viewer.pk])
+        data = self.assertQueries(url, 3)
+        self.assertEqual(len(data["results"]), len(self.authors))
+
+    def test_user_list(self):
+        data = self.assertQueries(reverse("social_media:users-list"), 3)
+        self.assertEqual(len(data["results"]), len(self.authors) + 1)
+
+    def test_liked(self):
+        data = self.assertQueries(reverse("social_media:posts-liked"), 3)
+        self.assertEqual(len(data["results"]), len(self.posts[::2]))
+
+    def test_search(self):
+        url = reverse("social_media:posts-search") + "?q=post"
+        # Build the per-process search index of databases without
+        # full-text search first; PostgreSQL matches ids in a query.
+        self.client.get(url)
+        cache.clear()
+        num = 4 if connection.vendor == "postgresql" else 3
+        data = self.assertQueries(url, num)
+        self.assertEqual(len(data["results"]), len(self.posts))
+
+    def test_comments(self):
+        url = reverse(
+            "social_media:post-comments-list",
+            kwargs={"post_pk": self.post.pk},
+        )
+        data = self.assertQueries(url, 4)
+        self.assertEqual(len(data["results"]), len(self.authors))
+
+
+class ConditionalGetTests(TestCase):
+    """
+    Post detail answers 304 while the client's validators match and
+    changes them when anything shown in it changes.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = create_user("viewer")
+        cls.author = create_user("author")
+        cls.post = Post.objects.create(user=cls.author, content="post")
+
+    def setUp(self):
+        cache.clear()
+        self.client = api_client(self.viewer)
+        self.url = reverse("social_media:posts-detail", args=[self.post.pk])
+
+    def validators(self, **headers) -> tuple[int, str, str]:
+        response = self.client.get(self.url, headers=headers)
+        return (
+            response.status_code,
+            response["ETag"],
+            response["Last-Modified"],
+        )
+
+    def test_not_modified(self):
+        status, etag, last_modified = self.validators()
+        self.assertEqual(status, 200)
+        self.assertEqual(self.validators(if_none_match=etag)[0], 304)
+        self.assertEqual(
+            self.validators(if_modified_since=last_modified)[0], 304
+        )
+
+    def test_validators_change(self):
+        comments = reverse(
+            "social_media:post-comments-list",
+            kwargs={"post_pk": self.post.pk},
+        )
+        like = reverse("social_media:posts-like", args=[self.post.pk])
+        changes = {
+            "comment": lambda: self.client.post(comments, {"text": "hi"}),
+            "like": lambda: self.client.post(like),
+            # Of the commenter, whose card the post shows.
+            "profile": lambda: self.client.patch(
+                reverse("social_media:users-me"), {"bio": "changed"}
+            ),
+        }
+        now = time.time_ns()
+        for seconds, (change, request) in enumerate(changes.items(), 1):
+            with self.subTest(change=change):
+                _, etag, last_modified = self.validators()
+                # Version stamps have nanoseconds, Last-Modified seconds.
+                later = now + seconds * 2_000_000_000
+                with (
+                    mock.patch("time.time_ns", return_value=later),
+                    self.captureOnCommitCallbacks(execute=True),
+                ):
+                    self.assertIn(request().status_code, (200, 201))
+                status, new_etag, new_last_modified = self.validators(
+                    if_none_match=etag
+                )
+                self.assertEqual(status, 200)
+                self.assertNotEqual(new_etag, etag)
+                self.assertNotEqual(new_last_modified, last_modified)
+
+
+class PostIdsTests(TestCase):
+    """?ids= returns every requested post in order, unpaginated."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("viewer")
+        cls.posts = [
+            Post.objects.create(user=cls.user, content=f"post {i}")
+            for i in range(25)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, ids: list[int]):
+        return api_client(self.user).get(
+            reverse("social_media:posts-list"),
+            {"ids": ",".join(map(str, ids))},
+        )
+
+    def test_request_order(self):
+        # More than a page, out of order, with a duplicate and a miss.
+        ids = [post.pk for post in self.posts[::-2] + self.posts[1::4]]
+        response = self.get(ids + [self.posts[4].pk, 0])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([post["id"] for post in response.json()], ids)
+
+    @override_settings(BULK_MAX_ITEMS=3)
+    def test_too_many_ids(self):
+        ids = [post.pk for post in self.posts[:4]]
+        self.assertEqual(self.get(ids).status_code, 400)
+
+
+class KeysetPaginationTests(TestCase):
+    """after/before cursors and since_id page through the post list."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("viewer")
+        posts = [
+            Post.objects.create(user=cls.user, content=f"post {i}")
+            for i in range(7)
+        ]
+        # Ties on created_at are broken by id.
+        Post.objects.filter(pk__in=[p.pk for p in posts[2:5]]).update(
+            created_at=posts[2].created_at
+        )
+        cls.ids = list(
+            Post.objects.order_by("-created_at", "-id").values_list(
+                "pk", flat=True
+            )
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = api_client(self.user)
+        self.url = reverse("social_media:posts-list")
+
+    def get(self, url: str, **params) -> dict:
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def pages(self, data: dict, link: str) -> list[list[int]]:
+        pages = [[post["id"] for post in data["results"]]]
+        while data[link]:
+            data = self.get(data[link])
+            pages.append([post["id"] for post in data["results"]])
+        return pages
+
+    def cursor(self, pk: int) -> str:
+        return PostPagination().encode_cursor(Post.objects.get(pk=pk))
+
+    def test_forward_and_backward(self):
+        expected = [self.ids[0:3], self.ids[3:6], self.ids[6:7]]
+        forward = self.pages(self.get(self.url, limit=3), "next")
+        self.assertEqual(forward, expected)
+
+        last = self.get(self.url, limit=3)
+        while last["next"]:
+            last = self.get(last["next"])
+        self.assertEqual(self.pages(last, "previous"), expected[::-1])
+
+    def test_since_id(self):
+        since_id = self.ids[3]
+        data = self.get(self.url, since_id=since_id)
+        self.assertEqual(
+            [post["id"] for post in data["results"]],
+            [pk for pk in self.ids if pk > since_id],
+        )
+
+    def test_empty_page(self):
+        data = self.get(self.url, since_id=max(self.ids))
+        self.assertEqual(data, {"next": None, "previous": None, "results": []})
+
+        last = self.get(self.url, limit=len(self.ids))["results"][-1]
+        data = self.get(self.url, limit=3, after=self.cursor(last["id"]))
+        self.assertEqual(data["results"], [])
+        self.assertIsNone(data["next"])
+
+    def test_invalid_cursor(self):
+        for param, value in (
+            ("after", "not-a-cursor"),
+            ("before", base64.urlsafe_b64encode(b"[1]").decode()),
+            ("after", base64.urlsafe_b64encode(b'["x", 1]').decode()),
+            ("since_id", "-1"),
+        ):
+            with self.subTest(param=param, value=value):
+                response = self.client.get(self.url, {param: value})
+                self.assertEqual(response.status_code, 404)
+
+
+class HashtagQueryCountTests(TestCase):
+    """Hashtag indexing on save costs a fixed number of queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("author")
+        Post.objects.create(user=cls.user, content="#one #two")
+
+    def test_create_with_known_hashtags(self):
+        # Post insert, hashtag lookup, link insert, two bucket writes.
+        for content in ("#one", "#one #two #one"):
+            with self.subTest(content=content), self.assertNumQueries(5):
+                Post.objects.create(user=self.user, content=content)
+
+    def test_create_with_new_hashtags(self):
+        # Plus one bulk insert and one lookup of the missing hashtags.
+        for content in ("#three", "#one #four #five #six #seven"):
+            with self.subTest(content=content), self.assertNumQueries(7):
+                Post.objects.create(user=self.user, content=content)
+
+    def test_update_with_changed_content(self):
+        post = Post.objects.create(user=self.user, content="#one #two")
+        post.content = "#two #three #four"
+        # Only the added and removed links and bucket deltas are written.
+        with self.assertNumQueries(10):
+            post.save()
+        self.assertEqual(
+            set(post.hashtags.values_list("name", flat=True)),
+            {"two", "three", "four"},
+        )
+
+    def test_update_without_content_change(self):
+        post = Post.objects.create(user=self.user, content="#one #two")
+        with self.assertNumQueries(1):
+            post.save(update_fields=["image"])
+
+
+class EagerTaskTests(TestCase):
+    """Celery tasks run eagerly under the test settings."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("author")
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(HASHTAG_INDEXING_ASYNC=True)
+    def test_async_hashtag_indexing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(user=self.user, content="#one #two")
+        post.refresh_from_db()
+        self.assertFalse(post.hashtags_dirty)
+        self.assertEqual(
+            set(post.hashtags.values_list("name", flat=True)), {"one", "two"}
+        )
+
+    def test_dispatcher_publishes_due_posts(self):
+        now = timezone.now()
+        due = Post.objects.create(
+            user=self.user,
+            content="due",
+            scheduled_at=now - timedelta(minutes=1),
+            is_published=False,
+        )
+        later = Post.objects.create(
+            user=self.user,
+            content="later",
+            scheduled_at=now + timedelta(hours=1),
+            is_published=False,
+        )
+        dispatch_scheduled_posts.delay()
+        due.refresh_from_db()
+        later.refresh_from_db()
+        self.assertTrue(due.is_published)
+        self.assertFalse(later.is_published)
+
+    @override_settings(FEED_TIMELINE_ENABLED=True)
+    def test_dispatcher_retries_lost_fan_out(self):
+        follower = create_user("follower")
+        Follow.objects.create(follower=follower, following=self.user)
+        post = Post.objects.create(
+            user=self.user,
+            content="due",
+            scheduled_at=timezone.now() - timedelta(minutes=1),
+            is_published=False,
+        )
+        # The worker dies after publishing, before the fan-out is queued.
+        with mock.patch.object(
+            tasks.fan_out_post, "delay", side_effect=RuntimeError
+        ), self.assertRaises(RuntimeError):
+            dispatch_scheduled_posts.delay()
+        post.refresh_from_db()
+        self.assertTrue(post.is_published)
+        self.assertTrue(post.fan_out_pending)
+
+        dispatch_scheduled_posts.delay()
+        post.refresh_from_db()
+        self.assertFalse(post.fan_out_pending)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=follower, post=post).exists()
+        )
+
+    @override_settings(SCHEDULED_POSTS_DISPATCHER_ENABLED=False)
+    def test_scheduled_post_task(self):
+        scheduled_at = timezone.now() + timedelta(hours=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = api_client(self.user).post(
+                reverse("social_media:posts-list"),
+                {"content": "later", "scheduled_at": scheduled_at},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 201)
+        # Eager tasks ignore the ETA, so publish_post has already run.
+        self.assertTrue(
+            Post.objects.get(pk=response.json()["id"]).is_published
+        )
+
+
+class TrendingCountTests(TestCase):
+    """Trending buckets count published posts only, until deleted."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("author")
+
+    def counts(self) -> dict[str, int]:
+        return {
+            name: total
+            for name, total in HashtagBucket.objects.values_list(
+                "hashtag__name"
+            ).annotate(total=Sum("posts_count"))
+        }
+
+    def test_delete_uncounts_post(self):
+        post = Post.objects.create(user=self.user, content="#one #two")
+        Post.objects.create(user=self.user, content="#one")
+        self.assertEqual(self.counts(), {"one": 2, "two": 1})
+        post.delete()
+        self.assertEqual(self.counts(), {"one": 1, "two": 0})
+
+    def test_scheduled_post_counts_once_published(self):
+        post = Post.objects.create(
+            user=self.user,
+            content="#one",
+            scheduled_at=timezone.now() - timedelta(minutes=1),
+            is_published=False,
+        )
+        self.assertEqual(self.counts(), {})
+        dispatch_scheduled_posts.delay()
+        self.assertEqual(self.counts(), {"one": 1})
+        post.delete()
+        self.assertEqual(self.counts(), {"one": 0})
+
+    def test_unpublished_post_delete(self):
+        post = Post.objects.create(
+            user=self.user,
+            content="#one",
+            scheduled_at=timezone.now() + timedelta(hours=1),
+            is_published=False,
+        )
+        post.delete()
+        self.assertEqual(self.counts(), {})
+
+
+class BlacklistCacheTests(TestCase):
+    """A refresh token is rejected once blacklisted, cached or not."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("viewer")
+
+    def setUp(self):
+        cache.clear()
+        self.token = RefreshToken.for_user(self.user)
+
+    def refresh(self) -> int:
+        return (
+            APIClient()
+            .post(reverse("token_refresh"), {"refresh": str(self.token)})
+            .status_code
+        )
+
+    def blacklist_token(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.blacklist()
+
+    def test_blacklisted_after_cached_refresh(self):
+        self.assertEqual(self.refresh(), 200)
+        self.blacklist_token()
+        self.assertEqual(self.refresh(), 401)
+
+    def test_evicted_entry(self):
+        self.blacklist_token()
+        cache.delete(blacklist._key(self.token["jti"]))
+        self.assertEqual(self.refresh(), 401)
+
+
+class AuthCacheTests(TestCase):
+    """The cached user of a bearer token is dropped by the writing commit."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("viewer")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+        self.url = reverse("social_media:users-me")
+
+    def cached_user(self):
+        version = caching.get_version("auth", self.user.pk)
+        return cache.get(authentication._user_key(self.user.pk, version))
+
+    def test_deactivated(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertTrue(self.cached_user().is_active)
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertIsNone(self.cached_user())
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_logout(self):
+        refresh = RefreshToken.for_user(self.user)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertIsNotNone(self.cached_user())
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("logout"), {"refresh": str(refresh)}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(self.cached_user())
+        response = APIClient().post(
+            reverse("token_refresh"), {"refresh": str(refresh)}
+        )
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(FEED_TIMELINE_ENABLED=True, FEED_TIMELINE_MAX_ENTRIES=3)
+class TimelineTests(TestCase):
+    """Follows fill and unfollows empty a timeline, up to the cap."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = create_user("viewer")
+        cls.author = create_user("author")
+        for i in range(5):
+            Post.objects.create(user=cls.author, content=f"post {i}")
+        cls.latest = list(
+            Post.objects.order_by("-created_at").values_list("pk", flat=True)
+        )[:3]
+
+    def setUp(self):
+        cache.clear()
+        self.client = api_client(self.viewer)
+
+    def timeline_ids(self) -> list[int]:
+        return list(
+            TimelineEntry.objects.filter(user=self.viewer)
+            .order_by("-created_at")
+            .values_list("post_id", flat=True)
+        )
+
+    def relation(self, action: str):
+        url = reverse(f"social_media:users-{action}", args=[self.author.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(url).status_code, 200)
+
+    def test_follow_and_unfollow(self):
+        self.relation("follow")
+        self.assertEqual(self.timeline_ids(), self.latest)
+        self.relation("unfollow")
+        self.assertEqual(self.timeline_ids(), [])
+
+    def test_trim(self):
+        TimelineEntry.objects.bulk_create(
+            TimelineEntry(
+                user=self.viewer, post=post, created_at=post.created_at
+            )
+            for post in Post.objects.all()
+        )
+        self.assertEqual(timeline.users_over_cap(10), [self.viewer.pk])
+        tasks.trim_timelines.delay()
+        self.assertEqual(self.timeline_ids(), self.latest)
+        self.assertEqual(timeline.users_over_cap(10), [])
+
+
+@override_settings(
+    FEED_TIMELINE_ENABLED=True, FEED_FANOUT_FOLLOWER_THRESHOLD=2
+)
+class HybridFeedTests(TestCase):
+    """
+    The feed merges the pushed timeline with the posts of followed
+    authors above the fan-out threshold, one page at a time.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = create_user("viewer")
+        cls.pushed = create_user("pushed")
+        cls.pulled = create_user("pulled")
+        fan = create_user("fan")
+        Follow.objects.bulk_create(
+            [
+                Follow(follower=cls.viewer, following=cls.pushed),
+                Follow(follower=cls.viewer, following=cls.pulled),
+                Follow(follower=fan, following=cls.pulled),
+            ]
+        )
+        authors = [cls.pushed, cls.pulled, cls.viewer]
+        cls.posts = [
+            Post.objects.create(
+                user=authors[i % 3],
+                content=f"post {i}" + (" #tag" if i % 4 == 0 else ""),
+            )
+            for i in range(15)
+        ]
+        Post.objects.create(
+            user=cls.pulled,
+            content="draft #tag",
+            scheduled_at=timezone.now() + timedelta(hours=1),
+            is_published=False,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = api_client(self.viewer)
+        timeline.rebuild(self.viewer.pk)
+        # Left over from when the pulled author was still pushed.
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(
+                    user=self.viewer, post=post, created_at=post.created_at
+                )
+                for post in self.posts
+                if post.user_id == self.pulled.pk
+            ][::2]
+        )
+
+    def expected(self, hashtag: bool = False) -> list[int]:
+        return [
+            post.pk
+            for post in reversed(self.posts)
+            if not hashtag or "#tag" in post.content
+        ]
+
+    def pages(self, url: str, link: str) -> list[list[int]]:
+        pages = []
+        while url:
+            data = self.client.get(url).json()
+            pages.append([post["id"] for post in data["results"]])
+            url = data[link]
+        return pages
+
+    def test_forward_and_backward(self):
+        url = reverse("social_media:posts-feed") + "?limit=4"
+        pages = self.pages(url, "next")
+        self.assertEqual(sum(pages, []), self.expected())
+        self.assertEqual([len(page) for page in pages], [4, 4, 4, 3])
+
+        last = self.client.get(url).json()["next"]
+        for _ in range(2):
+            last = self.client.get(last).json()["next"]
+        backward = self.pages(last, "previous")
+        self.assertEqual(backward[1:], pages[-2::-1])
+
+    def test_hashtag(self):
+        url = reverse("social_media:posts-feed") + "?limit=2&hashtag=tag"
+        pages = self.pages(url, "next")
+        self.assertEqual(sum(pages, []), self.expected(hashtag=True))
+
+    def test_author_leaving_pull_set_is_restored(self):
+        timeline.get_pull_authors()
+        Follow.objects.filter(following=self.pulled).exclude(
+            follower=self.viewer
+        ).delete()
+        # The refresh task comes back after a day, beyond any timeout.
+        with mock.patch("time.time", return_value=time.time() + 86400):
+            timeline.refresh_pull_authors()
+        self.assertEqual(
+            TimelineEntry.objects.filter(
+                user=self.viewer, post__user=self.pulled
+            ).count(),
+            5,
+        )
+
+
+class AbstractBaseTests(TestCase):
+    def test_viewer_state_serializer_needs_targets(self):
+        with self.assertRaises(TypeError):
+
+            class Serializer(ViewerStateMixin, serializers.Serializer):
+                pass
+
+    def test_bulk_action_view_needs_apply(self):
+        with self.assertRaises(TypeError):
+            BulkActionView()
+
+
+class DraftLikeTests(TestCase):
+    """Only the author can like a draft; to others it does not exist."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user("author")
+        cls.viewer = create_user("viewer")
+        cls.draft = Post.objects.create(
+            user=cls.author,
+            content="draft",
+            scheduled_at=timezone.now() + timedelta(hours=1),
+            is_published=False,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def like(self, user: User) -> int:
+        url = reverse("social_media:posts-like", args=[self.draft.pk])
+        return api_client(user).post(url).status_code
+
+    def bulk_like(self, user: User) -> str:
+        response = api_client(user).post(
+            reverse("social_media:likes-bulk"),
+            {"actions": [{"id": self.draft.pk, "action": "like"}]},
+            format="json",
+        )
+        return response.json()["results"][0]["result"]
+
+    def test_like(self):
+        self.assertEqual(self.like(self.viewer), 404)
+        self.assertEqual(self.bulk_like(self.viewer), "not_found")
+        self.assertEqual(self.like(self.author), 200)
+        self.assertEqual(Like.objects.get().user, self.author)
+
+    @override_settings(LIKE_BUFFER_ENABLED=True)
+    def test_buffered_like(self):
+        self.assertEqual(self.like(self.viewer), 404)
+        self.assertEqual(self.bulk_like(self.viewer), "not_found")
+        self.assertEqual(self.like(self.author), 200)
+        self.assertIsNone(like_buffer.state(self.viewer.pk, self.draft.pk))
+
+
+class CommentCountTests(TestCase):
+    """Creating and deleting a comment keeps comments_count in step."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("viewer")
+        cls.post = Post.objects.create(user=cls.user, content="post")
+
+    def setUp(self):
+        cache.clear()
+        self.client = api_client(self.user)
+
+    def assertCommentsCounted(self, expected: int):
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, expected)
+        self.assertEqual(self.post.comments.count(), expected)
+        detail = reverse("social_media:posts-detail", args=[self.post.pk])
+        self.assertEqual(
+            self.client.get(detail).json()["comments_count"], expected
+        )
+
+    def test_create_and_destroy(self):
+        url = reverse(
+            "social_media:post-comments-list",
+            kwargs={"post_pk": self.post.pk},
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {"text": "hi"})
+        self.assertEqual(response.status_code, 201)
+        self.assertCommentsCounted(1)
+
+        url = reverse(
+            "social_media:post-comments-detail",
+            kwargs={"post_pk": self.post.pk, "pk": response.json()["id"]},
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertCommentsCounted(0)
+
+
+class DraftCommentTests(TestCase):
+    """Comments of a draft are only reachable by its author."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user("author")
+        cls.viewer = create_user("viewer")
+        cls.draft = Post.objects.create(
+            user=cls.author,
+            content="draft",
+            scheduled_at=timezone.now() + timedelta(hours=1),
+            is_published=False,
+        )
+        cls.url = reverse(
+            "social_media:post-comments-list",
+            kwargs={"post_pk": cls.draft.pk},
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_other_user(self):
+        client = api_client(self.viewer)
+        self.assertEqual(client.get(self.url).status_code, 404)
+        self.assertEqual(
+            client.post(self.url, {"text": "hi"}).status_code, 404
+        )
+        self.draft.refresh_from_db()
+        self.assertEqual(self.draft.comments_count, 0)
+
+    def test_author(self):
+        client = api_client(self.author)
+        self.assertEqual(
+            client.post(self.url, {"text": "hi"}).status_code, 201
+        )
+        self.assertEqual(len(client.get(self.url).json()["results"]), 1)
+
+
+@override_settings(LIKE_BUFFER_ENABLED=True)
+class LikeBufferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("viewer")
+        cls.post = Post.objects.create(user=cls.user, content="post")
+
+    def setUp(self):
+        cache.clear()
+        self.client = api_client(self.user)
+        self.url = reverse("social_media:posts-like", args=[self.post.pk])
+
+    def test_state_kept_until_flushed(self):
+        self.assertEqual(self.client.post(self.url).status_code, 200)
+        self.assertTrue(like_buffer.state(self.user.pk, self.post.pk))
+        self.assertEqual(self.client.post(self.url).status_code, 400)
+
+        like_buffer.flush()
+        self.assertIsNone(like_buffer.state(self.user.pk, self.post.pk))
+        self.assertEqual(like_buffer.states(self.user.pk), {})
+        self.assertEqual(self.client.post(self.url).status_code, 400)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertEqual(Like.objects.count(), 1)
+
+    def test_state_recorded_during_flush_is_kept(self):
+        self.client.post(self.url)
+        flushed = cache.get(like_buffer.SEQ_KEY)
+        unlike = reverse("social_media:posts-unlike", args=[self.post.pk])
+        self.client.post(unlike)
+        # Release as if the flush had only covered the like.
+        like_buffer._release_states([(self.user.pk, self.post.pk)], flushed)
+        self.assertFalse(like_buffer.state(self.user.pk, self.post.pk))
+
+    def test_like_by_deleted_user_not_counted(self):
+        other = create_user("other")
+        self.client.post(self.url)
+        api_client(other).post(self.url)
+        other.delete()
+
+        like_buffer.flush()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertEqual(Like.objects.count(), 1)
+        self.assertEqual(like_buffer.count_deltas([self.post.pk]), {})
+
+    def test_check_requires_shared_cache(self):
+        errors = checks.check_like_buffer_cache(None)
+        self.assertEqual([e.id for e in errors], ["social_media.E001"])
+        redis = {
+            "default": {
+                "BACKEND": "django.core.cache.backends.redis.RedisCache"
+            }
+        }
+        with self.settings(CACHES=redis):
+            self.assertEqual(checks.check_like_buffer_cache(None), [])
+
+
+class ConcurrentRelationTests(TransactionTestCase):
+    """
+    Duplicate like/unlike and follow requests sent at the same time
+    change the relation once: one 200 and a 400 for the rest.
+    """
+
+    workers = 8
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user("viewer")
+        self.author = create_user("author")
+        self.post = Post.objects.create(user=self.author, content="post")
+
+    def hammer(self, url: str) -> Counter:
+        barrier = threading.Barrier(self.workers)
+
+        def request(_) -> int:
+            client = api_client(self.user)
+            try:
+                barrier.wait()
+                return client.post(url).status_code
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(self.workers) as pool:
+            return Counter(pool.map(request, range(self.workers)))
+
+    def assertLikesCounted(self, expected: int):
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, expected)
+        self.assertEqual(Like.objects.filter(post=self.post).count(), expected)
+
+    def test_like_and_unlike(self):
+        expected = Counter({200: 1, 400: self.workers - 1})
+        like = reverse("social_media:posts-like", args=[self.post.pk])
+        self.assertEqual(self.hammer(like), expected)
+        self.assertLikesCounted(1)
+
+        unlike = reverse("social_media:posts-unlike", args=[self.post.pk])
+        self.assertEqual(self.hammer(unlike), expected)
+        self.assertLikesCounted(0)
+
+    def test_mixed_like_and_unlike(self):
+        """
+        The successful calls of each user alternate between liking and
+        unliking, so the stored like matches the parity of their count.
+        """
+        users = [self.user] + [create_user(f"user{i}") for i in range(3)]
+        like = reverse("social_media:posts-like", args=[self.post.pk])
+        unlike = reverse("social_media:posts-unlike", args=[self.post.pk])
+        calls = [(user, url) for user in users for url in (like, unlike) * 4]
+        barrier = threading.Barrier(self.workers)
+
+        def request(call) -> tuple[int, str, int]:
+            user, url = call
+            client = api_client(user)
+            try:
+                barrier.wait()
+                return user.pk, url, client.post(url).status_code
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(self.workers) as pool:
+            results = list(pool.map(request, calls))
+        self.assertEqual({code for _, _, code in results}, {200, 400})
+        net = Counter()
+        for pk, url, code in results:
+            if code == 200:
+                net[pk] += 1 if url == like else -1
+        stored = set(
+            Like.objects.filter(post=self.post).values_list(
+                "user_id", flat=True
+            )
+        )
+        for user in users:
+            with self.subTest(user=user.username):
+                self.assertIn(net[user.pk], (0, 1))
+                self.assertEqual(user.pk in stored, net[user.pk] == 1)
+        self.assertLikesCounted(len(stored))
+
+    @override_settings(LIKE_BUFFER_ENABLED=True)
+    def test_buffered_like_and_unlike(self):
+        states = like_buffer.states
+
+        def slow_states(*args):
+            # Widen the window between reading and recording a state.
+            result = states(*args)
+            time.sleep(0.05)
+            return result
+
+        patcher = mock.patch.object(like_buffer, "states", slow_states)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        expected = Counter({200: 1, 400: self.workers - 1})
+        like = reverse("social_media:posts-like", args=[self.post.pk])
+        self.assertEqual(self.hammer(like), expected)
+        self.assertEqual(
+            like_buffer.count_deltas([self.post.pk]), {self.post.pk: 1}
+        )
+
+        unlike = reverse("social_media:posts-unlike", args=[self.post.pk])
+        self.assertEqual(self.hammer(unlike), expected)
+        self.assertEqual(like_buffer.count_deltas([self.post.pk]), {})
+        like_buffer.flush()
+        self.assertLikesCounted(0)
+
+    @override_settings(LIKE_BUFFER_ENABLED=True)
+    def test_buffered_likes_of_several_posts(self):
+        posts = Post.objects.bulk_create(
+            Post(user=self.author, content=f"post {i}")
+            for i in range(self.workers)
+        )
+        get = LocMemCache.get
+
+        def slow_get(cache, key, *args, **kwargs):
+            # Widen the window between reading and writing the user's set.
+            result = get(cache, key, *args, **kwargs)
+            if key.startswith("likes:buffer:user:"):
+                time.sleep(0.05)
+            return result
+
+        patcher = mock.patch.object(LocMemCache, "get", slow_get)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        barrier = threading.Barrier(self.workers)
+
+        def like(post) -> int:
+            client = api_client(self.user)
+            try:
+                barrier.wait()
+                url = reverse("social_media:posts-like", args=[post.pk])
+                return client.post(url).status_code
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(self.workers) as pool:
+            self.assertEqual(set(pool.map(like, posts)), {200})
+        self.assertEqual(
+            set(like_buffer.states(self.user.pk)), {post.pk for post in posts}
+        )
+
+    def test_follow(self):
+        url = reverse("social_media:users-follow", args=[self.author.pk])
+        self.assertEqual(
+            self.hammer(url), Counter({200: 1, 400: self.workers - 1})
+        )
+        self.assertEqual(Follow.objects.count(), 1)
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Reads of safe requests go to the replica, unless the request or user
+    wrote recently or the replica lags. The replica holds different posts
+    than `default`, so the response tells which one was read. Reads in
+    transactions stay on `default`, hence no TestCase.
+    """
+
+    databases = {"default", "replica_1"}
+
+    def setUp(self):
+        # Not a class decorator: replicas are not migrated, so replica_1
+        # is only flushed after each test while it is not one.
+        replicas = self.settings(
+            REPLICA_DATABASES=["replica_1"], REPLICA_MAX_LAG=1
+        )
+        replicas.enable()
+        self.addCleanup(replicas.disable)
+        cache.clear()
+        routing._lag_checks.clear()
+        self.user = create_user("viewer")
+        self.post = Post.objects.create(user=self.user, content="primary")
+        replica = "replica_1"
+        User.objects.using(replica).bulk_create(
+            [
+                User(
+                    pk=self.user.pk,
+                    username=self.user.username,
+                    email=self.user.email,
+                    password=self.user.password,
+                )
+            ]
+        )
+        Profile.objects.using(replica).bulk_create(
+            [Profile(pk=self.user.profile.pk, user_id=self.user.pk)]
+        )
+        self.replica_post = Post.objects.using(replica).bulk_create(
+            [Post(pk=self.post.pk + 1, user_id=self.user.pk, content="copy")]
+        )[0]
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+
+    def listed_ids(self) -> list[int]:
+        response = self.client.get(reverse("social_media:posts-list"))
+        self.assertEqual(response.status_code, 200)
+        return [post["id"] for post in response.json()["results"]]
+
+    def test_get_reads_replica(self):
+        self.assertEqual(self.listed_ids(), [self.replica_post.pk])
+
+    def test_read_after_write_uses_default(self):
+        read_from = []
+
+        def view(request):
+            read_from.append(router.db_for_read(Post))
+            Post.objects.create(user=self.user, content="new")
+            read_from.append(router.db_for_read(Post))
+            return HttpResponse()
+
+        middleware = routing.ReplicaRoutingMiddleware(view)
+        middleware(RequestFactory().get("/"))
+        self.assertEqual(read_from, ["replica_1", "default"])
+
+    def test_pinned_after_write(self):
+        response = self.client.patch(
+            reverse("social_media:posts-detail", args=[self.post.pk]),
+            {"content": "edited"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(routing.is_pinned(self.user.pk))
+        # The GET only carries the bearer token, which the middleware
+        # reads itself since DRF authenticates later.
+        self.assertEqual(self.listed_ids(), [self.post.pk])
+
+        cache.delete(routing._sticky_key(self.user.pk))
+        self.assertEqual(self.listed_ids(), [self.replica_post.pk])
+
+    def test_cache_filled_from_primary(self):
+        Post.objects.using("replica_1").bulk_create(
+            [Post(pk=self.post.pk, user_id=self.user.pk, content="primary")]
+        )
+        url = reverse("social_media:posts-detail", args=[self.post.pk])
+        self.client.patch(url, {"content": "edited"})
+        # Another user's read misses the payload cache right after the
+        # write; the lagging replica must not fill it.
+        other = create_user("other")
+        other_client = APIClient()
+        other_client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(other)}"
+        )
+        for reader, client in (
+            ("other", other_client),
+            ("author", self.client),
+        ):
+            with self.subTest(reader=reader):
+                response = client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()["content"], "edited")
+
+    def test_auth_user_filled_from_primary(self):
+        # The replica still has the user active; a cache miss right after
+        # the deactivation must not authenticate from it.
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(reverse("social_media:posts-list"))
+        self.assertEqual(response.status_code, 401)
+
+    def test_lagging_or_unreachable_replica(self):
+        for lag in (10.0, None):
+            routing._lag_checks.clear()
+            with self.subTest(lag=lag), mock.patch(
+                "social_media.routing.replica_lag", return_value=lag
+            ):
+                self.assertEqual(self.listed_ids(), [self.post.pk])
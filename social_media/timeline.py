@@ -0,0 +1,359 @@
+"""
+Materialized home timelines (fan-out-on-write).
+
+When enabled with FEED_TIMELINE_ENABLED, every published post is copied
+into the TimelineEntry rows of its author and their followers, so the
+feed reads a single user's precomputed entries instead of building an
+`user_id IN (...)` query over Post on each request.
+
+Authors with at least FEED_FANOUT_FOLLOWER_THRESHOLD followers are not
+fanned out; their posts are pulled at read time and merged into the
+pushed entries (hybrid push/pull). When an author drops below the
+threshold, their latest posts are backfilled into follower timelines.
+The pull set is cached without expiry and only replaced by a refresh,
+which compares it with the previous set, so authors cannot leave it
+unnoticed while the refresh task is not running.
+"""
+
+import heapq
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import RowNumber
+
+from . import metrics
+from .models import Follow, Post, TimelineEntry
+
+logger = logging.getLogger(__name__)
+
+FAN_OUT_CHUNK_SIZE = 1000
+# Followers per backfill batch when an author leaves the pull set; each
+# gets up to FEED_TIMELINE_MAX_ENTRIES rows.
+RESTORE_CHUNK_SIZE = 100
+PULL_AUTHORS_CACHE_KEY = "timeline:pull_authors"
+
+metrics.register(
+    "feed.fanout_follower_threshold",
+    "feed.pull_authors",
+    "feed.fanout.pushed_posts",
+    "feed.fanout.pulled_posts",
+    "feed.fanout.deliveries",
+    "feed.reads.pushed_only",
+    "feed.reads.hybrid",
+    "feed.reads.pulled_streams",
+)
+
+
+def is_enabled() -> bool:
+    return settings.FEED_TIMELINE_ENABLED
+
+
+def refresh_pull_authors() -> frozenset[int]:
+    """
+    Recompute the authors whose posts are pulled at read time: those with
+    at least FEED_FANOUT_FOLLOWER_THRESHOLD followers.
+    """
+    threshold = settings.FEED_FANOUT_FOLLOWER_THRESHOLD
+    cached = cache.get(PULL_AUTHORS_CACHE_KEY)
+    author_ids = frozenset(
+        Follow.objects.order_by()
+        .values("following_id")
+        .annotate(followers=Count("pk"))
+        .filter(followers__gte=threshold)
+        .values_list("following_id", flat=True)
+    )
+    cache.set(PULL_AUTHORS_CACHE_KEY, (threshold, author_ids), timeout=None)
+    metrics.set_gauge("feed.fanout_follower_threshold", threshold)
+    metrics.set_gauge("feed.pull_authors", len(author_ids))
+    if cached is not None:
+        # Posts of authors who became pushed again were never fanned out.
+        from .tasks import restore_pushed_author
+
+        for author_id in cached[1] - author_ids:
+            restore_pushed_author.delay(author_id)
+    return author_ids
+
+
+def get_pull_authors() -> frozenset[int]:
+    cached = cache.get(PULL_AUTHORS_CACHE_KEY)
+    if cached is None or cached[0] != settings.FEED_FANOUT_FOLLOWER_THRESHOLD:
+        return refresh_pull_authors()
+    return cached[1]
+
+
+def fan_out(post_id: int) -> int:
+    """Push a published post into the timelines of its author and followers."""
+    post = (
+        Post.objects.filter(pk=post_id, is_published=True)
+        .values("user_id", "created_at")
+        .first()
+    )
+    if post is None:
+        return 0
+
+    if post["user_id"] in get_pull_authors():
+        # High-follower authors are merged into feeds at read time; only
+        # their own timeline gets the entry.
+        metrics.incr("feed.fanout.pulled_posts")
+        logger.info(
+            f"Post {post_id} not fanned out: author {post['user_id']} "
+            f"is above the follower threshold."
+        )
+        return _deliver(post_id, post["created_at"], [post["user_id"]])
+
+    metrics.incr("feed.fanout.pushed_posts")
+    follower_ids = (
+        Follow.objects.filter(following_id=post["user_id"])
+        .values_list("follower_id", flat=True)
+        .iterator(chunk_size=FAN_OUT_CHUNK_SIZE)
+    )
+
+    delivered = 0
+    chunk = [post["user_id"]]
+    for follower_id in follower_ids:
+        chunk.append(follower_id)
+        if len(chunk) >= FAN_OUT_CHUNK_SIZE:
+            delivered += _deliver(post_id, post["created_at"], chunk)
+            chunk = []
+    if chunk:
+        delivered += _deliver(post_id, post["created_at"], chunk)
+    metrics.incr("feed.fanout.deliveries", delivered)
+    return delivered
+
+
+def _deliver(post_id: int, created_at, user_ids: list[int]) -> int:
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                user_id=user_id, post_id=post_id, created_at=created_at
+            )
+            for user_id in user_ids
+        ],
+        ignore_conflicts=True,
+    )
+    return len(user_ids)
+
+
+def backfill(follower_id: int, following_id: int) -> None:
+    """Copy the latest posts of a newly followed user into a timeline."""
+    if following_id in get_pull_authors():
+        return
+    posts = (
+        Post.objects.filter(user_id=following_id, is_published=True)
+        .order_by("-created_at")
+        .values_list("pk", "created_at")[: settings.FEED_TIMELINE_MAX_ENTRIES]
+    )
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                user_id=follower_id, post_id=pk, created_at=created_at
+            )
+            for pk, created_at in posts
+        ],
+        ignore_conflicts=True,
+    )
+    trim([follower_id])
+
+
+def restore_author(author_id: int) -> int:
+    """
+    Copy the latest posts of an author who left the pull set into their
+    followers' timelines, which skipped those posts while they were
+    pulled at read time. Returns the number of followers backfilled.
+    """
+    if author_id in get_pull_authors():
+        return 0
+    posts = list(
+        Post.objects.filter(user_id=author_id, is_published=True)
+        .order_by("-created_at")
+        .values_list("pk", "created_at")[: settings.FEED_TIMELINE_MAX_ENTRIES]
+    )
+    if not posts:
+        return 0
+    follower_ids = (
+        Follow.objects.filter(following_id=author_id)
+        .values_list("follower_id", flat=True)
+        .iterator(chunk_size=FAN_OUT_CHUNK_SIZE)
+    )
+
+    restored = 0
+    chunk = []
+    for follower_id in follower_ids:
+        chunk.append(follower_id)
+        if len(chunk) >= RESTORE_CHUNK_SIZE:
+            restored += _restore_chunk(posts, chunk)
+            chunk = []
+    if chunk:
+        restored += _restore_chunk(posts, chunk)
+    return restored
+
+
+def _restore_chunk(posts: list[tuple], user_ids: list[int]) -> int:
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post_id=pk, created_at=created_at)
+            for user_id in user_ids
+            for pk, created_at in posts
+        ],
+        batch_size=FAN_OUT_CHUNK_SIZE,
+        ignore_conflicts=True,
+    )
+    trim(user_ids)
+    return len(user_ids)
+
+
+def remove_author(follower_id: int, following_id: int) -> None:
+    """Drop an unfollowed user's posts from a timeline."""
+    TimelineEntry.objects.filter(
+        user_id=follower_id, post__user_id=following_id
+    ).delete()
+
+
+def rebuild(user_id: int) -> None:
+    """Recompute a whole timeline from the user's current follow graph."""
+    pull_authors = get_pull_authors()
+    author_ids = [
+        following_id
+        for following_id in Follow.objects.filter(
+            follower_id=user_id
+        ).values_list("following_id", flat=True)
+        if following_id not in pull_authors
+    ] + [user_id]
+    posts = (
+        Post.objects.filter(user_id__in=author_ids, is_published=True)
+        .order_by("-created_at")
+        .values_list("pk", "created_at")[: settings.FEED_TIMELINE_MAX_ENTRIES]
+    )
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post_id=pk, created_at=created_at)
+            for pk, created_at in posts
+        ]
+    )
+
+
+def trim(user_ids: list[int]) -> int:
+    """Delete entries beyond FEED_TIMELINE_MAX_ENTRIES for the given users."""
+    overflow_ids = list(
+        TimelineEntry.objects.filter(user_id__in=user_ids)
+        .annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=F("user_id"),
+                order_by=F("created_at").desc(),
+            )
+        )
+        .filter(position__gt=settings.FEED_TIMELINE_MAX_ENTRIES)
+        .values_list("pk", flat=True)
+    )
+    if not overflow_ids:
+        return 0
+    deleted, _ = TimelineEntry.objects.filter(pk__in=overflow_ids).delete()
+    return deleted
+
+
+def users_over_cap(limit: int) -> list[int]:
+    """Return up to `limit` users whose timelines exceed the cap."""
+    return list(
+        TimelineEntry.objects.order_by()
+        .values("user_id")
+        .annotate(entries=Count("pk"))
+        .filter(entries__gt=settings.FEED_TIMELINE_MAX_ENTRIES)
+        .values_list("user_id", flat=True)[:limit]
+    )
+
+
+def followed_pull_authors(user_id: int) -> list[int]:
+    """Return the high-follower authors the user follows."""
+    pull_authors = get_pull_authors()
+    if not pull_authors:
+        return []
+    return list(
+        Follow.objects.filter(
+            follower_id=user_id, following_id__in=pull_authors
+        ).values_list("following_id", flat=True)
+    )
+
+
+def _read_stream(
+    queryset, key: str, position: tuple | None, descending: bool, limit: int
+) -> list[tuple]:
+    """Up to `limit` (created_at, `key`) rows past `position`, in order."""
+    lookup = "lt" if descending else "gt"
+    if position is not None:
+        created_at, pk = position
+        queryset = queryset.filter(
+            Q(**{f"created_at__{lookup}": created_at})
+            | Q(created_at=created_at, **{f"{key}__{lookup}": pk})
+        )
+    ordering = (
+        ("-created_at", f"-{key}") if descending else ("created_at", key)
+    )
+    return list(
+        queryset.order_by(*ordering).values_list("created_at", key)[:limit]
+    )
+
+
+def merged_feed_ids(
+    user_id: int,
+    pull_author_ids: list[int],
+    posts,
+    limit: int,
+    after: tuple | None = None,
+    before: tuple | None = None,
+) -> list[int]:
+    """
+    Merge the user's pushed timeline with the posts of each pulled author
+    and return up to `limit` post ids: the newest below the (created_at,
+    id) position `after` or, with `before`, the oldest above it. `posts`
+    selects the eligible posts (published, hashtag) and is applied
+    inside every stream, so each row read can be on the page.
+
+    Every stream is sorted by (created_at, id) and read `limit` rows at a
+    time into a k-way heap merge. A post can be both pushed and pulled;
+    when such duplicates leave the page short, reading resumes from the
+    nearest position where a stream with more rows stopped.
+    """
+    sources = [
+        (
+            TimelineEntry.objects.filter(user_id=user_id, post__in=posts),
+            "post_id",
+        ),
+        *(
+            (posts.filter(user_id=author_id), "id")
+            for author_id in pull_author_ids
+        ),
+    ]
+    metrics.incr("feed.reads.pulled_streams", len(pull_author_ids))
+    descending = before is None
+    position = after if descending else before
+
+    post_ids, seen = [], set()
+    while True:
+        streams = [
+            _read_stream(queryset, key, position, descending, limit)
+            for queryset, key in sources
+        ]
+        # Rows beyond the last one read from a stream with more rows are
+        # not known yet, so the merge stops there.
+        unread = [rows[-1] for rows in streams if len(rows) == limit]
+        horizon = None
+        if unread:
+            horizon = max(unread) if descending else min(unread)
+        for row in heapq.merge(*streams, reverse=descending):
+            if horizon is not None and (
+                row < horizon if descending else row > horizon
+            ):
+                break
+            if row[1] in seen:
+                continue
+            seen.add(row[1])
+            post_ids.append(row[1])
+            if len(post_ids) >= limit:
+                return post_ids
+        if horizon is None:
+            return post_ids
+        position = horizon
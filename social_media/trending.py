@@ -0,0 +1,166 @@
+"""
+Trending hashtags from rolling-window counters.
+
+Indexing a published post, or publishing an indexed one, increments a
+per-hashtag counter in the time bucket of the post's publication time,
+and deleting it decrements the counter again. The trending score sums
+the buckets inside TRENDING_WINDOW, each weighted by exponential decay
+with half-life TRENDING_HALF_LIFE, and the top entries are cached until
+the next periodic refresh.
+"""
+
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, F, FloatField, Q, Sum, Value, When
+from django.utils import timezone
+
+from .models import Hashtag, HashtagBucket, Post
+
+TRENDING_CACHE_KEY = "hashtags:trending"
+
+
+def bucket_start(moment: datetime) -> datetime:
+    size = settings.TRENDING_BUCKET_SECONDS
+    epoch = int(moment.timestamp())
+    return datetime.fromtimestamp(epoch - epoch % size, tz=moment.tzinfo)
+
+
+def published_at(
+    created_at: datetime, scheduled_at: datetime | None
+) -> datetime:
+    """When a post went out: its schedule, or its creation if later."""
+    if scheduled_at is None:
+        return created_at
+    return max(created_at, scheduled_at)
+
+
+def record_posts(post_ids, sign: int) -> None:
+    """
+    Count (sign=1) or uncount (sign=-1) the hashtag links of the given
+    posts that are published.
+    """
+    deltas = Counter(
+        (hashtag_id, bucket_start(published_at(created_at, scheduled_at)))
+        for hashtag_id, created_at, scheduled_at in (
+            Post.hashtags.through.objects.filter(
+                post_id__in=post_ids, post__is_published=True
+            ).values_list(
+                "hashtag_id", "post__created_at", "post__scheduled_at"
+            )
+        )
+    )
+    record(Counter({key: sign * count for key, count in deltas.items()}))
+
+
+def record(deltas: Counter) -> None:
+    """Apply {(hashtag_id, bucket_start): delta} to the bucket counters."""
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    HashtagBucket.objects.bulk_create(
+        [
+            HashtagBucket(hashtag_id=hashtag_id, bucket_start=start)
+            for hashtag_id, start in deltas
+        ],
+        ignore_conflicts=True,
+    )
+    grouped = defaultdict(list)
+    for (hashtag_id, start), delta in deltas.items():
+        grouped[start, delta].append(hashtag_id)
+    for (start, delta), hashtag_ids in grouped.items():
+        HashtagBucket.objects.filter(
+            bucket_start=start, hashtag_id__in=hashtag_ids
+        ).update(posts_count=F("posts_count") + delta)
+
+
+def compute(now: datetime | None = None) -> list[dict]:
+    """Score hashtags over the trending window and return the top ones."""
+    now = now or timezone.now()
+    window_start = bucket_start(now - settings.TRENDING_WINDOW)
+    half_life = settings.TRENDING_HALF_LIFE.total_seconds()
+    size = timedelta(seconds=settings.TRENDING_BUCKET_SECONDS)
+
+    weights = []
+    start = window_start
+    while start <= now:
+        age = max((now - start).total_seconds(), 0)
+        weights.append(
+            When(bucket_start=start, then=Value(0.5 ** (age / half_life)))
+        )
+        start += size
+
+    rows = (
+        HashtagBucket.objects.filter(bucket_start__gte=window_start)
+        .values("hashtag_id")
+        .annotate(
+            score=Sum(
+                F("posts_count")
+                * Case(*weights, default=Value(0.0), output_field=FloatField())
+            ),
+            posts_count=Sum("posts_count"),
+        )
+        .filter(posts_count__gt=0)
+        .order_by("-score")[: settings.TRENDING_SIZE]
+    )
+    names = dict(
+        Hashtag.objects.filter(
+            pk__in=[row["hashtag_id"] for row in rows]
+        ).values_list("pk", "name")
+    )
+    return [
+        {
+            "name": names[row["hashtag_id"]],
+            "score": round(row["score"], 3),
+            "posts_count": row["posts_count"],
+        }
+        for row in rows
+        if row["hashtag_id"] in names
+    ]
+
+
+def refresh() -> list[dict]:
+    trending = compute()
+    cache.set(TRENDING_CACHE_KEY, trending, settings.TRENDING_CACHE_TIMEOUT)
+    return trending
+
+
+def get_trending() -> list[dict]:
+    trending = cache.get(TRENDING_CACHE_KEY)
+    if trending is None:
+        trending = refresh()
+    return trending
+
+
+def prune() -> int:
+    """Delete buckets that fell out of the retention period."""
+    deleted, _ = HashtagBucket.objects.filter(
+        bucket_start__lt=timezone.now() - settings.TRENDING_RETENTION
+    ).delete()
+    return deleted
+
+
+def rebuild(since: datetime) -> int:
+    """Recount all buckets from `since` on from the post/hashtag links."""
+    since = bucket_start(since)
+    HashtagBucket.objects.filter(bucket_start__gte=since).delete()
+    links = Post.hashtags.through.objects.filter(
+        Q(post__created_at__gte=since) | Q(post__scheduled_at__gte=since),
+        post__is_published=True,
+    ).values_list("hashtag_id", "post__created_at", "post__scheduled_at")
+    counts = Counter(
+        (hashtag_id, bucket_start(published_at(created_at, scheduled_at)))
+        for hashtag_id, created_at, scheduled_at in links.iterator()
+    )
+    HashtagBucket.objects.bulk_create(
+        [
+            HashtagBucket(
+                hashtag_id=hashtag_id, bucket_start=start, posts_count=total
+            )
+            for (hashtag_id, start), total in counts.items()
+        ],
+        batch_size=5000,
+    )
+    return len(counts)
@@ -2,13 +2,22 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_nested import routers
 
-from social_media.views import UserViewSet, PostViewSet, CommentViewSet
+from social_media.views import (
+    UserViewSet,
+    PostViewSet,
+    CommentViewSet,
+    HashtagViewSet,
+    MetricsView,
+    BulkLikeView,
+    BulkFollowView,
+)
 
 app_name = "social_media"
 
 router = DefaultRouter()
 router.register("users", UserViewSet, basename="users")
 router.register("posts", PostViewSet, basename="posts")
+router.register("hashtags", HashtagViewSet, basename="hashtags")
 
 posts_router = routers.NestedSimpleRouter(router, "posts", lookup="post")
 posts_router.register("comments", CommentViewSet, basename="post-comments")
@@ -16,4 +25,7 @@ posts_router.register("comments", CommentViewSet, basename="post-comments")
 urlpatterns = [
     path("", include(router.urls)),
     path("", include(posts_router.urls)),
+    path("likes/bulk/", BulkLikeView.as_view(), name="likes-bulk"),
+    path("follows/bulk/", BulkFollowView.as_view(), name="follows-bulk"),
+    path("metrics/", MetricsView.as_view(), name="metrics"),
 ]
@@ -1,22 +1,32 @@
-from typing import Type
+import hashlib
+from abc import ABC, abstractmethod
+from typing import Callable, Type
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.db import transaction
-from django.db.models import QuerySet, Count
+from django.db.models import QuerySet, F, Q
+from django.http import HttpResponseBase
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.functional import cached_property
+from django.utils.http import http_date
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import (
     extend_schema_view,
     extend_schema,
     OpenApiResponse,
     OpenApiExample,
+    OpenApiParameter,
 )
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
-from rest_framework.filters import SearchFilter
+from rest_framework.exceptions import NotFound
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import (
     IsAuthenticated,
+    IsAdminUser,
     AllowAny,
     BasePermission,
 )
@@ -24,14 +34,27 @@ from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.serializers import Serializer
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import (
-    RefreshToken,
-    TokenError,
-)
+from rest_framework_simplejwt.tokens import TokenError
 
-from .filters import PostFilter
+from .blacklist import RefreshToken
+from .filters import PostFilter, UserSearchFilter
 from .models import Post, Comment, Like, Follow
+from .pagination import (
+    FollowPagination,
+    PostPagination,
+    PostSearchPagination,
+    CommentPagination,
+)
 from .permissions import IsOwnerOrReadOnly
+from . import (
+    caching,
+    like_buffer,
+    metrics,
+    relations,
+    search,
+    timeline,
+    trending,
+)
 from .serializers import (
     UserRegistrationSerializer,
     ProfileSerializer,
@@ -42,18 +65,74 @@ from .serializers import (
     CommentSerializer,
     FollowerSerializer,
     FollowingSerializer,
+    TrendingHashtagSerializer,
+    UserPublicInfoSerializer,
+    BulkLikeSerializer,
+    BulkFollowSerializer,
+    BulkResponseSerializer,
+    BulkResultSerializer,
+)
+from .tasks import (
+    publish_post,
+    fan_out_post,
+    backfill_timeline,
+    remove_from_timeline,
 )
-from .tasks import publish_post
 
 User = get_user_model()
 
 
+def _lookup_id(view) -> int:
+    """Primary key from the URL, for detail views served from the cache."""
+    value = view.kwargs[view.lookup_url_kwarg or view.lookup_field]
+    if not str(value).isdigit():
+        raise NotFound
+    return int(value)
+
+
+def _conditional_response(
+    request: Request,
+    etag: str,
+    last_modified: int,
+    render: Callable[[], HttpResponseBase],
+) -> HttpResponseBase:
+    """
+    Answer 304 Not Modified when the client's validators still match,
+    otherwise the response from `render()`. Clients are told to
+    revalidate on every use.
+    """
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = render()
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _cached_response(
+    request: Request, cached: caching.Conditional | None
+) -> HttpResponseBase:
+    if cached is None:
+        raise NotFound
+    return _conditional_response(
+        request,
+        cached.etag,
+        cached.last_modified,
+        lambda: Response(cached.render()),
+    )
+
+
 @extend_schema_view(
     list=extend_schema(
         summary="List users",
         description=(
             "Retrieve a list of users.\n\n"
-            "Supports search by username or email.\n\n"
+            "Supports search by username or email. Results are ordered by "
+            "relevance: exact username, username prefix, email prefix, "
+            "then similarity.\n\n"
             "### Examples\n"
             "- Search by username:\n"
             "`GET /api/users/?search=user1`\n\n"
@@ -64,7 +143,12 @@ User = get_user_model()
     ),
     retrieve=extend_schema(
         summary="Retrieve a user",
-        description="Retrieve detailed information about a specific user.",
+        description=(
+            "Retrieve detailed information about a specific user. "
+            "Responds with ETag and Last-Modified; send them back as "
+            "If-None-Match / If-Modified-Since to get 304 Not Modified "
+            "when nothing changed."
+        ),
         responses=UserSerializer,
     ),
     create=extend_schema(
@@ -114,20 +198,41 @@ User = get_user_model()
             400: OpenApiResponse(description="You don't follow this user."),
         },
     ),
+    autocomplete=extend_schema(
+        summary="Autocomplete usernames",
+        description=(
+            "Return up to `limit` users (default 10, max 20) whose "
+            "username starts with `q`, case-insensitively, in "
+            "alphabetical order. The compact payload is cached briefly."
+        ),
+        parameters=[
+            OpenApiParameter("q", str, description="Username prefix."),
+            OpenApiParameter("limit", int, description="Maximum results."),
+        ],
+        responses=UserPublicInfoSerializer(many=True),
+    ),
     followers=extend_schema(
         summary="List followers",
-        description="Get a list of users who follow the specified user.",
-        responses=FollowerSerializer,
+        description=(
+            "Get the users who follow the specified user, most recent "
+            "first, with cursor paging. Supports If-None-Match / "
+            "If-Modified-Since conditional requests."
+        ),
+        responses=FollowerSerializer(many=True),
     ),
     following=extend_schema(
         summary="List following",
-        description="Get a list of users the specified user is following.",
-        responses=FollowingSerializer,
+        description=(
+            "Get the users the specified user is following, most recent "
+            "first, with cursor paging. Supports If-None-Match / "
+            "If-Modified-Since conditional requests."
+        ),
+        responses=FollowingSerializer(many=True),
     ),
 )
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.select_related("profile")
-    filter_backends = (SearchFilter,)
+    filter_backends = (UserSearchFilter,)
     search_fields = ("username", "email")
 
     def get_serializer_class(self) -> Type[Serializer]:
@@ -146,10 +251,21 @@ class UserViewSet(viewsets.ModelViewSet):
             self.permission_classes = [IsAuthenticated]
         return [permission() for permission in self.permission_classes]
 
+    def retrieve(self, request: Request, *args, **kwargs) -> Response:
+        """Serve the user from the payload cache."""
+        return _cached_response(
+            request, caching.user_detail(_lookup_id(self), request)
+        )
+
     @extend_schema(
         methods=["GET"],
         summary="Retrieve current user",
-        description="Return the authenticated user's full data.",
+        description=(
+            "Return the authenticated user's full data. "
+            "Responds with ETag and Last-Modified; send them back as "
+            "If-None-Match / If-Modified-Since to get 304 Not Modified "
+            "when nothing changed."
+        ),
         responses=UserSerializer,
     )
     @extend_schema(
@@ -173,8 +289,9 @@ class UserViewSet(viewsets.ModelViewSet):
     def me(self, request: Request, *args, **kwargs) -> Response:
         user = request.user
         if request.method == "GET":
-            serializer = self.get_serializer(user)
-            return Response(serializer.data)
+            return _cached_response(
+                request, caching.user_detail(user.pk, request)
+            )
 
         profile = user.profile
         serializer = self.get_serializer(
@@ -189,23 +306,30 @@ class UserViewSet(viewsets.ModelViewSet):
     )
     def follow(self, request: Request, pk: int | None = None) -> Response:
         """Follow a user."""
-        user_to_follow = self.get_object()
-        if user_to_follow == request.user:
+        user_id = _lookup_id(self)
+        if user_id == request.user.pk:
             return Response(
                 {"detail": "You cannot follow yourself."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        _, created = Follow.objects.get_or_create(
-            follower=request.user, following=user_to_follow
+        created = relations.add_follows(request.user.pk, [user_id]).get(
+            user_id
         )
-
+        if created is None:
+            raise NotFound
         if not created:
             return Response(
                 {"detail": "You already following this user."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        if timeline.is_enabled():
+            follower_id, following_id = request.user.id, user_id
+            transaction.on_commit(
+                lambda: backfill_timeline.delay(follower_id, following_id)
+            )
+
         return Response(
             {"detail": "Successfully followed the user."},
             status=status.HTTP_200_OK,
@@ -216,53 +340,162 @@ class UserViewSet(viewsets.ModelViewSet):
     )
     def unfollow(self, request: Request, pk: int | None = None) -> Response:
         """Unfollow a user."""
-        user_to_unfollow = self.get_object()
-
-        deleted_count, _ = Follow.objects.filter(
-            follower=request.user, following=user_to_unfollow
-        ).delete()
-
-        if deleted_count == 0:
+        user_id = _lookup_id(self)
+        deleted = relations.remove_follows(request.user.pk, [user_id]).get(
+            user_id
+        )
+        if deleted is None:
+            raise NotFound
+        if not deleted:
             return Response(
                 {"detail": "You don't following this user."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        if timeline.is_enabled():
+            follower_id, following_id = request.user.id, user_id
+            transaction.on_commit(
+                lambda: remove_from_timeline.delay(follower_id, following_id)
+            )
+
         return Response(
             {"detail": "Successfully unfollowed the user."},
         )
 
-    @action(methods=["GET"], detail=True, permission_classes=[IsAuthenticated])
-    def followers(self, request: Request, pk: int | None = None) -> Response:
-        """Get a list of users who follow the specified user."""
-        user = self.get_object()
-        followers_qs = user.followers.select_related("follower__profile")
-        serializer = FollowerSerializer(followers_qs, many=True)
-        return Response(serializer.data)
+    @action(
+        methods=["GET"], detail=False, permission_classes=[IsAuthenticated]
+    )
+    def autocomplete(self, request: Request) -> Response:
+        """Suggest users by username prefix."""
+        prefix = request.query_params.get("q", "").strip()
+        try:
+            limit = int(request.query_params.get("limit", 10))
+        except ValueError:
+            limit = 10
+        limit = max(1, min(limit, settings.USER_AUTOCOMPLETE_MAX_LIMIT))
 
-    @action(methods=["GET"], detail=True, permission_classes=[IsAuthenticated])
-    def following(self, request: Request, pk: int | None = None) -> Response:
-        """Get a list of users the specified user is following."""
-        user = self.get_object()
-        following_qs = user.following.select_related("following__profile")
-        serializer = FollowingSerializer(following_qs, many=True)
-        return Response(serializer.data)
+        data = []
+        if prefix:
+            digest = hashlib.md5(prefix.upper().encode()).hexdigest()
+            cache_key = f"users:autocomplete:{limit}:{digest}"
+            data = cache.get(cache_key)
+            if data is None:
+                users = search.autocomplete_users(
+                    self.get_queryset(), prefix, limit
+                )
+                data = UserPublicInfoSerializer(
+                    users, many=True, context={"request": request}
+                ).data
+                cache.set(
+                    cache_key, data, settings.USER_AUTOCOMPLETE_CACHE_TIMEOUT
+                )
+
+        response = Response(data)
+        patch_cache_control(
+            response,
+            private=True,
+            max_age=settings.USER_AUTOCOMPLETE_CACHE_TIMEOUT,
+        )
+        return response
+
+    def _follow_list(
+        self, request: Request, field: str, serializer_class: type
+    ) -> HttpResponseBase:
+        """
+        Page through a user's Follow rows, read with a narrow query, and
+        render the other side of each row from the author card cache.
+        `field` is the side to list: "follower" or "following".
+        """
+        user_id = _lookup_id(self)
+        if not User.objects.filter(pk=user_id).exists():
+            raise NotFound
+        owner_field = "following" if field == "follower" else "follower"
+        rows = self.paginator.paginate_queryset(
+            Follow.objects.filter(**{owner_field: user_id}).only(
+                "id", field, "created_at"
+            ),
+            request,
+            view=self,
+        )
+        user_versions = caching.get_versions(
+            "user", (getattr(row, f"{field}_id") for row in rows)
+        )
+        etag, last_modified = caching.validators(
+            [
+                caching.get_version("follows", user_id),
+                *user_versions.values(),
+            ],
+            field,
+            request.get_full_path(),
+        )
+
+        def render() -> Response:
+            cards = caching.author_cards(
+                user_versions.keys(), request, user_versions
+            )
+            serializer = serializer_class(
+                rows, many=True, context={"request": request, "cards": cards}
+            )
+            return self.paginator.get_paginated_response(serializer.data)
+
+        return _conditional_response(request, etag, last_modified, render)
+
+    @action(
+        methods=["GET"],
+        detail=True,
+        permission_classes=[IsAuthenticated],
+        pagination_class=FollowPagination,
+    )
+    def followers(
+        self, request: Request, pk: int | None = None
+    ) -> HttpResponseBase:
+        """Get a page of users who follow the specified user."""
+        return self._follow_list(request, "follower", FollowerSerializer)
+
+    @action(
+        methods=["GET"],
+        detail=True,
+        permission_classes=[IsAuthenticated],
+        pagination_class=FollowPagination,
+    )
+    def following(
+        self, request: Request, pk: int | None = None
+    ) -> HttpResponseBase:
+        """Get a page of users the specified user is following."""
+        return self._follow_list(request, "following", FollowingSerializer)
 
 
 @extend_schema_view(
     list=extend_schema(
         summary="List posts",
         description=(
-            "Retrieve a list of posts.\n\n"
+            "Retrieve a list of published posts. Scheduled posts appear "
+            "once they are published; owners find them under `drafts` "
+            "until then.\n\n"
             "Supports filtering by hashtag.\n\n"
-            "### Example\n"
-            "`GET /api/posts/?hashtag=example`"
+            "Results are cursor-paginated: follow the `next`/`previous` "
+            "links, or poll for new posts with `since_id`.\n\n"
+            "### Examples\n"
+            "- Filter by hashtag:\n"
+            "`GET /api/posts/?hashtag=example`\n\n"
+            "- Poll for posts newer than the one you already have:\n"
+            "`GET /api/posts/?since_id=42`\n\n"
+            "- Fetch known posts in one call (at most BULK_MAX_ITEMS). "
+            "The response is a plain list in the requested order, "
+            "without pagination:\n"
+            "`GET /api/posts/?ids=3,5,8`"
         ),
         responses=PostListSerializer,
     ),
     retrieve=extend_schema(
         summary="Retrieve a post",
-        description="Retrieve detailed information about a specific post.",
+        description=(
+            "Retrieve detailed information about a specific post. "
+            "Unpublished posts are only visible to their owner. "
+            "Responds with ETag and Last-Modified; send them back as "
+            "If-None-Match / If-Modified-Since to get 304 Not Modified "
+            "when nothing changed."
+        ),
         responses=PostDetailSerializer,
     ),
     create=extend_schema(
@@ -304,7 +537,8 @@ class UserViewSet(viewsets.ModelViewSet):
         description=(
             "Retrieve personalized feed containing posts from the user "
             "and users they follow.\n\n"
-            "Supports filtering by hashtag.\n\n"
+            "Supports filtering by hashtag and the same cursor "
+            "parameters as the post list.\n\n"
             "### Example\n"
             "`GET /api/posts/feed/?hashtag=example`"
         ),
@@ -320,6 +554,32 @@ class UserViewSet(viewsets.ModelViewSet):
         ),
         responses=PostListSerializer,
     ),
+    drafts=extend_schema(
+        summary="Scheduled posts",
+        description=(
+            "Retrieve the current user's posts that are scheduled but not "
+            "published yet.\n\n"
+            "Supports filtering by hashtag and the same cursor "
+            "parameters as the post list."
+        ),
+        responses=PostListSerializer,
+    ),
+    search=extend_schema(
+        summary="Search posts",
+        description=(
+            "Full-text search over post content. `q` accepts web search "
+            "syntax: quoted phrases, `or` and `-term` exclusions. The most "
+            "recent matches (5000 by default) are ordered by relevance "
+            "and paged with the `after`/`before` cursors. Supports "
+            "filtering by hashtag.\n\n"
+            "### Example\n"
+            '`GET /api/posts/search/?q="hello world" -spam`'
+        ),
+        parameters=[
+            OpenApiParameter("q", str, description="Search query."),
+        ],
+        responses=PostListSerializer,
+    ),
     like=extend_schema(
         summary="Like a post",
         description="Add a like to a specific post.",
@@ -342,37 +602,103 @@ class UserViewSet(viewsets.ModelViewSet):
 class PostViewSet(viewsets.ModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = PostFilter
+    pagination_class = PostPagination
 
-    def _get_base_queryset(self) -> QuerySet:
-        return Post.objects.annotate(
-            likes_count=Count("likes", distinct=True),
-            comments_count=Count("comments", distinct=True),
-        ).select_related("user__profile")
+    def _get_base_queryset(self, drafts: bool = False) -> QuerySet:
+        """
+        Published posts or, with `drafts`, also the unpublished posts of
+        the requesting user.
+        """
+        if drafts:
+            queryset = Post.objects.filter(
+                Q(is_published=True) | Q(user=self.request.user)
+            )
+        else:
+            queryset = Post.published.all()
+        return queryset.select_related("user__profile").defer("search_vector")
 
     def _get_feed_queryset(self) -> QuerySet:
-        """Return queryset for user's personalized feed."""
+        """
+        Return queryset for user's personalized feed, when it follows
+        no pulled authors.
+        """
         user = self.request.user
+        if timeline.is_enabled():
+            metrics.incr("feed.reads.pushed_only")
+            return self._get_base_queryset().filter(
+                timeline_entries__user=user
+            )
+
         following_ids = user.following.values_list("following_id", flat=True)
         author_ids = list(following_ids) + [user.id]
 
         return self._get_base_queryset().filter(user_id__in=author_ids)
 
+    def _hybrid_feed(self, pull_author_ids: list[int]) -> Response:
+        """
+        Merge the pushed timeline with the posts of followed pulled
+        authors. The streams are read already filtered and from the
+        cursor on, page_size + 1 rows at a time, so the merge yields one
+        page and its has-more row.
+        """
+        metrics.incr("feed.reads.hybrid")
+        request = self.request
+        paginator = self.paginator
+        posts = self.filter_queryset(self._get_base_queryset())
+        after, before = paginator.get_positions(request, Post)
+        post_ids = timeline.merged_feed_ids(
+            request.user.id,
+            pull_author_ids,
+            paginator.filter_since_id(posts, request),
+            limit=paginator.get_page_size(request) + 1,
+            after=after,
+            before=before,
+        )
+        page = self.paginate_queryset(posts.filter(id__in=post_ids))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
     def get_queryset(self) -> QuerySet:
         base_qs = self._get_base_queryset()
 
-        if self.action == "retrieve":
-            return base_qs.prefetch_related("comments__user__profile")
-
         if self.action == "feed":
             return self._get_feed_queryset()
 
         if self.action == "liked":
-            return base_qs.filter(likes=self.request.user)
+            user = self.request.user
+            if not like_buffer.is_enabled():
+                return base_qs.filter(likes=user)
+            buffered = like_buffer.states(user.pk)
+            liked_ids = Like.objects.filter(user=user).values("post_id")
+            return base_qs.filter(
+                Q(pk__in=liked_ids)
+                | Q(pk__in=[pk for pk, liked in buffered.items() if liked])
+            ).exclude(
+                pk__in=[pk for pk, liked in buffered.items() if not liked]
+            )
+
+        if self.action == "search":
+            text = self.request.query_params.get("q", "")
+            return search.search_posts(base_qs, text)
+
+        if self.action == "drafts":
+            return self._get_base_queryset(drafts=True).filter(
+                user=self.request.user, is_published=False
+            )
+
+        if self.action in ["update", "partial_update", "destroy"]:
+            return self._get_base_queryset(drafts=True)
 
         return base_qs
 
+    def paginate_queryset(self, queryset: QuerySet) -> list | None:
+        # ?ids= returns every requested post, in the requested order.
+        if self.action == "list" and self.request.query_params.get("ids"):
+            return None
+        return super().paginate_queryset(queryset)
+
     def get_serializer_class(self) -> Type[Serializer]:
-        if self.action in ["list", "feed", "liked"]:
+        if self.action in ["list", "feed", "liked", "search", "drafts"]:
             return PostListSerializer
         if self.action == "retrieve":
             return PostDetailSerializer
@@ -385,24 +711,39 @@ class PostViewSet(viewsets.ModelViewSet):
             self.permission_classes = [IsAuthenticated]
         return [permission() for permission in self.permission_classes]
 
+    def retrieve(self, request: Request, *args, **kwargs) -> Response:
+        """Serve the post from the payload cache."""
+        return _cached_response(
+            request, caching.post_detail(_lookup_id(self), request)
+        )
+
     def perform_create(self, serializer: Serializer) -> None:
         scheduled_at = serializer.validated_data.get("scheduled_at")
 
         if scheduled_at and scheduled_at > timezone.now():
             post = serializer.save(user=self.request.user, is_published=False)
-            transaction.on_commit(
-                lambda: publish_post.apply_async(
-                    args=[post.id], eta=scheduled_at
+            # The periodic dispatcher publishes due posts; per-post ETA
+            # tasks are only the fallback when it is turned off.
+            if not settings.SCHEDULED_POSTS_DISPATCHER_ENABLED:
+                transaction.on_commit(
+                    lambda: publish_post.apply_async(
+                        args=[post.id], eta=scheduled_at
+                    )
                 )
-            )
         else:
-            serializer.save(user=self.request.user, is_published=True)
+            post = serializer.save(user=self.request.user, is_published=True)
+            if timeline.is_enabled():
+                transaction.on_commit(lambda: fan_out_post.delay(post.id))
 
     @action(
         methods=["GET"], detail=False, permission_classes=[IsAuthenticated]
     )
     def feed(self, request: Request, *args, **kwargs) -> Response:
         """Retrieve user's personalized post feed."""
+        if timeline.is_enabled():
+            pull_author_ids = timeline.followed_pull_authors(request.user.id)
+            if pull_author_ids:
+                return self._hybrid_feed(pull_author_ids)
         return self.list(request, *args, **kwargs)
 
     @action(
@@ -412,15 +753,37 @@ class PostViewSet(viewsets.ModelViewSet):
         """Retrieve user's liked posts."""
         return self.list(request, *args, **kwargs)
 
+    @action(
+        methods=["GET"], detail=False, permission_classes=[IsAuthenticated]
+    )
+    def drafts(self, request: Request, *args, **kwargs) -> Response:
+        """Retrieve the user's posts that are scheduled but unpublished."""
+        return self.list(request, *args, **kwargs)
+
+    @action(
+        methods=["GET"],
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        pagination_class=PostSearchPagination,
+    )
+    def search(self, request: Request, *args, **kwargs) -> Response:
+        """Full-text search over post content, most relevant first."""
+        return self.list(request, *args, **kwargs)
+
     @action(
         methods=["POST"], detail=True, permission_classes=[IsAuthenticated]
     )
     def like(self, request: Request, pk: int | None = None) -> Response:
         """Add a like to the post"""
-        post = self.get_object()
-        user = request.user
-        _, created = Like.objects.get_or_create(user=user, post=post)
-
+        post_id = _lookup_id(self)
+        if like_buffer.is_enabled():
+            created = self._buffer_like(post_id, liked=True)
+        else:
+            created = relations.add_likes(request.user.pk, [post_id]).get(
+                post_id
+            )
+        if created is None:
+            raise NotFound
         if not created:
             return Response(
                 {"detail": "You already liked this post."},
@@ -435,11 +798,16 @@ class PostViewSet(viewsets.ModelViewSet):
     )
     def unlike(self, request: Request, pk: int | None = None) -> Response:
         """Remove a like from the post"""
-        post = self.get_object()
-        user = request.user
-        deleted_count, _ = Like.objects.filter(user=user, post=post).delete()
-
-        if deleted_count == 0:
+        post_id = _lookup_id(self)
+        if like_buffer.is_enabled():
+            deleted = self._buffer_like(post_id, liked=False)
+        else:
+            deleted = relations.remove_likes(request.user.pk, [post_id]).get(
+                post_id
+            )
+        if deleted is None:
+            raise NotFound
+        if not deleted:
             return Response(
                 {"detail": "You have not liked this post yet."},
                 status=status.HTTP_400_BAD_REQUEST,
@@ -449,9 +817,27 @@ class PostViewSet(viewsets.ModelViewSet):
             status=status.HTTP_200_OK,
         )
 
+    def _buffer_like(self, post_id: int, liked: bool) -> bool | None:
+        """
+        Record a like or unlike in the write-behind buffer. Returns False
+        if the post is already in that state, buffered or stored, and
+        None if it does not exist.
+        """
+        changed = like_buffer.apply(self.request.user.pk, [post_id], liked)
+        if changed.get(post_id):
+            caching.bump("post", post_id)
+        return changed.get(post_id)
+
 
 @extend_schema_view(
-    list=extend_schema(summary="List comments"),
+    list=extend_schema(
+        summary="List comments",
+        description=(
+            "List a post's comments, oldest first, with cursor paging. "
+            "Supports If-None-Match / If-Modified-Since conditional "
+            "requests."
+        ),
+    ),
     retrieve=extend_schema(summary="Retrieve a comment"),
     create=extend_schema(summary="Create a comment"),
     update=extend_schema(summary="Update a comment"),
@@ -465,11 +851,24 @@ class PostViewSet(viewsets.ModelViewSet):
 )
 class CommentViewSet(viewsets.ModelViewSet):
     serializer_class = CommentSerializer
+    pagination_class = CommentPagination
+
+    @cached_property
+    def _post(self) -> Post:
+        """
+        The post from the URL, like PostViewSet.retrieve resolves it:
+        published, or an unpublished post of the requesting user. Read
+        once per request, although list() builds the queryset twice.
+        """
+        return get_object_or_404(
+            Post.objects.filter(
+                Q(is_published=True) | Q(user=self.request.user)
+            ).only("id"),
+            pk=self.kwargs.get("post_pk"),
+        )
 
     def get_queryset(self) -> QuerySet:
-        post_pk = self.kwargs.get("post_pk")
-        post = get_object_or_404(Post, pk=post_pk)
-        return Comment.objects.filter(post=post).select_related(
+        return Comment.objects.filter(post=self._post).select_related(
             "user__profile"
         )
 
@@ -480,10 +879,72 @@ class CommentViewSet(viewsets.ModelViewSet):
             self.permission_classes = [IsAuthenticated]
         return [permission() for permission in self.permission_classes]
 
+    def list(self, request: Request, *args, **kwargs) -> HttpResponseBase:
+        """
+        Validate the page from the post's version, the viewer's follows
+        and its commenters' versions, read with a narrow query, before
+        serializing it.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = self.paginator.paginate_queryset(
+            queryset.select_related(None).only("id", "user_id", "created_at"),
+            request,
+            view=self,
+        )
+        post_id = int(self.kwargs["post_pk"])
+        versions = [
+            caching.get_version("post", post_id),
+            caching.get_version("follows", request.user.pk),
+            *caching.get_versions(
+                "user", (row.user_id for row in rows)
+            ).values(),
+        ]
+        etag, last_modified = caching.validators(
+            versions, "comments", request.get_full_path()
+        )
+        return _conditional_response(
+            request,
+            etag,
+            last_modified,
+            lambda: super(CommentViewSet, self).list(request, *args, **kwargs),
+        )
+
+    @transaction.atomic
     def perform_create(self, serializer: Serializer) -> None:
-        post_pk = self.kwargs.get("post_pk")
-        post = get_object_or_404(Post, pk=post_pk)
+        post = self._post
         serializer.save(user=self.request.user, post=post)
+        Post.objects.filter(pk=post.pk).update(
+            comments_count=F("comments_count") + 1
+        )
+
+    @transaction.atomic
+    def perform_destroy(self, instance: Comment) -> None:
+        post_id = instance.post_id
+        instance.delete()
+        Post.objects.filter(pk=post_id).update(
+            comments_count=F("comments_count") - 1
+        )
+
+
+class HashtagViewSet(viewsets.GenericViewSet):
+    serializer_class = TrendingHashtagSerializer
+    pagination_class = None
+
+    @extend_schema(
+        summary="Trending hashtags",
+        description=(
+            "Hashtags ranked by a time-decayed count of recent posts. "
+            "Refreshed about once a minute."
+        ),
+        responses=TrendingHashtagSerializer(many=True),
+    )
+    @action(
+        methods=["GET"], detail=False, permission_classes=[IsAuthenticated]
+    )
+    def trending(self, request: Request) -> Response:
+        """Return the cached top trending hashtags."""
+        serializer = self.get_serializer(trending.get_trending(), many=True)
+        return Response(serializer.data)
 
 
 @extend_schema(
@@ -535,6 +996,7 @@ class LogoutView(APIView):
         try:
             token = RefreshToken(refresh_token)
             token.blacklist()
+            caching.invalidate("auth", request.user.pk)
             return Response(
                 {"detail": "You have been logged out."},
                 status=status.HTTP_200_OK,
@@ -544,3 +1006,161 @@ class LogoutView(APIView):
                 {"detail": "Token is invalid or expired."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+
+
+class BulkActionView(ABC, APIView):
+    """
+    Apply a batch of toggle actions for the requesting user in one
+    transaction. Only the last action for an id is applied; earlier
+    ones are reported as superseded. Results follow the request order.
+    """
+
+    serializer_class: type[Serializer]
+    on_action: str
+
+    @abstractmethod
+    def apply(
+        self, request: Request, on_ids: list[int], off_ids: list[int]
+    ) -> dict[int, str]:
+        """Return {id: result} for the ids that were acted on."""
+
+    def post(self, request: Request) -> Response:
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        actions = serializer.validated_data["actions"]
+        last = {item["id"]: index for index, item in enumerate(actions)}
+        on_ids, off_ids = [], []
+        for pk, index in last.items():
+            if actions[index]["action"] == self.on_action:
+                on_ids.append(pk)
+            else:
+                off_ids.append(pk)
+
+        with transaction.atomic():
+            outcome = self.apply(request, on_ids, off_ids)
+
+        results = [
+            {
+                **item,
+                "result": (
+                    outcome.get(item["id"], "not_found")
+                    if last[item["id"]] == index
+                    else "superseded"
+                ),
+            }
+            for index, item in enumerate(actions)
+        ]
+        return Response(
+            {"results": BulkResultSerializer(results, many=True).data}
+        )
+
+    @staticmethod
+    def _outcome(changed: dict[int, bool]) -> dict[int, str]:
+        return {
+            pk: "applied" if applied else "unchanged"
+            for pk, applied in changed.items()
+        }
+
+
+@extend_schema(
+    summary="Like or unlike posts in bulk",
+    description=(
+        "Apply up to BULK_MAX_ITEMS like/unlike actions in one "
+        "transaction. Each item gets a result: applied, unchanged, "
+        "not_found or superseded (a later item for the same post)."
+    ),
+    request=BulkLikeSerializer,
+    responses=BulkResponseSerializer,
+)
+class BulkLikeView(BulkActionView):
+    serializer_class = BulkLikeSerializer
+    on_action = "like"
+
+    def apply(
+        self, request: Request, on_ids: list[int], off_ids: list[int]
+    ) -> dict[int, str]:
+        user_id = request.user.pk
+        outcome = {}
+        for ids, liked in ((on_ids, True), (off_ids, False)):
+            if not ids:
+                continue
+            if like_buffer.is_enabled():
+                changed = like_buffer.apply(user_id, ids, liked)
+                if applied := [pk for pk, done in changed.items() if done]:
+                    caching.bump("post", *applied)
+            elif liked:
+                changed = relations.add_likes(user_id, ids)
+            else:
+                changed = relations.remove_likes(user_id, ids)
+            outcome.update(self._outcome(changed))
+        return outcome
+
+
+@extend_schema(
+    summary="Follow or unfollow users in bulk",
+    description=(
+        "Apply up to BULK_MAX_ITEMS follow/unfollow actions in one "
+        "transaction. Each item gets a result: applied, unchanged, "
+        "not_found, invalid (following yourself) or superseded (a later "
+        "item for the same user)."
+    ),
+    request=BulkFollowSerializer,
+    responses=BulkResponseSerializer,
+)
+class BulkFollowView(BulkActionView):
+    serializer_class = BulkFollowSerializer
+    on_action = "follow"
+
+    def apply(
+        self, request: Request, on_ids: list[int], off_ids: list[int]
+    ) -> dict[int, str]:
+        user_id = request.user.pk
+        outcome = {}
+        if user_id in on_ids:
+            on_ids.remove(user_id)
+            outcome[user_id] = "invalid"
+        for ids, add in ((on_ids, True), (off_ids, False)):
+            if not ids:
+                continue
+            if add:
+                changed = relations.add_follows(user_id, ids)
+            else:
+                changed = relations.remove_follows(user_id, ids)
+            outcome.update(self._outcome(changed))
+            if timeline.is_enabled():
+                task = backfill_timeline if add else remove_from_timeline
+                for pk in (pk for pk, done in changed.items() if done):
+                    transaction.on_commit(
+                        lambda pk=pk: task.delay(user_id, pk)
+                    )
+        return outcome
+
+
+@extend_schema(
+    summary="Service metrics",
+    description=(
+        "Counters and gauges recorded by the API and Celery workers, "
+        "together with the tuning settings they depend on. Admin only."
+    ),
+    responses={
+        200: OpenApiResponse(description="Current metric values."),
+    },
+)
+class MetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request: Request) -> Response:
+        return Response(
+            {
+                "metrics": metrics.snapshot(),
+                "settings": {
+                    "FEED_TIMELINE_ENABLED": settings.FEED_TIMELINE_ENABLED,
+                    "FEED_TIMELINE_MAX_ENTRIES": (
+                        settings.FEED_TIMELINE_MAX_ENTRIES
+                    ),
+                    "FEED_FANOUT_FOLLOWER_THRESHOLD": (
+                        settings.FEED_FANOUT_FOLLOWER_THRESHOLD
+                    ),
+                },
+            }
+        )